@@ -0,0 +1,28 @@
+"""Tweet soft delete
+
+Revision ID: 1c601e93435e
+Revises: b7e4f19a2c61
+Create Date: 2026-10-18 12:21:53.904417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c601e93435e'
+down_revision: Union[str, None] = 'b7e4f19a2c61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('tweets', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_tweets_deleted_at', 'tweets', ['deleted_at'], unique=False, postgresql_where=sa.text('deleted_at IS NOT NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tweets_deleted_at', table_name='tweets', postgresql_where=sa.text('deleted_at IS NOT NULL'))
+    op.drop_column('tweets', 'deleted_at')
@@ -0,0 +1,37 @@
+"""Media derivatives
+
+Revision ID: 38ec6557cb0c
+Revises: c15722be831b
+Create Date: 2026-10-19 09:15:26.480913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '38ec6557cb0c'
+down_revision: Union[str, None] = 'c15722be831b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('media_derivatives',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('width', sa.Integer(), nullable=False),
+    sa.Column('height', sa.Integer(), nullable=False),
+    sa.Column('link', sa.String(length=255), nullable=False),
+    sa.ForeignKeyConstraint(['sha256'], ['media_files.sha256'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_media_derivatives_sha256'), 'media_derivatives', ['sha256'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_media_derivatives_sha256'), table_name='media_derivatives')
+    op.drop_table('media_derivatives')
@@ -0,0 +1,30 @@
+"""Media upload time and link index
+
+Revision ID: 5e7a2d9c4b18
+Revises: 38ec6557cb0c
+Create Date: 2026-10-19 14:02:11.731205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e7a2d9c4b18'
+down_revision: Union[str, None] = '38ec6557cb0c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('medias', sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.create_index('ix_medias_orphaned_created_at', 'medias', ['created_at'], unique=False, postgresql_where=sa.text('tweet_id IS NULL'))
+    op.create_index(op.f('ix_medias_link'), 'medias', ['link'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_medias_link'), table_name='medias')
+    op.drop_index('ix_medias_orphaned_created_at', table_name='medias', postgresql_where=sa.text('tweet_id IS NULL'))
+    op.drop_column('medias', 'created_at')
@@ -0,0 +1,97 @@
+"""Partition tweets and likes by tweet ID range
+
+Revision ID: 68c0aee8233b
+Revises: 5e7a2d9c4b18
+Create Date: 2026-10-19 18:40:07.215934
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.database.config import settings
+from src.database.partitions import create_partition_statements, partition_number
+
+
+# revision identifiers, used by Alembic.
+revision: str = '68c0aee8233b'
+down_revision: Union[str, None] = '5e7a2d9c4b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Indexes keep their names when a table is renamed, so the indexes of the old
+# tables are renamed too before the new tables take the names over
+INDEXES = (
+    'tweets_pkey',
+    'ix_tweets_author_id_id',
+    'ix_tweets_deleted_at',
+    'likes_pkey',
+    'ix_likes_tweet_id',
+    'ix_likes_user_id',
+)
+
+
+def rebuild_tables(partitioned: bool) -> None:
+    """
+    Recreate tweets and likes, partitioned or plain, and move the rows over.
+
+    The tables are locked for the time of the copy, so the migration is meant
+    to run during a maintenance window.
+    """
+    op.drop_constraint('medias_tweet_id_fkey', 'medias', type_='foreignkey')
+    op.rename_table('likes', 'likes_old')
+    op.rename_table('tweets', 'tweets_old')
+    for index in INDEXES:
+        op.execute(f'ALTER INDEX {index} RENAME TO {index}_old')
+
+    op.create_table('tweets',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('tweets_id_seq'::regclass)"), nullable=False),
+    sa.Column('author_id', sa.Integer(), nullable=True),
+    sa.Column('tweet_data', sa.String(length=280), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['author_id'], ['users.id'], ondelete='set null'),
+    sa.PrimaryKeyConstraint('id', name='tweets_pkey'),
+    **({'postgresql_partition_by': 'RANGE (id)'} if partitioned else {})
+    )
+    # The primary key of a partitioned table must include the partition key
+    op.create_table('likes',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('likes_id_seq'::regclass)"), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('tweet_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['tweet_id'], ['tweets.id'], ondelete='cascade'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='set null'),
+    sa.PrimaryKeyConstraint(*(('id', 'tweet_id') if partitioned else ('id',)), name='likes_pkey'),
+    **({'postgresql_partition_by': 'RANGE (tweet_id)'} if partitioned else {})
+    )
+
+    if partitioned:
+        last_id = op.get_bind().scalar(sa.text('SELECT coalesce(max(id), 0) FROM tweets_old'))
+        for number in range(partition_number(last_id) + settings.DB_PARTITIONS_AHEAD + 1):
+            for statement in create_partition_statements(number):
+                op.execute(statement)
+
+    op.execute(
+        'INSERT INTO tweets (id, author_id, tweet_data, created_at, deleted_at) '
+        'SELECT id, author_id, tweet_data, created_at, deleted_at FROM tweets_old'
+    )
+    op.execute('INSERT INTO likes (id, user_id, tweet_id) SELECT id, user_id, tweet_id FROM likes_old')
+    op.execute('ALTER SEQUENCE tweets_id_seq OWNED BY tweets.id')
+    op.execute('ALTER SEQUENCE likes_id_seq OWNED BY likes.id')
+    op.drop_table('likes_old')
+    op.drop_table('tweets_old')
+
+    op.create_index('ix_tweets_author_id_id', 'tweets', ['author_id', sa.text('id DESC')], unique=False)
+    op.create_index('ix_tweets_deleted_at', 'tweets', ['deleted_at'], unique=False, postgresql_where=sa.text('deleted_at IS NOT NULL'))
+    op.create_index(op.f('ix_likes_tweet_id'), 'likes', ['tweet_id'], unique=False)
+    op.create_index(op.f('ix_likes_user_id'), 'likes', ['user_id'], unique=False)
+    op.create_foreign_key('medias_tweet_id_fkey', 'medias', 'tweets', ['tweet_id'], ['id'], ondelete='cascade')
+
+
+def upgrade() -> None:
+    rebuild_tables(partitioned=True)
+
+
+def downgrade() -> None:
+    rebuild_tables(partitioned=False)
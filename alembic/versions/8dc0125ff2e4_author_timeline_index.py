@@ -0,0 +1,28 @@
+"""Author timeline index and tweet creation time
+
+Revision ID: 8dc0125ff2e4
+Revises: 4ff359dfb63f
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8dc0125ff2e4'
+down_revision: Union[str, None] = '4ff359dfb63f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('tweets', sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.create_index('ix_tweets_author_id_id', 'tweets', ['author_id', sa.text('id DESC')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tweets_author_id_id', table_name='tweets')
+    op.drop_column('tweets', 'created_at')
@@ -0,0 +1,34 @@
+"""One media derivative per width
+
+Revision ID: 9c3e5a7f21d6
+Revises: e52b7d04c9a1
+Create Date: 2026-10-19 11:40:03.926154
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c3e5a7f21d6'
+down_revision: Union[str, None] = 'e52b7d04c9a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Duplicates of concurrent renders point to the same stored files
+    op.execute(
+        "DELETE FROM media_derivatives AS duplicate USING media_derivatives AS kept "
+        "WHERE duplicate.sha256 = kept.sha256 AND duplicate.width = kept.width "
+        "AND duplicate.id > kept.id"
+    )
+    op.create_index('ix_media_derivatives_sha256_width', 'media_derivatives', ['sha256', 'width'], unique=True)
+    op.drop_index('ix_media_derivatives_sha256', table_name='media_derivatives')
+
+
+def downgrade() -> None:
+    op.create_index('ix_media_derivatives_sha256', 'media_derivatives', ['sha256'], unique=False)
+    op.drop_index('ix_media_derivatives_sha256_width', table_name='media_derivatives')
@@ -0,0 +1,53 @@
+"""Foreign key indexes
+
+Revision ID: b7e4f19a2c61
+Revises: 8dc0125ff2e4
+Create Date: 2026-10-18 11:04:17.552031
+
+`tweets.author_id` is already covered by the leading column of
+`ix_tweets_author_id_id`. On PostgreSQL the indexes are built with
+CREATE INDEX CONCURRENTLY outside of the migration transaction, so
+writes to the tables are not blocked while they are built.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4f19a2c61'
+down_revision: Union[str, None] = '8dc0125ff2e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ('likes', 'tweet_id'),
+    ('likes', 'user_id'),
+    ('medias', 'tweet_id'),
+    ('follows', 'following_id'),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table, column in INDEXES:
+            op.create_index(
+                op.f(f'ix_{table}_{column}'),
+                table,
+                [column],
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table, column in reversed(INDEXES):
+            op.drop_index(
+                op.f(f'ix_{table}_{column}'),
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,48 @@
+"""Content-addressed media files
+
+Revision ID: c15722be831b
+Revises: 1c601e93435e
+Create Date: 2026-10-18 13:40:09.127755
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c15722be831b'
+down_revision: Union[str, None] = '1c601e93435e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('media_files',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('link', sa.String(length=255), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    op.add_column('medias', sa.Column('sha256', sa.String(length=64), nullable=True))
+    op.add_column('medias', sa.Column('size', sa.BigInteger(), nullable=True))
+    op.alter_column('medias', 'link',
+               existing_type=sa.String(length=100),
+               type_=sa.String(length=255),
+               existing_nullable=False)
+    op.create_index(op.f('ix_medias_sha256'), 'medias', ['sha256'], unique=False)
+    op.create_foreign_key('medias_sha256_fkey', 'medias', 'media_files', ['sha256'], ['sha256'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('medias_sha256_fkey', 'medias', type_='foreignkey')
+    op.drop_index(op.f('ix_medias_sha256'), table_name='medias')
+    op.alter_column('medias', 'link',
+               existing_type=sa.String(length=255),
+               type_=sa.String(length=100),
+               existing_nullable=False)
+    op.drop_column('medias', 'size')
+    op.drop_column('medias', 'sha256')
+    op.drop_table('media_files')
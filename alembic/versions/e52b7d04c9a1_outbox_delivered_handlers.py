@@ -0,0 +1,26 @@
+"""Handlers that already handled an outbox event
+
+Revision ID: e52b7d04c9a1
+Revises: a3f91c7d52e0
+Create Date: 2026-10-19 09:12:44.318270
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e52b7d04c9a1'
+down_revision: Union[str, None] = 'a3f91c7d52e0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('outbox', sa.Column('delivered_handlers', sa.JSON(), server_default='[]', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('outbox', 'delivered_handlers')
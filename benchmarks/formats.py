@@ -0,0 +1,51 @@
+"""
+Microbenchmark of the response formats.
+
+Compares the payload size, also after gzip, and the encode time per 1,000
+tweets of the JSON and MessagePack bodies of `SchemaResponse`, both encoded
+from the same schemas.
+
+Run from the project root with the variables of `.env` set:
+
+    python -m benchmarks.formats
+"""
+
+import gzip
+import timeit
+from typing import Callable
+
+import msgpack  # type: ignore[import-untyped]
+import orjson
+
+from benchmarks.serialization import TWEETS, collect_once, make_tweets
+from src.responses import encode_model
+from src.schemas.tweet_schemas import TweetResponseSchema
+
+REPEAT = 20
+
+
+def measure(encode: Callable[[], bytes]) -> float:
+    """Return the best encode time in milliseconds per 1,000 tweets."""
+    timings = timeit.repeat(encode, number=1, repeat=REPEAT)
+    return min(timings) * 1000 * 1000 / TWEETS
+
+
+def main() -> None:
+    schema = TweetResponseSchema.model_construct(
+        tweets=[collect_once(tweet) for tweet in make_tweets(TWEETS)]
+    )
+    formats = {
+        "JSON:       ": lambda: orjson.dumps(schema, default=encode_model),
+        "MessagePack:": lambda: msgpack.packb(schema, default=encode_model),
+    }
+    for name, encode in formats.items():
+        body = encode()
+        print(
+            f"{name} {len(body) / 1024:8.1f} KiB, "
+            f"gzip {len(gzip.compress(body)) / 1024:6.1f} KiB, "
+            f"encode {measure(encode):6.2f} ms per 1,000 tweets"
+        )
+
+
+if __name__ == "__main__":
+    main()
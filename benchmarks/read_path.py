@@ -0,0 +1,172 @@
+"""
+Microbenchmark of the tweet feed read path.
+
+Compares the time and peak memory of loading a page of 1,000 tweets with
+their media, thumbnails and likes through full ORM entities, as the read path
+did before, with the column projection of `select_tweet_rows` and
+`collect_tweets_data`, which selects plain rows and creates no entities.
+
+Both paths use a fresh session per run against a temporary SQLite database.
+Run from the project root with the variables of `.env` set:
+
+    python -m benchmarks.read_path
+"""
+
+import asyncio
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Awaitable, Callable, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from src.database.models import (
+    Base,
+    Like,
+    Media,
+    MediaDerivative,
+    MediaFile,
+    Tweet,
+    User,
+)
+from src.database.repositories.tweet_repository import (
+    collect_tweets_data,
+    select_tweet_rows,
+)
+from src.functions import get_media_url
+from src.schemas.tweet_schemas import TweetSchema
+
+TWEETS = 1000
+USERS = 50
+REPEAT = 5
+
+ReadPath = Callable[[AsyncSession], Awaitable[List[TweetSchema]]]
+
+
+async def populate(session: AsyncSession) -> None:
+    """Add tweets shaped like a real feed: a picture on every tenth tweet, likes."""
+    users = [User(username=f"user{i}", name=f"User {i}") for i in range(USERS)]
+    session.add_all(users)
+    await session.flush()
+
+    tweets = [
+        Tweet(author_id=users[i % USERS].id, tweet_data=f"Tweet {i} about #python")
+        for i in range(TWEETS)
+    ]
+    session.add_all(tweets)
+    await session.flush()
+
+    for i, tweet in enumerate(tweets):
+        session.add_all(
+            Like(user_id=user.id, tweet_id=tweet.id) for user in users[: i % 10]
+        )
+        if i % 10 == 0:
+            sha256 = f"{i:064d}"
+            session.add(MediaFile(sha256=sha256, link=f"{sha256}.jpg", size=1))
+            session.add(
+                Media(link=f"{sha256}.jpg", tweet_id=tweet.id, sha256=sha256, size=1)
+            )
+            session.add_all(
+                MediaDerivative(
+                    sha256=sha256,
+                    kind="thumbnail",
+                    width=width,
+                    height=width // 2,
+                    link=f"{sha256}_{width}.jpg",
+                )
+                for width in (320, 640)
+            )
+    await session.commit()
+
+
+async def entity_path(session: AsyncSession) -> List[TweetSchema]:
+    """Load full entities with their relationships, as the read path did before."""
+    query = (
+        select(Tweet)
+        .where(Tweet.deleted_at.is_(None))
+        .order_by(Tweet.id.desc())
+        .limit(TWEETS)
+    )
+    tweets = (await session.scalars(query)).unique().all()
+    return [
+        TweetSchema.model_validate(
+            {
+                "id": tweet.id,
+                "content": tweet.tweet_data,
+                "attachments": [get_media_url(media.id) for media in tweet.media],
+                "media": [
+                    {
+                        "id": media.id,
+                        "link": get_media_url(media.id),
+                        "derivatives": [
+                            {
+                                "kind": derivative.kind,
+                                "width": derivative.width,
+                                "height": derivative.height,
+                                "link": get_media_url(media.id, derivative.width),
+                            }
+                            for derivative in media.derivatives
+                        ],
+                    }
+                    for media in tweet.media
+                ],
+                "author": {"id": tweet.author.id, "name": tweet.author.name},
+                "likes": [
+                    {"user_id": like.user_id, "name": like.name} for like in tweet.likes
+                ],
+            }
+        )
+        for tweet in tweets
+    ]
+
+
+async def projection_path(session: AsyncSession) -> List[TweetSchema]:
+    """Select only the needed columns as plain rows."""
+    query = select_tweet_rows().order_by(Tweet.id.desc()).limit(TWEETS)
+    return await collect_tweets_data(query, session)
+
+
+async def measure(
+    path: ReadPath, session_maker: async_sessionmaker[AsyncSession]
+) -> Tuple[float, float]:
+    """Return the best time in milliseconds and the peak memory in KiB of a path."""
+    timings = []
+    for _ in range(REPEAT):
+        async with session_maker() as session:
+            started = time.perf_counter()
+            await path(session)
+            timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    async with session_maker() as session:
+        await path(session)
+        _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings) * 1000, peak / 1024
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as folder:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{Path(folder) / 'bench.db'}", poolclass=NullPool
+        )
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_maker() as session:
+            await populate(session)
+
+        for name, path in [
+            ("ORM entities:     ", entity_path),
+            ("column projection:", projection_path),
+        ]:
+            elapsed, peak = await measure(path, session_maker)
+            print(f"{name} {elapsed:8.2f} ms, peak {peak:8.0f} KiB per 1,000 tweets")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
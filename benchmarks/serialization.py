@@ -0,0 +1,159 @@
+"""
+Microbenchmark of the tweet feed serialization.
+
+Compares the cost per 1,000 tweets of the previous read path, where schemas
+are validated while built from ORM objects and FastAPI then validates and
+serializes them again against the response model before encoding them with
+the stdlib `json`, with the single pass, where every tweet is validated once from
+plain data and `SchemaResponse` encodes the schemas with orjson.
+
+Run from the project root with the variables of `.env` set:
+
+    python -m benchmarks.serialization
+"""
+
+import asyncio
+import timeit
+from types import SimpleNamespace
+from typing import Any, List, Union
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from src.functions import get_media_url
+from src.responses import SchemaResponse
+from src.schemas.base_schemas import ErrorResponseSchema
+from src.schemas.like_schemas import LikeSchema
+from src.schemas.tweet_schemas import (
+    MediaDerivativeSchema,
+    MediaSchema,
+    TweetResponseSchema,
+    TweetSchema,
+)
+from src.schemas.user_schemas import UserSchema
+
+TWEETS = 1000
+REPEAT = 5
+
+response_field = create_model_field(
+    "Response", Union[TweetResponseSchema, ErrorResponseSchema], mode="serialization"
+)
+
+
+def make_tweets(count: int) -> List[Any]:
+    """Build objects shaped like loaded `Tweet` rows with their relationships."""
+    users = [SimpleNamespace(id=i, name=f"User {i}") for i in range(50)]
+    derivatives = [
+        SimpleNamespace(kind="thumbnail", width=width, height=width // 2)
+        for width in (320, 640)
+    ]
+    return [
+        SimpleNamespace(
+            id=i,
+            tweet_data=f"Tweet number {i} about #python and #fastapi",
+            author=users[i % len(users)],
+            media=[SimpleNamespace(id=i, derivatives=derivatives)],
+            likes=[
+                SimpleNamespace(user_id=user.id, name=user.name)
+                for user in users[: i % 10]
+            ],
+        )
+        for i in range(count)
+    ]
+
+
+def collect_validated(tweet: Any) -> TweetSchema:
+    """Build a tweet schema with validation, as the read path did before."""
+    return TweetSchema(
+        id=tweet.id,
+        content=tweet.tweet_data,
+        attachments=[get_media_url(media.id) for media in tweet.media],
+        media=[
+            MediaSchema(
+                id=media.id,
+                link=get_media_url(media.id),
+                derivatives=[
+                    MediaDerivativeSchema(
+                        kind=derivative.kind,
+                        width=derivative.width,
+                        height=derivative.height,
+                        link=get_media_url(media.id, derivative.width),
+                    )
+                    for derivative in media.derivatives
+                ],
+            )
+            for media in tweet.media
+        ],
+        author=UserSchema.model_validate(tweet.author),
+        likes=[LikeSchema.model_validate(like) for like in tweet.likes],
+    )
+
+
+def collect_once(tweet: Any) -> TweetSchema:
+    """Validate a tweet once from plain data, as `collect_tweets_data` does."""
+    return TweetSchema.model_validate(
+        {
+            "id": tweet.id,
+            "content": tweet.tweet_data,
+            "attachments": [get_media_url(media.id) for media in tweet.media],
+            "media": [
+                {
+                    "id": media.id,
+                    "link": get_media_url(media.id),
+                    "derivatives": [
+                        {
+                            "kind": derivative.kind,
+                            "width": derivative.width,
+                            "height": derivative.height,
+                            "link": get_media_url(media.id, derivative.width),
+                        }
+                        for derivative in media.derivatives
+                    ],
+                }
+                for media in tweet.media
+            ],
+            "author": {"id": tweet.author.id, "name": tweet.author.name},
+            "likes": [
+                {"user_id": like.user_id, "name": like.name} for like in tweet.likes
+            ],
+        }
+    )
+
+
+async def validated_path(tweets: List[Any]) -> bytes:
+    schema = TweetResponseSchema(tweets=[collect_validated(tweet) for tweet in tweets])
+    content = await serialize_response(field=response_field, response_content=schema)
+    return bytes(JSONResponse(content).body)
+
+
+async def single_pass(tweets: List[Any]) -> bytes:
+    schema = TweetResponseSchema.model_construct(
+        tweets=[collect_once(tweet) for tweet in tweets]
+    )
+    return bytes(SchemaResponse(schema).body)
+
+
+def measure(path: Any, tweets: List[Any]) -> float:
+    """Return the best time of a read path in milliseconds per 1,000 tweets."""
+    loop = asyncio.new_event_loop()
+    try:
+        timings = timeit.repeat(
+            lambda: loop.run_until_complete(path(tweets)), number=1, repeat=REPEAT
+        )
+    finally:
+        loop.close()
+    return min(timings) * 1000 * 1000 / len(tweets)
+
+
+def main() -> None:
+    tweets = make_tweets(TWEETS)
+    before = measure(validated_path, tweets)
+    after = measure(single_pass, tweets)
+    print(f"validated + stdlib json: {before:8.2f} ms per 1,000 tweets")
+    print(f"single pass + orjson:    {after:8.2f} ms per 1,000 tweets")
+    print(f"speedup:                 {before / after:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Microbenchmark of the hot existence and lookup statements.
+
+Compares the per-call Python overhead of `get_user_id_by`, `is_user_exist`,
+`is_tweet_exist` and `is_like_exist` when the `select()` is rebuilt on every
+call, as the repositories did before, with the statements built once with
+bound parameters.
+
+Two numbers are reported per variant: the cost of preparing the statement,
+that is building it and computing the cache key SQLAlchemy looks the compiled
+SQL up by, and the cost of the whole call against a temporary SQLite database.
+
+Run from the project root with the variables of `.env` set:
+
+    python -m benchmarks.statements
+"""
+
+import asyncio
+import tempfile
+import time
+import timeit
+from pathlib import Path
+from typing import Any, Awaitable, Callable, List, Tuple
+
+from sqlalchemy import Select, exists, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from src.database.models import Base, Like, Tweet, User
+from src.database.repositories.like_repository import LIKE_EXISTS, is_like_exist
+from src.database.repositories.tweet_repository import TWEET_EXISTS, is_tweet_exist
+from src.database.repositories.user_repository import (
+    USER_EXISTS,
+    USER_ID_BY_USERNAME,
+    get_user_id_by,
+    is_user_exist,
+)
+
+CALLS = 2000
+REPEAT = 5
+
+Checks = Callable[[AsyncSession], Awaitable[Any]]
+
+
+def rebuilt_statements() -> List[Select[Any]]:
+    """Build the statements as the repositories did before, on every call."""
+    return [
+        select(User.id).where(User.username == "user"),
+        select(exists().where(User.id == 1)),
+        select(exists().where(Tweet.id == 1, Tweet.deleted_at.is_(None))),
+        select(exists().where(Like.user_id == 1, Like.tweet_id == 1)),
+    ]
+
+
+def cached_statements() -> List[Select[Any]]:
+    """Return the statements built once by the repositories."""
+    return [USER_ID_BY_USERNAME, USER_EXISTS, TWEET_EXISTS, LIKE_EXISTS]
+
+
+def prepare(statements: Callable[[], List[Select[Any]]]) -> None:
+    """Get the statements and their cache keys, as every execution does."""
+    for statement in statements():
+        statement._generate_cache_key()
+
+
+async def rebuilt_checks(session: AsyncSession) -> None:
+    """Run the checks with statements rebuilt on every call."""
+    for statement in rebuilt_statements():
+        await session.scalar(statement)
+
+
+async def cached_checks(session: AsyncSession) -> None:
+    """Run the checks through the repository functions."""
+    await get_user_id_by("user", session)
+    await is_user_exist(1, session)
+    await is_tweet_exist(1, session)
+    await is_like_exist(1, 1, session)
+
+
+def measure_preparation(statements: Callable[[], List[Select[Any]]]) -> float:
+    """Return the best preparation time in microseconds per statement."""
+    timings = timeit.repeat(lambda: prepare(statements), number=CALLS, repeat=REPEAT)
+    return min(timings) * 1_000_000 / CALLS / 4
+
+
+async def measure_calls(
+    checks: Checks, session_maker: async_sessionmaker[AsyncSession]
+) -> float:
+    """Return the best call time in microseconds per statement."""
+    timings = []
+    for _ in range(REPEAT):
+        async with session_maker() as session:
+            started = time.perf_counter()
+            for _ in range(CALLS // 10):
+                await checks(session)
+            timings.append(time.perf_counter() - started)
+    return min(timings) * 1_000_000 / (CALLS // 10) / 4
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as folder:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{Path(folder) / 'bench.db'}", poolclass=NullPool
+        )
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_maker() as session:
+            user = User(username="user", name="User")
+            session.add(user)
+            await session.flush()
+            tweet = Tweet(author_id=user.id, tweet_data="Tweet")
+            session.add(tweet)
+            await session.flush()
+            session.add(Like(user_id=user.id, tweet_id=tweet.id))
+            await session.commit()
+
+        variants: List[Tuple[str, Callable[[], List[Select[Any]]], Checks]] = [
+            ("rebuilt per call:", rebuilt_statements, rebuilt_checks),
+            ("built once:      ", cached_statements, cached_checks),
+        ]
+        for name, statements, checks in variants:
+            preparation = measure_preparation(statements)
+            call = await measure_calls(checks, session_maker)
+            print(
+                f"{name} prepare {preparation:7.2f} us, "
+                f"call {call:7.2f} us per statement"
+            )
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
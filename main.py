@@ -1,14 +1,112 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 
+from src.compression import CompressionMiddleware
+from src.database.service import (
+    ReadYourWritesMiddleware,
+    engine,
+    shard_engines,
+    shard_router,
+)
 from src.handlers.handlers import exception_handler
+from src.metrics import mark_worker_dead
+from src.responses import SchemaResponse
 from src.routers.media_router import media_router
+from src.routers.metrics_router import metrics_router
+from src.routers.trend_router import trend_router
 from src.routers.tweet_router import tweet_router
 from src.routers.user_router import user_router
+from src.storage import close_storage
+from src.tasks import (
+    METRICS_INTERVAL_SECONDS,
+    ORPHAN_GC_INTERVAL_SECONDS,
+    OUTBOX_INTERVAL_SECONDS,
+    PARTITION_INTERVAL_SECONDS,
+    POOL_METRICS_INTERVAL_SECONDS,
+    PURGE_INTERVAL_SECONDS,
+    UPLOAD_CLEANUP_INTERVAL_SECONDS,
+    USER_REPLICATION_INTERVAL_SECONDS,
+    collect_orphaned_media,
+    create_partitions_job,
+    dispatch_outbox_job,
+    log_pool_metrics,
+    log_transaction_metrics,
+    purge_deleted_tweets_job,
+    refresh_metrics_job,
+    replicate_users_job,
+    run_periodically,
+)
+from src.thumbnails import shutdown_process_pool
+from src.timing import ServerTimingMiddleware
+from src.trends import run_snapshots, trend_tracker
+from src.uploads import remove_expired_upload_sessions
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    await trend_tracker.load_snapshot()
+    await trend_tracker.load_peers()
+    if shard_router.count > 1:
+        await shard_router.reserve_id_ranges([engine, *shard_engines])
+        await replicate_users_job()
+    tasks = [
+        asyncio.create_task(run_snapshots()),
+        asyncio.create_task(
+            run_periodically(replicate_users_job, USER_REPLICATION_INTERVAL_SECONDS)
+        ),
+        asyncio.create_task(
+            run_periodically(purge_deleted_tweets_job, PURGE_INTERVAL_SECONDS)
+        ),
+        asyncio.create_task(
+            run_periodically(
+                remove_expired_upload_sessions, UPLOAD_CLEANUP_INTERVAL_SECONDS
+            )
+        ),
+        asyncio.create_task(
+            run_periodically(collect_orphaned_media, ORPHAN_GC_INTERVAL_SECONDS)
+        ),
+        asyncio.create_task(
+            run_periodically(dispatch_outbox_job, OUTBOX_INTERVAL_SECONDS)
+        ),
+        asyncio.create_task(
+            run_periodically(create_partitions_job, PARTITION_INTERVAL_SECONDS)
+        ),
+        asyncio.create_task(
+            run_periodically(log_pool_metrics, POOL_METRICS_INTERVAL_SECONDS)
+        ),
+        asyncio.create_task(
+            run_periodically(log_transaction_metrics, POOL_METRICS_INTERVAL_SECONDS)
+        ),
+        asyncio.create_task(
+            run_periodically(refresh_metrics_job, METRICS_INTERVAL_SECONDS)
+        ),
+    ]
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    shutdown_process_pool()
+    await close_storage()
+    mark_worker_dead()
+
 
-app = FastAPI(title="Twitter Clone API", version="1.0.0")
+app = FastAPI(
+    title="Twitter Clone API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=SchemaResponse,
+)
 
 app.add_exception_handler(Exception, exception_handler)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(ServerTimingMiddleware)
 
 app.include_router(user_router)
 app.include_router(tweet_router)
 app.include_router(media_router)
+app.include_router(trend_router)
+app.include_router(metrics_router)
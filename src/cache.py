@@ -0,0 +1,93 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+from src.schemas.tweet_schemas import TweetSchema
+
+ValueT = TypeVar("ValueT")
+
+TWEET_CACHE_SIZE = 10_000
+# Invalidations only reach the worker that made the change, so other workers
+# may serve a changed tweet for this long
+TWEET_CACHE_TTL_SECONDS = 10.0
+COMPRESSED_BODY_CACHE_SIZE = 1_000
+
+
+class VersionedCache(Generic[ValueT]):
+    """
+    Bounded in-process LRU cache keyed by an id and its version.
+
+    Every invalidation bumps the version of the id, so a reader that loaded
+    data before the invalidation stores it under a stale key that is never
+    read again. Both entries and versions are kept in LRU order and trimmed
+    to `maxsize`, which bounds memory regardless of the number of ids. With a
+    `ttl`, entries also expire that many seconds after they were stored.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: OrderedDict[Tuple[Hashable, int], Tuple[ValueT, float]] = (
+            OrderedDict()
+        )
+        self.versions: OrderedDict[Hashable, int] = OrderedDict()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+    def version(self, key: Hashable) -> int:
+        """Return the current version of `key`."""
+        return self.versions.get(key, 0)
+
+    def get(self, key: Hashable) -> Optional[ValueT]:
+        """Return the cached value for the current version of `key`."""
+        entry_key = (key, self.version(key))
+        entry = self.entries.get(entry_key)
+        if entry is not None and entry[1] < time.monotonic():
+            del self.entries[entry_key]
+            entry = None
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        self.entries.move_to_end(entry_key)
+        self.stats["hits"] += 1
+        return entry[0]
+
+    def set(self, key: Hashable, version: int, value: ValueT) -> None:
+        """
+        Store `value` for `key` as loaded at `version`.
+
+        Values loaded before a concurrent invalidation are discarded.
+        """
+        if version != self.version(key):
+            return
+
+        expires_at = float("inf") if self.ttl is None else time.monotonic() + self.ttl
+        self.entries[(key, version)] = (value, expires_at)
+        self.entries.move_to_end((key, version))
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop the cached value of `key` and bump its version."""
+        version = self.version(key)
+        self.entries.pop((key, version), None)
+        self.versions[key] = version + 1
+        self.versions.move_to_end(key)
+        while len(self.versions) > self.maxsize:
+            self.versions.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries and versions."""
+        self.entries.clear()
+        self.versions.clear()
+
+
+tweet_cache: VersionedCache[TweetSchema] = VersionedCache(
+    TWEET_CACHE_SIZE, ttl=TWEET_CACHE_TTL_SECONDS
+)
+
+# Keyed by a digest of the uncompressed body and the coding, so entries never
+# go stale and are only evicted in LRU order
+compressed_body_cache: VersionedCache[bytes] = VersionedCache(
+    COMPRESSED_BODY_CACHE_SIZE
+)
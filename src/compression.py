@@ -0,0 +1,159 @@
+import asyncio
+import gzip
+import hashlib
+from typing import Dict, Optional
+
+from fastapi import Request
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.cache import compressed_body_cache
+from src.database.config import settings
+from src.functions import parse_quality_values
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = ("application/json", "application/msgpack", "text/")
+CACHE_STATE_KEY = "cache_compressed_body"
+
+
+def supported_encodings() -> Dict[str, int]:
+    """Return the supported content codings, mapped to their preference."""
+    encodings = {"gzip": 1}
+    if brotli is not None:
+        encodings["br"] = 2
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Choose the content coding of a response from the `Accept-Encoding` header.
+
+    Codings with a higher quality value win, brotli is preferred over gzip on a
+    tie. `*` stands for every coding that is not listed explicitly.
+
+    Returns:
+        Optional[str]: `br`, `gzip` or None if the body must not be compressed.
+    """
+    encodings = supported_encodings()
+    qualities = parse_quality_values(accept_encoding)
+    wildcard = qualities.get("*", 0.0)
+    ranked = [
+        (qualities.get(coding, wildcard), preference, coding)
+        for coding, preference in encodings.items()
+    ]
+    quality, _, coding = max(ranked)
+    return coding if quality > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a response body with the given content coding."""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # No timestamp in the header, so equal bodies are compressed to equal bytes
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def cache_compressed_body(request: Request) -> None:
+    """
+    Keep the compressed body of the response to the request.
+
+    Meant for routes served from a response cache: the body repeats until the
+    cached entry is invalidated, so it is compressed once per cached version
+    and the compressed bytes are reused, keyed by a digest of the body.
+    """
+    setattr(request.state, CACHE_STATE_KEY, True)
+
+
+class CompressionMiddleware:
+    """
+    Compress JSON and text responses with gzip or brotli.
+
+    Bodies smaller than `minimum_size`, already encoded, partial or streamed
+    in several messages are sent as is. Bodies of at least `thread_size` bytes
+    are compressed in a worker thread, so they do not block the event loop.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = settings.COMPRESSION_MIN_SIZE,
+        thread_size: int = settings.COMPRESSION_THREAD_SIZE,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.thread_size = thread_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start_message: Optional[Message] = None
+        started = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, started
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if started or start_message is None:
+                await send(message)
+                return
+
+            started = True
+            headers = MutableHeaders(raw=start_message["headers"])
+            content_type = headers.get("content-type", "")
+            if not content_type.startswith(COMPRESSIBLE_TYPES):
+                await send(start_message)
+                await send(message)
+                return
+
+            headers.add_vary_header("Accept-Encoding")
+            body = message.get("body", b"")
+            if (
+                encoding is None
+                or message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or "content-range" in headers
+            ):
+                await send(start_message)
+                await send(message)
+                return
+
+            cache = scope.get("state", {}).get(CACHE_STATE_KEY, False)
+            body = await self.compress_body(body, encoding, cache)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    async def compress_body(self, body: bytes, encoding: str, cache: bool) -> bytes:
+        """Compress a body, reusing the cached result for a repeated body."""
+        key = None
+        if cache:
+            key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+            compressed = compressed_body_cache.get(key)
+            if compressed is not None:
+                return compressed
+
+        if len(body) >= self.thread_size:
+            compressed = await asyncio.to_thread(compress, body, encoding)
+        else:
+            compressed = compress(body, encoding)
+
+        if key is not None:
+            compressed_body_cache.set(
+                key, compressed_body_cache.version(key), compressed
+            )
+        return compressed
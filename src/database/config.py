@@ -1,4 +1,6 @@
+import tempfile
 from pathlib import Path
+from typing import List, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -12,6 +14,47 @@ class Settings(BaseSettings):
     DB_PASSWORD: str
     DB_NAME: str
 
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = False
+    DB_STATEMENT_CACHE_SIZE: int = 100
+
+    DB_REPLICA_HOST: Optional[str] = None
+    DB_REPLICA_PORT: Optional[int] = None
+    DB_READ_YOUR_WRITES_SECONDS: float = 5
+
+    DB_SHARD_HOSTS: List[str] = []
+    DB_SHARD_ID_SPAN: int = 100_000_000
+
+    DB_PARTITION_SIZE: int = 1_000_000
+    DB_PARTITIONS_AHEAD: int = 2
+
+    MEDIA_CHUNK_SIZE: int = 1024 * 1024
+    MEDIA_MAX_SIZE: int = 10 * 1024 * 1024
+    MEDIA_ACCEL_REDIRECT: bool = False
+    MEDIA_UPLOAD_CHUNK_SIZE: int = 4 * 1024 * 1024
+    MEDIA_UPLOAD_MAX_SIZE: int = 100 * 1024 * 1024
+    MEDIA_UPLOAD_SESSION_TTL: int = 24 * 60 * 60
+    MEDIA_ORPHAN_GRACE_PERIOD: int = 24 * 60 * 60
+
+    MEDIA_STORAGE: str = "local"
+    S3_ENDPOINT_URL: str = "http://minio:9000"
+    S3_BUCKET: str = "media"
+    S3_ACCESS_KEY: str = ""
+    S3_SECRET_KEY: str = ""
+    S3_REGION: str = "us-east-1"
+    S3_PART_SIZE: int = 8 * 1024 * 1024
+    S3_MAX_CONNECTIONS: int = 20
+    S3_PRESIGN_EXPIRES: int = 60 * 60
+    S3_PREFIX: str = "media/"
+
+    TRENDS_SNAPSHOT_DIR: Path = Path(tempfile.gettempdir()) / "trends"
+
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_THREAD_SIZE: int = 64 * 1024
+
     @property
     def get_db_url(self) -> str:
         """
@@ -26,6 +69,39 @@ class Settings(BaseSettings):
             name=self.DB_NAME,
         )
 
+    @property
+    def get_replica_db_url(self) -> Optional[str]:
+        """
+        Returns the URL of the read replica, or None if no replica is configured.
+        The replica shares the credentials and database name of the primary.
+        """
+        if not self.DB_REPLICA_HOST:
+            return None
+        return "postgresql+asyncpg://{user}:{password}@{host}:{port}/{name}".format(
+            user=self.DB_USER,
+            password=self.DB_PASSWORD,
+            host=self.DB_REPLICA_HOST,
+            port=self.DB_REPLICA_PORT or self.DB_PORT,
+            name=self.DB_NAME,
+        )
+
+    @property
+    def get_shard_db_urls(self) -> List[str]:
+        """
+        Returns the URLs of the shards after the primary database, one per
+        `host` or `host:port` entry. The shards share the credentials and
+        database name of the primary.
+        """
+        return [
+            "postgresql+asyncpg://{user}:{password}@{host}/{name}".format(
+                user=self.DB_USER,
+                password=self.DB_PASSWORD,
+                host=host if ":" in host else f"{host}:{self.DB_PORT}",
+                name=self.DB_NAME,
+            )
+            for host in self.DB_SHARD_HOSTS
+        ]
+
     @property
     def get_db_url_for_alembic(self) -> str:
         """
@@ -1,6 +1,18 @@
-from typing import List, Optional
-
-from sqlalchemy import ForeignKey, String
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    DateTime,
+    ForeignKey,
+    Index,
+    String,
+    Text,
+    desc,
+    func,
+    text,
+)
 from sqlalchemy.ext.associationproxy import AssociationProxy, association_proxy
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
@@ -65,6 +77,17 @@ class Tweet(Base):
     """Model representing a tweet."""
 
     __tablename__ = "tweets"
+    __table_args__ = (
+        Index("ix_tweets_author_id_id", "author_id", desc("id")),
+        Index(
+            "ix_tweets_deleted_at",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+            sqlite_where=text("deleted_at IS NOT NULL"),
+        ),
+        # IDs are never reused, and each shard allocates them from its range
+        {"sqlite_autoincrement": True},
+    )
 
     max_tweet_length = 280
 
@@ -75,6 +98,16 @@ class Tweet(Base):
     tweet_data: Mapped[str] = mapped_column(
         String(max_tweet_length), doc="Content of the tweet, max 280 characters"
     )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        doc="Time the tweet was created",
+    )
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True),
+        default=None,
+        doc="Time the tweet was deleted, the row is purged in the background",
+    )
 
     author: Mapped["User"] = relationship(
         "User",
@@ -107,23 +140,116 @@ class Tweet(Base):
         return f"Tweet({tweet_id=}, {author_id=}, {tweet_data=}...)"
 
 
+class MediaFile(Base):
+    """Model representing a stored media file, shared by identical uploads."""
+
+    __tablename__ = "media_files"
+
+    sha256_length = 64
+
+    sha256: Mapped[str] = mapped_column(
+        String(sha256_length),
+        primary_key=True,
+        doc="SHA-256 hex digest of the file content",
+    )
+    link: Mapped[str] = mapped_column(String(255), doc="Path link to the file")
+    size: Mapped[int] = mapped_column(BigInteger, doc="Size of the file in bytes")
+    ref_count: Mapped[int] = mapped_column(
+        default=1, doc="Number of media entries referencing the file"
+    )
+
+    def __repr__(self) -> str:
+        """Return a string representation of the media file."""
+        sha256 = self.sha256
+        size = self.size
+        ref_count = self.ref_count
+        return f"MediaFile({sha256=}, {size=}, {ref_count=})"
+
+
+class MediaDerivative(Base):
+    """Model representing a resized version of a stored media file."""
+
+    __tablename__ = "media_derivatives"
+    __table_args__ = (
+        # One derivative per width, so concurrent renders cannot add duplicates
+        Index("ix_media_derivatives_sha256_width", "sha256", "width", unique=True),
+    )
+
+    kind_length = 16
+
+    id: Mapped[int] = mapped_column(
+        primary_key=True, doc="Primary key of the media derivative"
+    )
+    sha256: Mapped[str] = mapped_column(
+        ForeignKey("media_files.sha256", ondelete="cascade"),
+        doc="SHA-256 digest of the original file",
+    )
+    kind: Mapped[str] = mapped_column(
+        String(kind_length), doc="Kind of the derivative: thumbnail or placeholder"
+    )
+    width: Mapped[int] = mapped_column(doc="Width of the derivative in pixels")
+    height: Mapped[int] = mapped_column(doc="Height of the derivative in pixels")
+    link: Mapped[str] = mapped_column(String(255), doc="Path link to the derivative")
+
+    def __repr__(self) -> str:
+        """Return a string representation of the media derivative."""
+        sha256 = self.sha256
+        kind = self.kind
+        width = self.width
+        height = self.height
+        return f"MediaDerivative({sha256=}, {kind=}, {width=}, {height=})"
+
+
 class Media(Base):
     """Model representing a media."""
 
     __tablename__ = "medias"
+    __table_args__ = (
+        Index(
+            "ix_medias_orphaned_created_at",
+            "created_at",
+            postgresql_where=text("tweet_id IS NULL"),
+            sqlite_where=text("tweet_id IS NULL"),
+        ),
+        {"sqlite_autoincrement": True},
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, doc="Primary key of the media")
-    link: Mapped[str] = mapped_column(String(100), doc="Path link to the media")
+    link: Mapped[str] = mapped_column(
+        String(255), index=True, doc="Path link to the media"
+    )
     tweet_id: Mapped[Optional[int]] = mapped_column(
         ForeignKey("tweets.id", ondelete="cascade"),
+        index=True,
         doc="Tweet ID to which the media was attached",
     )
+    sha256: Mapped[Optional[str]] = mapped_column(
+        ForeignKey("media_files.sha256"),
+        index=True,
+        doc="SHA-256 digest of the content, references the stored file",
+    )
+    size: Mapped[Optional[int]] = mapped_column(
+        BigInteger, doc="Size of the media content in bytes"
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        doc="Time the media was uploaded",
+    )
 
     tweet: Mapped["Tweet"] = relationship(
         "Tweet",
         back_populates="media",
         doc="The tweet to which the media was attached.",
     )
+    derivatives: Mapped[List["MediaDerivative"]] = relationship(
+        "MediaDerivative",
+        primaryjoin="Media.sha256 == foreign(MediaDerivative.sha256)",
+        viewonly=True,
+        lazy="selectin",
+        order_by="MediaDerivative.width",
+        doc="Resized versions of the media content.",
+    )
 
     def __repr__(self) -> str:
         """Return a string representation of the media."""
@@ -143,10 +269,12 @@ class Like(Base):
     )
     user_id: Mapped[Optional[int]] = mapped_column(
         ForeignKey(USER_ID_FK, ondelete="set null"),
+        index=True,
         doc="The ID of the user who liked the tweet.",
     )
     tweet_id: Mapped[int] = mapped_column(
         ForeignKey("tweets.id", ondelete="cascade"),
+        index=True,
         doc="The ID of the tweet that was liked.",
     )
 
@@ -183,6 +311,7 @@ class Follow(Base):
     following_id: Mapped[int] = mapped_column(
         ForeignKey(USER_ID_FK, ondelete="cascade"),
         primary_key=True,
+        index=True,
         doc="The ID of the user who is being followed.",
     )
 
@@ -202,3 +331,49 @@ class Follow(Base):
     def __repr__(self) -> str:
         """Return a string representation of the follow relationship."""
         return f"Follow({self.follower_id=}, {self.following_id=})"
+
+
+class OutboxEvent(Base):
+    """Model representing a change to be handled after its transaction commits."""
+
+    __tablename__ = "outbox"
+
+    topic_length = 64
+
+    id: Mapped[int] = mapped_column(primary_key=True, doc="Primary key of the event")
+    topic: Mapped[str] = mapped_column(
+        String(topic_length), doc="Kind of the change, selects the handlers"
+    )
+    payload: Mapped[Dict[str, Any]] = mapped_column(
+        JSON, doc="IDs and data of the change passed to the handlers"
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        doc="Time the change was committed",
+    )
+    available_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        index=True,
+        doc="Time from which the event may be dispatched, moved on every retry",
+    )
+    attempts: Mapped[int] = mapped_column(
+        default=0, server_default="0", doc="Number of failed dispatch attempts"
+    )
+    last_error: Mapped[Optional[str]] = mapped_column(
+        Text, default=None, doc="Error of the last failed dispatch attempt"
+    )
+    delivered_handlers: Mapped[List[str]] = mapped_column(
+        JSON,
+        default=list,
+        server_default="[]",
+        doc="Handlers that already handled the event, skipped on retries",
+    )
+
+    def __repr__(self) -> str:
+        """Return a string representation of the outbox event."""
+        event_id = self.id
+        topic = self.topic
+        attempts = self.attempts
+        return f"OutboxEvent({event_id=}, {topic=}, {attempts=})"
@@ -0,0 +1,152 @@
+"""
+Transactional outbox for side effects of writes.
+
+A write records an event in the `outbox` table in the same transaction as
+the change itself, so the event exists exactly when the change is committed
+and no request waits for its side effects. A background dispatcher claims
+batches of due events with `FOR UPDATE SKIP LOCKED`, so several workers
+dispatch different events concurrently, and passes every event to the
+handlers registered for its topic.
+
+A failing handler makes the event retried later with an exponential backoff.
+The handlers that already handled it are recorded with the event and skipped
+on retries, so one failing handler does not repeat the side effects of the
+others. Events are still delivered at least once: a dispatcher that stops
+after a handler ran but before its batch is committed leaves the event to be
+handled again.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, DefaultDict, Dict, List, NamedTuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.database.models import OutboxEvent
+from src.logger_setup import get_logger
+
+logger = get_logger(__name__)
+
+TWEET_CREATED = "tweet_created"
+TWEET_DELETED = "tweet_deleted"
+LIKE_ADDED = "like_added"
+LIKE_REMOVED = "like_removed"
+
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 10
+OUTBOX_RETRY_DELAY_SECONDS = 1.0
+OUTBOX_MAX_RETRY_DELAY_SECONDS = 60 * 60
+
+OutboxHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+handlers: DefaultDict[str, List[OutboxHandler]] = defaultdict(list)
+
+
+class DispatchedEvents(NamedTuple):
+    """Outcome of dispatching a batch of outbox events."""
+
+    delivered: int
+    failed: int
+
+
+def register_handler(topic: str) -> Callable[[OutboxHandler], OutboxHandler]:
+    """Register the decorated coroutine function as a handler of `topic`."""
+
+    def decorator(handler: OutboxHandler) -> OutboxHandler:
+        handlers[topic].append(handler)
+        return handler
+
+    return decorator
+
+
+def handler_name(handler: OutboxHandler) -> str:
+    """Return the name a handler is recorded under once it handled an event."""
+    return f"{handler.__module__}.{handler.__qualname__}"
+
+
+def add_event(session: AsyncSession, topic: str, **payload: Any) -> None:
+    """
+    Record an event to be dispatched once the transaction of `session` commits.
+
+    Args:
+        session (AsyncSession): The session of the change the event reports.
+        topic (str): The kind of the change, which selects the handlers.
+        **payload: JSON-serializable data of the change passed to the handlers.
+    """
+    session.add(OutboxEvent(topic=topic, payload=payload))
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Return the delay before the next dispatch after `attempts` failures."""
+    return timedelta(
+        seconds=min(
+            OUTBOX_RETRY_DELAY_SECONDS * 2 ** (attempts - 1),
+            OUTBOX_MAX_RETRY_DELAY_SECONDS,
+        )
+    )
+
+
+async def dispatch_events(
+    session_maker: async_sessionmaker[AsyncSession],
+    batch_size: int = OUTBOX_BATCH_SIZE,
+) -> DispatchedEvents:
+    """
+    Dispatch a batch of due outbox events to their handlers.
+
+    The events stay locked until the batch is done. Delivered events are
+    removed, failed ones are scheduled for a retry of the handlers that did
+    not handle them yet. After
+    `OUTBOX_MAX_ATTEMPTS` failures an event is no longer dispatched and is
+    kept with its last error for inspection.
+
+    Args:
+        session_maker (async_sessionmaker): The session factory of the database
+                                            holding the events.
+        batch_size (int): The maximum number of events to claim.
+
+    Returns:
+        DispatchedEvents: The number of delivered and failed events, both zero
+        when no event is due.
+    """
+    now = datetime.now(timezone.utc)
+    async with session_maker() as session:
+        events = (
+            await session.scalars(
+                select(OutboxEvent)
+                .where(
+                    OutboxEvent.available_at <= now,
+                    OutboxEvent.attempts < OUTBOX_MAX_ATTEMPTS,
+                )
+                .order_by(OutboxEvent.available_at, OutboxEvent.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+        ).all()
+
+        delivered = []
+        for event in events:
+            delivered_handlers = list(event.delivered_handlers)
+            try:
+                for handler in handlers[event.topic]:
+                    name = handler_name(handler)
+                    if name not in delivered_handlers:
+                        await handler(event.payload)
+                        delivered_handlers.append(name)
+            except Exception as exc:
+                logger.exception("Outbox event %s failed", event.id)
+                event.attempts += 1
+                event.available_at = now + retry_delay(event.attempts)
+                event.last_error = repr(exc)
+                event.delivered_handlers = delivered_handlers
+            else:
+                delivered.append(event.id)
+
+        if delivered:
+            await session.execute(
+                delete(OutboxEvent).where(OutboxEvent.id.in_(delivered))
+            )
+        await session.commit()
+    return DispatchedEvents(
+        delivered=len(delivered), failed=len(events) - len(delivered)
+    )
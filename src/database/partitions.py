@@ -0,0 +1,168 @@
+"""
+Range partitions of the tweets and likes tables on PostgreSQL.
+
+Tweets are partitioned by their ID and likes by the ID of the liked tweet,
+with the same bounds, so the likes of a tweet always live in the partition
+numbered like the one of the tweet. Queries that filter on `tweets.id` or
+`likes.tweet_id` only visit the matching partitions, and the oldest tweets
+together with their likes can be detached as two plain tables.
+
+The partitioning is created by the migration, the models stay portable, so
+the tests and benchmarks run the same queries on unpartitioned SQLite tables.
+"""
+
+import argparse
+import asyncio
+from typing import Dict, List
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+
+from src.database.config import settings
+from src.database.models import Tweet
+
+# Partition key of every partitioned table, in the order of creation
+PARTITIONED_TABLES: Dict[str, str] = {"tweets": "id", "likes": "tweet_id"}
+
+
+def partition_name(table: str, number: int) -> str:
+    """Return the name of the partition of `table` with the given number."""
+    return f"{table}_p{number:04d}"
+
+
+def partition_number(tweet_id: int, size: int = settings.DB_PARTITION_SIZE) -> int:
+    """Return the number of the partition that holds `tweet_id`."""
+    return tweet_id // size
+
+
+def create_partition_statements(
+    number: int, size: int = settings.DB_PARTITION_SIZE
+) -> List[str]:
+    """
+    Build the statements that create the partitions with the given number.
+
+    Args:
+        number (int): The partition number, covering tweet IDs from
+                      `number * size` up to, not including, `(number + 1) * size`.
+        size (int): The number of tweet IDs per partition.
+
+    Returns:
+        List[str]: One `CREATE TABLE ... PARTITION OF` statement per table,
+        which does nothing if the partition already exists.
+    """
+    start, end = number * size, (number + 1) * size
+    return [
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, number)} "
+        f"PARTITION OF {table} FOR VALUES FROM ({start}) TO ({end})"
+        for table in PARTITIONED_TABLES
+    ]
+
+
+def detach_partition_statements(number: int) -> List[str]:
+    """
+    Build the statements that detach the partitions with the given number.
+
+    The likes partition is detached first, as it references the tweets of the
+    tweets partition. The statements run without blocking queries on the
+    parent tables and must be executed outside of a transaction.
+    """
+    return [
+        f"ALTER TABLE {table} DETACH PARTITION {partition_name(table, number)} "
+        "CONCURRENTLY"
+        for table in reversed(PARTITIONED_TABLES)
+    ]
+
+
+async def create_future_partitions(
+    connection: AsyncConnection,
+    ahead: int = settings.DB_PARTITIONS_AHEAD,
+    size: int = settings.DB_PARTITION_SIZE,
+) -> List[str]:
+    """
+    Create the partitions for the next tweet IDs before they are reached.
+
+    Inserts fail when no partition covers the new ID, so the partition of the
+    next ID and `ahead` partitions after it are kept in place. The next ID is
+    read from the sequence, which starts past the existing rows on shards
+    that allocate IDs from their own range. Workers
+    create them under an advisory lock, one at a time. Nothing is done on
+    databases other than PostgreSQL.
+
+    Args:
+        connection (AsyncConnection): The connection to create the partitions on.
+        ahead (int): The number of partitions to keep after the current one.
+        size (int): The number of tweet IDs per partition.
+
+    Returns:
+        List[str]: The names of the created tweets partitions.
+    """
+    if connection.dialect.name != "postgresql":
+        return []
+
+    await connection.execute(
+        text("SELECT pg_advisory_xact_lock(hashtext('tweets_partitions'))")
+    )
+    last_id = await connection.scalar(
+        select(
+            func.greatest(
+                func.coalesce(func.max(Tweet.id), 0),
+                text("(SELECT last_value FROM tweets_id_seq)"),
+            )
+        )
+    )
+    current = partition_number(last_id or 0, size)
+    existing = set(
+        await connection.scalars(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = 'tweets'::regclass"
+            )
+        )
+    )
+
+    created = []
+    for number in range(current, current + ahead + 1):
+        if partition_name("tweets", number) in existing:
+            continue
+        for statement in create_partition_statements(number, size):
+            await connection.execute(text(statement))
+        created.append(partition_name("tweets", number))
+    return created
+
+
+async def detach_partitions(engine: AsyncEngine, number: int) -> None:
+    """
+    Detach the tweets and likes partitions with the given number.
+
+    The detached partitions become plain tables that can be archived and
+    dropped without touching the remaining rows. Media of the detached tweets
+    must be removed first, the foreign key of `medias` prevents the detach
+    otherwise.
+    """
+    async with engine.connect() as connection:
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        for statement in detach_partition_statements(number):
+            await connection.execute(text(statement))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage tweets and likes partitions")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("create", help="create the partitions for the next IDs")
+    detach = commands.add_parser("detach", help="detach the partitions of a number")
+    detach.add_argument("number", type=int)
+    args = parser.parse_args()
+
+    engine = create_async_engine(settings.get_db_url)
+    if args.command == "detach":
+        await detach_partitions(engine, args.number)
+    else:
+        async with engine.begin() as connection:
+            for name in await create_future_partitions(connection):
+                print(f"Created {name}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
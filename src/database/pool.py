@@ -0,0 +1,92 @@
+import os
+import time
+from typing import Any, Dict, NamedTuple
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+class PoolStats(NamedTuple):
+    """A snapshot of the connection pool of a worker process."""
+
+    pid: int
+    size: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    wait_seconds: float
+    max_wait_seconds: float
+
+    @property
+    def average_wait_seconds(self) -> float:
+        return self.wait_seconds / self.checkouts if self.checkouts else 0.0
+
+
+class PoolMetrics:
+    """
+    Counters of connection checkouts of a named pool in this process.
+
+    Kept outside of the pool, so the counts survive the pool being recreated
+    by `engine.dispose()`.
+    """
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record_checkout(self, wait_seconds: float, timed_out: bool) -> None:
+        """Count a checkout attempt and the time it waited for a connection."""
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.checkouts += 1
+        self.wait_seconds += wait_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def snapshot(self, pool: Pool) -> PoolStats:
+        """Combine the counters with the current state of `pool`."""
+        size = checked_out = overflow = 0
+        if isinstance(pool, QueuePool):
+            size = pool.size()
+            checked_out = pool.checkedout()
+            overflow = max(pool.overflow(), 0)
+        return PoolStats(
+            pid=os.getpid(),
+            size=size,
+            checked_out=checked_out,
+            overflow=overflow,
+            checkouts=self.checkouts,
+            timeouts=self.timeouts,
+            wait_seconds=self.wait_seconds,
+            max_wait_seconds=self.max_wait_seconds,
+        )
+
+
+_pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+def get_pool_metrics(name: str) -> PoolMetrics:
+    """Return the metrics of the pool created with `pool_logging_name=name`."""
+    return _pool_metrics.setdefault(name, PoolMetrics())
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long every checkout waits for a connection.
+
+    The metrics are kept under the `pool_logging_name` of the engine.
+    """
+
+    def _do_get(self) -> Any:
+        metrics = get_pool_metrics(self.logging_name or "")
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            metrics.record_checkout(time.perf_counter() - started, True)
+            raise
+        metrics.record_checkout(time.perf_counter() - started, False)
+        return connection
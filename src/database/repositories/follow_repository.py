@@ -37,7 +37,7 @@ async def follow(
     session.add(Follow(follower_id=follower_id, following_id=following_id))
 
     try:
-        await session.commit()
+        await session.flush()
     except IntegrityError as exc:
         await session.rollback()
         raise IntegrityViolationException(str(exc))
@@ -85,7 +85,7 @@ async def delete_follow(
         )
 
     try:
-        await session.commit()
+        await session.flush()
     except IntegrityError as exc:
         await session.rollback()
         raise IntegrityViolationException(str(exc))
@@ -1,10 +1,13 @@
-from sqlalchemy import delete, exists, select
+from sqlalchemy import bindparam, delete, exists, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.cache import tweet_cache
 from src.database.models import Like
+from src.database.outbox import LIKE_ADDED, LIKE_REMOVED, add_event
 from src.database.repositories.tweet_repository import is_tweet_exist
 from src.database.repositories.user_repository import get_user_id_by
+from src.database.unit_of_work import on_commit
 from src.handlers.exceptions import (
     IntegrityViolationException,
     RowAlreadyExists,
@@ -12,6 +15,12 @@ from src.handlers.exceptions import (
 )
 from src.schemas.base_schemas import SuccessSchema
 
+LIKE_EXISTS = select(
+    exists().where(
+        Like.user_id == bindparam("user_id"), Like.tweet_id == bindparam("tweet_id")
+    )
+)
+
 
 async def validate_user_and_tweet(
     username: str, tweet_id: int, session: AsyncSession
@@ -55,9 +64,9 @@ async def is_like_exist(user_id: int, tweet_id: int, session: AsyncSession) -> b
     Returns:
         bool: True if the like exists, otherwise False.
     """
-    subquery = exists().where(Like.user_id == user_id, Like.tweet_id == tweet_id)
-    query = select(subquery)
-    response = await session.scalar(query)
+    response = await session.scalar(
+        LIKE_EXISTS, {"user_id": user_id, "tweet_id": tweet_id}
+    )
     return response is not None and response
 
 
@@ -91,11 +100,13 @@ async def add_like(
     session.add(Like(user_id=user_id, tweet_id=tweet_id))
 
     try:
-        await session.commit()
+        await session.flush()
     except IntegrityError as exc:
         await session.rollback()
         raise IntegrityViolationException(str(exc))
 
+    on_commit(session, tweet_cache.invalidate, tweet_id)
+    add_event(session, LIKE_ADDED, tweet_id=tweet_id, user_id=user_id)
     return SuccessSchema()
 
 
@@ -133,9 +144,11 @@ async def delete_like(
         raise RowNotFoundException("No like entry found for this user and tweet")
 
     try:
-        await session.commit()
+        await session.flush()
     except IntegrityError as exc:
         await session.rollback()
         raise IntegrityViolationException(str(exc))
 
+    on_commit(session, tweet_cache.invalidate, tweet_id)
+    add_event(session, LIKE_REMOVED, tweet_id=tweet_id, user_id=user_id)
     return SuccessSchema()
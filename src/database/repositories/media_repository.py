@@ -1,20 +1,164 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple, Type, Union
+
+from sqlalchemy import delete, exists, select, update
+from sqlalchemy.dialects.postgresql import Insert as PostgresqlInsert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import Insert as SqliteInsert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.models import Media
-from src.handlers.exceptions import IntegrityViolationException
+from src.cache import tweet_cache
+from src.database.models import Base, Media, MediaDerivative, MediaFile, Tweet
+from src.database.unit_of_work import on_commit
+from src.functions import ReceivedFile, content_digest
+from src.handlers.exceptions import IntegrityViolationException, RowNotFoundException
 from src.schemas.tweet_schemas import NewMediaResponseSchema
+from src.storage import content_key, get_storage
+from src.thumbnails import Derivative
+
+ORPHAN_BATCH_SIZE = 500
+
+
+class ReclaimedSpace(NamedTuple):
+    """Media removed by a garbage collection pass."""
+
+    entries: int
+    size: int
+
+
+def insert_into(
+    model: Type[Base], session: AsyncSession
+) -> Union[PostgresqlInsert, SqliteInsert]:
+    """Start an insert that supports `ON CONFLICT` on the database of the session."""
+    if session.get_bind().dialect.name == "postgresql":
+        return postgresql_insert(model)
+    return sqlite_insert(model)
+
+
+async def acquire_media_file(
+    sha256: str, link: str, size: int, session: AsyncSession
+) -> Tuple[str, int]:
+    """
+    Add a reference to a stored media file.
+
+    A single upsert increments the reference count of the file, or creates a
+    new file entry with a single reference if the content has not been stored
+    before, so concurrent first uploads of the same content do not collide.
+    The entry stays locked until the session is committed, and a purge that
+    wants to delete it waits until then.
+
+    Args:
+        sha256 (str): The SHA-256 digest of the file content.
+        link (str): The path link to store the file under if it is new.
+        size (int): The size of the file in bytes.
+        session (AsyncSession): The database session for executing queries.
+
+    Returns:
+        Tuple[str, int]: The link of the stored file and its reference count,
+        1 if the entry was just created and the file still has to be stored.
+    """
+    statement = (
+        insert_into(MediaFile, session)
+        .values(sha256=sha256, link=link, size=size, ref_count=1)
+        .on_conflict_do_update(
+            index_elements=[MediaFile.sha256],
+            set_={"ref_count": MediaFile.ref_count + 1},
+        )
+        .returning(MediaFile.link, MediaFile.ref_count)
+    )
+    stored_link, ref_count = (await session.execute(statement)).one()
+    return stored_link, ref_count
+
+
+async def release_media_files(
+    hashes: Iterable[Optional[str]], session: AsyncSession
+) -> List[str]:
+    """
+    Drop references to stored media files.
+
+    The reference count of every file is decremented once per occurrence of
+    its digest in `hashes`. Files that are no longer referenced are deleted
+    from the database. The caller removes the returned files from storage
+    before committing the session, while the deleted entries are still
+    locked, so that an upload of the same content waits and stores the file
+    again instead of referencing a file that is being removed.
+
+    Args:
+        hashes (Iterable[Optional[str]]): Digests of the removed media entries,
+                                          `None` entries are ignored.
+        session (AsyncSession): The database session for executing queries.
+
+    Returns:
+        List[str]: Path links of the files and derivatives that are no longer
+        referenced.
+    """
+    references = Counter(sha256 for sha256 in hashes if sha256 is not None)
+    if not references:
+        return []
+
+    for sha256, count in references.items():
+        await session.execute(
+            update(MediaFile)
+            .where(MediaFile.sha256 == sha256)
+            .values(ref_count=MediaFile.ref_count - count)
+        )
+
+    query = select(MediaFile.sha256).where(
+        MediaFile.sha256.in_(references), MediaFile.ref_count <= 0
+    )
+    unreferenced = (await session.scalars(query)).all()
+    if not unreferenced:
+        return []
 
+    derivative_links = await session.scalars(
+        delete(MediaDerivative)
+        .where(MediaDerivative.sha256.in_(unreferenced))
+        .returning(MediaDerivative.link)
+    )
+    links = list(derivative_links.all())
+    file_links = await session.scalars(
+        delete(MediaFile)
+        .where(MediaFile.sha256.in_(unreferenced))
+        .returning(MediaFile.link)
+    )
+    return links + list(file_links.all())
 
-async def add_media(link: str, session: AsyncSession) -> NewMediaResponseSchema:
+
+async def flush_media(
+    new_media: Media, session: AsyncSession
+) -> NewMediaResponseSchema:
+    """Insert a media entry, turning integrity errors into the API exception."""
+    try:
+        session.add(new_media)
+        await session.flush()
+    except IntegrityError as exc:
+        await session.rollback()
+        raise IntegrityViolationException(str(exc))
+
+    return NewMediaResponseSchema(media_id=new_media.id)
+
+
+async def add_media(
+    link: str,
+    session: AsyncSession,
+    sha256: Optional[str] = None,
+    size: Optional[int] = None,
+) -> NewMediaResponseSchema:
     """
     Add a new media entry to the database.
 
     This function adds a new media record with the provided `link` to the database.
+    When the content digest is given, the media references the shared stored
+    file, so identical uploads are kept on disk only once.
 
     Args:
         link (str): The link of the media to be added.
         session (AsyncSession): The database session for executing queries.
+        sha256 (Optional[str]): The SHA-256 digest of the media content.
+        size (Optional[int]): The size of the media content in bytes.
 
     Returns:
         NewMediaResponseSchema: A schema with the ID of the newly created media entry.
@@ -22,13 +166,271 @@ async def add_media(link: str, session: AsyncSession) -> NewMediaResponseSchema:
     Raises:
         IntegrityViolationException: If a database integrity error occurs.
     """
-    new_media = Media(link=link)
-    session.add(new_media)
+    if sha256 is not None and size is not None:
+        link, _ = await acquire_media_file(sha256, link, size, session)
+    return await flush_media(Media(link=link, sha256=sha256, size=size), session)
+
+
+async def add_uploaded_media(
+    received_file: ReceivedFile, session: AsyncSession
+) -> Tuple[NewMediaResponseSchema, str]:
+    """
+    Add a media entry for an uploaded file and store its content if it is new.
 
+    The reference to the content is taken first. Only the upload that created
+    the file entry stores the file, while the entry is locked, other uploads
+    drop their temporary file and share the stored one: a committed entry
+    always has its file in storage, because purges remove files before they
+    commit the deletion of the entry.
+
+    Args:
+        received_file (ReceivedFile): The complete upload, its temporary file
+                                      is consumed.
+        session (AsyncSession): The database session for executing queries.
+
+    Returns:
+        Tuple[NewMediaResponseSchema, str]: A schema with the ID of the new
+        media entry, and the link of the stored file.
+
+    Raises:
+        IntegrityViolationException: If a database integrity error occurs.
+    """
+    storage = get_storage()
+    sha256 = received_file.sha256
+    key = content_key(sha256, f"{sha256}{received_file.extension}")
     try:
-        await session.commit()
+        link, ref_count = await acquire_media_file(
+            sha256, storage.link_for(key), received_file.size, session
+        )
+        if ref_count == 1:
+            link = await storage.save(received_file.path, key)
+    finally:
+        received_file.path.unlink(missing_ok=True)
+
+    new_media = Media(link=link, sha256=sha256, size=received_file.size)
+    return await flush_media(new_media, session), link
+
+
+async def get_media_link(
+    media_id: int, session: AsyncSession, width: Optional[int] = None
+) -> str:
+    """
+    Get the stored file of a published media.
+
+    Only media attached to a tweet that is not deleted can be served, so
+    uploads that were never published and media of deleted tweets stay
+    private.
+
+    Args:
+        media_id (int): The ID of the media.
+        session (AsyncSession): The database session for executing queries.
+        width (Optional[int]): The width of the derivative to serve instead of
+                               the original.
+
+    Returns:
+        str: The path link to the stored file.
+
+    Raises:
+        RowNotFoundException: If the media is not published, or it has no
+                              derivative of the requested width.
+    """
+    query = (
+        select(Media.link, Media.sha256)
+        .join(Tweet, Tweet.id == Media.tweet_id)
+        .where(Media.id == media_id, Tweet.deleted_at.is_(None))
+    )
+    media = (await session.execute(query)).one_or_none()
+    if media is None:
+        raise RowNotFoundException("Media with this ID does not exist")
+
+    link, sha256 = media
+    if width is None:
+        return link
+
+    derivative_link = await session.scalar(
+        select(MediaDerivative.link).where(
+            MediaDerivative.sha256 == sha256, MediaDerivative.width == width
+        )
+    )
+    if derivative_link is None:
+        raise RowNotFoundException("Media derivative with this width does not exist")
+
+    return derivative_link
+
+
+async def has_media_derivatives(sha256: str, session: AsyncSession) -> bool:
+    """
+    Check if derivatives of a stored media file were already rendered.
+
+    Args:
+        sha256 (str): The SHA-256 digest of the file content.
+        session (AsyncSession): The database session for executing queries.
+
+    Returns:
+        bool: True if the derivatives exist, otherwise False.
+    """
+    query = select(exists().where(MediaDerivative.sha256 == sha256))
+    response = await session.scalar(query)
+    return response is not None and response
+
+
+async def add_media_derivatives(
+    sha256: str, derivatives: Sequence[Derivative], session: AsyncSession
+) -> None:
+    """
+    Record rendered derivatives of a stored media file.
+
+    Derivatives of a width that is already recorded, rendered by a concurrent
+    task, are skipped. Tweets that already show the media are dropped from the
+    tweet cache once the derivatives are committed, so that their next read
+    includes them.
+
+    Args:
+        sha256 (str): The SHA-256 digest of the original file content.
+        derivatives (Sequence[Derivative]): The rendered derivatives.
+        session (AsyncSession): The database session for executing queries.
+
+    Raises:
+        IntegrityViolationException: If a database integrity error occurs.
+    """
+    if not derivatives:
+        return
+
+    statement = insert_into(MediaDerivative, session).on_conflict_do_nothing(
+        index_elements=[MediaDerivative.sha256, MediaDerivative.width]
+    )
+    try:
+        await session.execute(
+            statement,
+            [
+                {
+                    "sha256": sha256,
+                    "kind": derivative.kind,
+                    "width": derivative.width,
+                    "height": derivative.height,
+                    "link": derivative.link,
+                }
+                for derivative in derivatives
+            ],
+        )
     except IntegrityError as exc:
         await session.rollback()
         raise IntegrityViolationException(str(exc))
 
-    return NewMediaResponseSchema(media_id=new_media.id)
+    query = select(Media.tweet_id).where(
+        Media.sha256 == sha256, Media.tweet_id.is_not(None)
+    )
+    for tweet_id in (await session.scalars(query)).all():
+        on_commit(session, tweet_cache.invalidate, tweet_id)
+
+
+async def purge_orphaned_media(
+    session: AsyncSession,
+    older_than: timedelta,
+    batch_size: int = ORPHAN_BATCH_SIZE,
+    other_sessions: Sequence[AsyncSession] = (),
+) -> ReclaimedSpace:
+    """
+    Remove a batch of uploaded media that was never attached to a tweet.
+
+    Only media uploaded more than `older_than` ago is removed, so that clients
+    have time to publish the tweet after the upload. Stored files are removed
+    from disk once no media entry references them any more.
+
+    Args:
+        session (AsyncSession): The database session for executing queries.
+        older_than (timedelta): The grace period after the upload.
+        batch_size (int): The maximum number of media entries to remove.
+        other_sessions (Sequence[AsyncSession]): The sessions of the other
+                                                 shards, which share the files.
+
+    Returns:
+        ReclaimedSpace: The number of removed media entries and of bytes freed
+        on disk, zero entries when there is nothing left to remove.
+    """
+    deadline = datetime.now(timezone.utc) - older_than
+    orphans = (
+        select(Media.id)
+        .where(Media.tweet_id.is_(None), Media.created_at < deadline)
+        .order_by(Media.created_at)
+        .limit(batch_size)
+    )
+    deleted_media = (
+        await session.execute(
+            delete(Media)
+            .where(Media.id.in_(orphans), Media.tweet_id.is_(None))
+            .returning(Media.link, Media.sha256)
+        )
+    ).all()
+    if not deleted_media:
+        return ReclaimedSpace(entries=0, size=0)
+
+    unreferenced = await release_media_files(
+        [sha256 for _, sha256 in deleted_media], session
+    )
+    reclaimed = await get_storage().remove(
+        await filter_unshared_files(
+            [link for link, sha256 in deleted_media if sha256 is None] + unreferenced,
+            other_sessions,
+        )
+    )
+    await session.commit()
+    return ReclaimedSpace(entries=len(deleted_media), size=reclaimed)
+
+
+async def filter_unshared_files(
+    links: List[str], other_sessions: Sequence[AsyncSession]
+) -> List[str]:
+    """
+    Keep only the files that no other shard refers to.
+
+    Identical uploads on different shards are stored as one content-addressed
+    file, so a file released on one shard may still be used on another.
+    """
+    for other_session in other_sessions:
+        if not links:
+            break
+        links = await filter_unreferenced_files(links, other_session)
+    return links
+
+
+async def filter_unreferenced_files(
+    links: Sequence[str], session: AsyncSession
+) -> List[str]:
+    """
+    Find the stored files that no database entry refers to.
+
+    Content-addressed files and their derivatives are looked up by the digest
+    in their name, older files by their link.
+
+    Args:
+        links (Sequence[str]): Path links of files found on disk.
+        session (AsyncSession): The database session for executing queries.
+
+    Returns:
+        List[str]: The links of the files that can be removed.
+    """
+    digests = {link: content_digest(link) for link in links}
+    known_digests = set(
+        (
+            await session.scalars(
+                select(MediaFile.sha256).where(
+                    MediaFile.sha256.in_(set(filter(None, digests.values())))
+                )
+            )
+        ).all()
+    )
+    legacy_links = [link for link, digest in digests.items() if digest is None]
+    known_links = set(
+        (
+            await session.scalars(
+                select(Media.link).where(Media.link.in_(legacy_links))
+            )
+        ).all()
+    )
+    return [
+        link
+        for link, digest in digests.items()
+        if (digest is None and link not in known_links)
+        or (digest is not None and digest not in known_digests)
+    ]
@@ -1,53 +1,206 @@
-from typing import List
-
-from sqlalchemy import delete, exists, select, update
+import asyncio
+import heapq
+from collections import defaultdict
+from datetime import datetime
+from itertools import islice
+from typing import Any, DefaultDict, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import (
+    Select,
+    and_,
+    bindparam,
+    delete,
+    exists,
+    func,
+    or_,
+    select,
+    update,
+)
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.models import Follow, Media, Tweet
-from src.database.repositories.user_repository import get_user_id_by
+from src.cache import tweet_cache
+from src.database.models import Follow, Like, Media, MediaDerivative, Tweet, User
+from src.database.outbox import (
+    LIKE_ADDED,
+    LIKE_REMOVED,
+    TWEET_CREATED,
+    TWEET_DELETED,
+    add_event,
+    register_handler,
+)
+from src.database.repositories.media_repository import (
+    filter_unshared_files,
+    release_media_files,
+)
+from src.database.repositories.user_repository import get_user_id_by, is_user_exist
+from src.database.sharding import gather_shards
+from src.database.unit_of_work import on_commit
+from src.functions import get_media_url
 from src.handlers.exceptions import (
     IntegrityViolationException,
     PermissionException,
     RowNotFoundException,
 )
 from src.schemas.base_schemas import SuccessSchema
-from src.schemas.like_schemas import LikeSchema
 from src.schemas.tweet_schemas import (
     NewTweetResponseSchema,
     TweetBaseSchema,
-    TweetResponseSchema,
+    TweetDetailResponseSchema,
+    TweetPageResponseSchema,
     TweetSchema,
 )
-from src.schemas.user_schemas import UserSchema
+from src.storage import get_storage
+from src.trends import trend_tracker
+
+PURGE_BATCH_SIZE = 500
+
+TWEET_EXISTS = select(
+    exists().where(Tweet.id == bindparam("tweet_id"), Tweet.deleted_at.is_(None))
+)
+
+
+TweetRows = Select[Tuple[int, str, int, str, datetime]]
+
+
+def select_tweet_rows() -> TweetRows:
+    """
+    Select the columns of published tweets and their authors.
+
+    Returns:
+        Select: A query of `(tweet id, content, author id, author name,
+        creation time)` rows to be narrowed down by the caller and passed to
+        `collect_tweets_data`.
+    """
+    return (
+        select(Tweet.id, Tweet.tweet_data, User.id, User.name, Tweet.created_at)
+        .join(User, User.id == Tweet.author_id)
+        .where(Tweet.deleted_at.is_(None))
+    )
 
 
-async def collect_tweet_data(tweet: "Tweet") -> TweetSchema:
+@register_handler(TWEET_CREATED)
+async def count_hashtags(payload: Dict[str, Any]) -> None:
     """
-    Collect detailed tweet data including attachments and likes.
+    Count the hashtags of a new tweet towards the trends of this worker.
 
-    This function retrieves detailed information about the tweet, including
-    media attachments and associated likes.
+    Every event is dispatched by a single worker, and the other workers add
+    its counters from the trends snapshots.
+    """
+    trend_tracker.add(payload["tweet_data"])
+
+
+@register_handler(TWEET_DELETED)
+@register_handler(LIKE_ADDED)
+@register_handler(LIKE_REMOVED)
+async def invalidate_cached_tweet(payload: Dict[str, Any]) -> None:
+    """
+    Drop the cached data of a tweet changed by a committed write.
+
+    The request that made the change already drops it right after the commit;
+    the event drops it again even if that callback never ran. Caches of the
+    other workers expire after `TWEET_CACHE_TTL_SECONDS`.
+    """
+    tweet_cache.invalidate(payload["tweet_id"])
+
+
+async def collect_tweets_data(
+    query: TweetRows, session: AsyncSession
+) -> List[TweetSchema]:
+    """
+    Collect detailed data of the selected tweets including attachments and likes.
 
     Args:
-        tweet (Tweet): The tweet object containing the tweet data.
+        query (Select): A query built with `select_tweet_rows`.
+        session (AsyncSession): The database session used for executing queries.
 
     Returns:
-        TweetSchema: A schema containing detailed tweet information including
-        content, attachments, author, and likes.
+        List[TweetSchema]: Schemas containing detailed tweet information
+        including content, attachments, author, and likes, in the order of
+        the query.
     """
+    return [tweet for _, tweet in await collect_dated_tweets(query, session)]
 
-    attachments = [media.link for media in tweet.media]
-    author_data = UserSchema.model_validate(tweet.author)
-    likes_data = [LikeSchema.model_validate(like) for like in tweet.likes]
 
-    return TweetSchema(
-        id=tweet.id,
-        content=tweet.tweet_data,
-        attachments=attachments,
-        author=author_data,
-        likes=likes_data,
-    )
+async def collect_dated_tweets(
+    query: TweetRows, session: AsyncSession
+) -> List[Tuple[datetime, TweetSchema]]:
+    """
+    Collect detailed data of the selected tweets along with their creation time.
+
+    Only the columns needed for the response are selected, as plain rows, so
+    no ORM entities are created, tracked in the identity map or refreshed.
+    Media with their thumbnails and likes of all tweets are fetched with one
+    query each. The rows of a tweet are collected into plain data first, so
+    the whole tweet is validated in a single call.
+
+    Args:
+        query (Select): A query built with `select_tweet_rows`.
+        session (AsyncSession): The database session used for executing queries.
+
+    Returns:
+        List[Tuple[datetime, TweetSchema]]: The creation time and the detailed
+        data of every tweet, in the order of the query.
+    """
+    tweets = (await session.execute(query)).tuples().all()
+    tweet_ids = [tweet_id for tweet_id, *_ in tweets]
+    media: DefaultDict[Optional[int], Dict[int, Dict[str, Any]]] = defaultdict(dict)
+    likes: DefaultDict[int, List[Dict[str, Any]]] = defaultdict(list)
+
+    if tweet_ids:
+        media_query = (
+            select(
+                Media.tweet_id,
+                Media.id,
+                MediaDerivative.kind,
+                MediaDerivative.width,
+                MediaDerivative.height,
+            )
+            .outerjoin(MediaDerivative, MediaDerivative.sha256 == Media.sha256)
+            .where(Media.tweet_id.in_(tweet_ids))
+            .order_by(Media.id, MediaDerivative.width)
+        )
+        media_rows = (await session.execute(media_query)).tuples()
+        for tweet_id, media_id, kind, width, height in media_rows:
+            media_data = media[tweet_id].setdefault(
+                media_id,
+                {"id": media_id, "link": get_media_url(media_id), "derivatives": []},
+            )
+            if kind is not None:
+                media_data["derivatives"].append(
+                    {
+                        "kind": kind,
+                        "width": width,
+                        "height": height,
+                        "link": get_media_url(media_id, width),
+                    }
+                )
+
+        likes_query = (
+            select(Like.tweet_id, Like.user_id, User.name)
+            .join(User, User.id == Like.user_id)
+            .where(Like.tweet_id.in_(tweet_ids))
+            .order_by(Like.id)
+        )
+        like_rows = (await session.execute(likes_query)).tuples()
+        for tweet_id, user_id, name in like_rows:
+            likes[tweet_id].append({"user_id": user_id, "name": name})
+
+    tweets_data = []
+    for tweet_id, content, author_id, author_name, created_at in tweets:
+        tweet_media = list(media[tweet_id].values())
+        tweet_data = TweetSchema.model_validate(
+            {
+                "id": tweet_id,
+                "content": content,
+                "attachments": [media_data["link"] for media_data in tweet_media],
+                "media": tweet_media,
+                "author": {"id": author_id, "name": author_name},
+                "likes": likes[tweet_id],
+            }
+        )
+        tweets_data.append((created_at, tweet_data))
+    return tweets_data
 
 
 async def is_tweet_exist(tweet_id: int, session: AsyncSession) -> bool:
@@ -64,43 +217,197 @@ async def is_tweet_exist(tweet_id: int, session: AsyncSession) -> bool:
     Returns:
         bool: True if the tweet exists, False otherwise.
     """
-    query = select(exists().where(Tweet.id == tweet_id))
-    response = await session.scalar(query)
+    response = await session.scalar(TWEET_EXISTS, {"tweet_id": tweet_id})
     return response is not None and response
 
 
+async def get_tweet(
+    username: str, tweet_id: int, session: AsyncSession
+) -> TweetDetailResponseSchema:
+    """
+    Get a single tweet by its ID.
+
+    The tweet data is served from the tweet cache and loaded from the database
+    only on a miss. The cache version is captured before the database read, so
+    data loaded concurrently with an invalidation is never cached. The session
+    must read the primary database: a lagging replica would fill the cache
+    with a version that an invalidation has already dropped.
+
+    Args:
+        username (str): The username of the user requesting the tweet.
+        tweet_id (int): The ID of the tweet to retrieve.
+        session (AsyncSession): The database session used for executing queries.
+
+    Returns:
+        TweetDetailResponseSchema: A schema containing the detailed tweet data.
+
+    Raises:
+        RowNotFoundException: If the user or the tweet does not exist.
+    """
+    if not await get_user_id_by(username, session):
+        raise RowNotFoundException()
+
+    cached = tweet_cache.get(tweet_id)
+    if cached is not None:
+        return TweetDetailResponseSchema.model_construct(tweet=cached)
+
+    version = tweet_cache.version(tweet_id)
+    query = select_tweet_rows().where(Tweet.id == tweet_id)
+    tweets_data = await collect_tweets_data(query, session)
+    if not tweets_data:
+        raise RowNotFoundException("Tweet with this ID does not exist")
+
+    tweet_data = tweets_data[0]
+    tweet_cache.set(tweet_id, version, tweet_data)
+
+    return TweetDetailResponseSchema.model_construct(tweet=tweet_data)
+
+
 async def get_tweets_selection(
-    username: str, session: AsyncSession
-) -> TweetResponseSchema:
+    username: str,
+    session: AsyncSession,
+    sessions: Optional[Sequence[AsyncSession]] = None,
+    limit: int = 20,
+    before_id: Optional[int] = None,
+) -> TweetPageResponseSchema:
     """
-    Get all tweets for a user.
+    Get a page of tweets for a user.
 
-    This function retrieves all tweets of a user and their followees.
+    This function retrieves the tweets of the users the user follows, newest
+    first, with keyset pagination on the tweet ID. Follows are stored next to
+    the tweets of the followed user, so with several shards the same query
+    runs on every shard concurrently and the results are merged by the tweet
+    creation time.
+
+    Tweet IDs grow with time within a database, so a shard returns its newest
+    tweets below a bound on `tweets.id`, which prunes the partitions of newer
+    tweets, and stops at `limit` rows. With several shards only the shard that
+    holds the cursor tweet is bounded by its ID; the other shards are bounded
+    by the creation time of the cursor tweet.
 
     Args:
         username (str): The username of the user whose tweets are to be retrieved.
         session (AsyncSession): The database session used for executing queries.
+        sessions (Optional[Sequence[AsyncSession]]): The sessions of all shards,
+                                                     only `session` if not provided.
+        limit (int): The maximum number of tweets on the page.
+        before_id (Optional[int]): Return only tweets older than the tweet with
+                                   this ID, or the newest tweets if not provided.
 
     Returns:
-        TweetResponseSchema: A schema containing a list of tweets with detailed data.
+        TweetPageResponseSchema: A schema containing the tweets and the cursor
+        of the next page.
 
     Raises:
-        RowNotFoundException: If the user is not found in the database.
+        RowNotFoundException: If the user or, with several shards, the cursor
+                              tweet is not found in the database.
     """
     user_id = await get_user_id_by(username, session)
     if not user_id:
         raise RowNotFoundException()
 
     query = (
-        select(Tweet)
+        select_tweet_rows()
         .join(Follow, Follow.following_id == Tweet.author_id)
         .where(Follow.follower_id == user_id)
+        .order_by(Tweet.id.desc())
+        .limit(limit)
     )
-    tweets = (await session.scalars(query)).unique().all()
+    if sessions is None or len(sessions) == 1:
+        if before_id is not None:
+            query = query.where(Tweet.id < before_id)
+        tweets_data = await collect_tweets_data(query, session)
+    else:
+        shard_queries = [query] * len(sessions)
+        if before_id is not None:
+            cursor_query = select(Tweet.created_at).where(Tweet.id == before_id)
+            cursor_times = await gather_shards(
+                sessions, lambda shard_session: shard_session.scalar(cursor_query)
+            )
+            cursor_shards = [
+                shard
+                for shard, created_at in enumerate(cursor_times)
+                if created_at is not None
+            ]
+            if not cursor_shards:
+                raise RowNotFoundException("Tweet with this ID does not exist")
+            cursor_shard = cursor_shards[0]
+            cursor_created_at = cursor_times[cursor_shard]
+            shard_queries = [
+                query.where(
+                    Tweet.id < before_id
+                    if shard == cursor_shard
+                    else or_(
+                        Tweet.created_at < cursor_created_at,
+                        and_(
+                            Tweet.created_at == cursor_created_at,
+                            Tweet.id < before_id,
+                        ),
+                    )
+                )
+                for shard in range(len(sessions))
+            ]
+
+        shard_tweets = await asyncio.gather(
+            *(
+                collect_dated_tweets(shard_query, shard_session)
+                for shard_query, shard_session in zip(shard_queries, sessions)
+            )
+        )
+        merged = heapq.merge(
+            *shard_tweets,
+            key=lambda dated: (dated[0], dated[1].id),
+            reverse=True,
+        )
+        tweets_data = [tweet for _, tweet in islice(merged, limit)]
+
+    next_cursor = tweets_data[-1].id if len(tweets_data) == limit else None
+    return TweetPageResponseSchema.model_construct(
+        tweets=tweets_data, next_cursor=next_cursor
+    )
+
+
+async def get_user_tweets(
+    user_id: int,
+    session: AsyncSession,
+    limit: int = 20,
+    before_id: Optional[int] = None,
+) -> TweetPageResponseSchema:
+    """
+    Get a page of tweets authored by a user, newest first.
 
-    tweet_schema = [await collect_tweet_data(tweet) for tweet in tweets]
+    Pages are fetched with keyset pagination on the tweet ID, which is served
+    by a range scan over the `(author_id, id DESC)` index instead of an
+    ever-growing OFFSET.
 
-    return TweetResponseSchema(tweets=tweet_schema)
+    Args:
+        user_id (int): The ID of the author.
+        session (AsyncSession): The database session used for executing queries.
+        limit (int): The maximum number of tweets on the page.
+        before_id (Optional[int]): Return only tweets with an ID lower than this
+                                   cursor, or the newest tweets if not provided.
+
+    Returns:
+        TweetPageResponseSchema: A schema containing the tweets and the cursor
+        of the next page.
+
+    Raises:
+        RowNotFoundException: If the user is not found in the database.
+    """
+    if not await is_user_exist(user_id, session):
+        raise RowNotFoundException()
+
+    query = select_tweet_rows().where(Tweet.author_id == user_id)
+    if before_id is not None:
+        query = query.where(Tweet.id < before_id)
+    query = query.order_by(Tweet.id.desc()).limit(limit)
+
+    tweets_data = await collect_tweets_data(query, session)
+    next_cursor = tweets_data[-1].id if len(tweets_data) == limit else None
+
+    return TweetPageResponseSchema.model_construct(
+        tweets=tweets_data, next_cursor=next_cursor
+    )
 
 
 async def add_tweet(
@@ -134,6 +441,14 @@ async def add_tweet(
     except IntegrityError as exc:
         await session.rollback()
         raise IntegrityViolationException(str(exc))
+
+    add_event(
+        session,
+        TWEET_CREATED,
+        tweet_id=new_tweet.id,
+        author_id=user_id,
+        tweet_data=new_tweet.tweet_data,
+    )
     return NewTweetResponseSchema(tweet_id=new_tweet.id)
 
 
@@ -155,7 +470,6 @@ async def save_tweet_and_update_media(
     if media_ids:
         query = update(Media).where(Media.id.in_(media_ids)).values(tweet_id=tweet.id)
         await session.execute(query)
-    await session.commit()
 
 
 async def delete_tweet(
@@ -164,8 +478,10 @@ async def delete_tweet(
     """
     Delete a tweet.
 
-    This function deletes the tweet specified by `tweet_id` if the user is
-    the author of the tweet.
+    This function soft-deletes the tweet specified by `tweet_id` if the user is
+    the author of the tweet. The tweet is hidden from every read path at once,
+    while its likes, media and the row itself are removed later by
+    `purge_deleted_tweets`, outside of the request.
 
     Args:
         username (str): The username of the user who is deleting the tweet.
@@ -185,9 +501,14 @@ async def delete_tweet(
         raise RowNotFoundException()
 
     query = (
-        delete(Tweet)
+        update(Tweet)
         .returning(Tweet.id)
-        .where(Tweet.id == tweet_id, Tweet.author_id == user_id)
+        .where(
+            Tweet.id == tweet_id,
+            Tweet.author_id == user_id,
+            Tweet.deleted_at.is_(None),
+        )
+        .values(deleted_at=func.now())
     )
     request = await session.execute(query)
     if not request.fetchone():
@@ -196,9 +517,87 @@ async def delete_tweet(
         )
 
     try:
-        await session.commit()
+        await session.flush()
     except IntegrityError as exc:
         await session.rollback()
         raise IntegrityViolationException(str(exc))
 
+    on_commit(session, tweet_cache.invalidate, tweet_id)
+    add_event(session, TWEET_DELETED, tweet_id=tweet_id, author_id=user_id)
     return SuccessSchema()
+
+
+async def purge_deleted_tweets(
+    session: AsyncSession,
+    batch_size: int = PURGE_BATCH_SIZE,
+    other_sessions: Sequence[AsyncSession] = (),
+) -> int:
+    """
+    Permanently remove a batch of soft-deleted tweets.
+
+    Likes and media rows of the batch are deleted in chunks of at most
+    `batch_size` rows, each chunk in its own short transaction, so that no
+    single statement holds locks on a large number of rows. Stored media files
+    are removed from disk once no media entry references them any more, before
+    the chunk is committed.
+
+    Args:
+        session (AsyncSession): The database session used for executing queries.
+        batch_size (int): The maximum number of tweets, and of likes or media rows
+                          per statement, to remove.
+        other_sessions (Sequence[AsyncSession]): The sessions of the other
+                                                 shards, which share the files.
+
+    Returns:
+        int: The number of tweets purged, 0 when there is nothing left to purge.
+    """
+    query = (
+        select(Tweet.id)
+        .where(Tweet.deleted_at.is_not(None))
+        .order_by(Tweet.deleted_at)
+        .limit(batch_size)
+    )
+    tweet_ids = (await session.scalars(query)).all()
+    if not tweet_ids:
+        return 0
+
+    while True:
+        likes = select(Like.id).where(Like.tweet_id.in_(tweet_ids)).limit(batch_size)
+        # The tweet IDs let a partitioned likes table skip other partitions
+        request = await session.execute(
+            delete(Like)
+            .where(Like.tweet_id.in_(tweet_ids), Like.id.in_(likes))
+            .returning(Like.id)
+        )
+        deleted_likes = len(request.fetchall())
+        await session.commit()
+        if deleted_likes < batch_size:
+            break
+
+    while True:
+        media = select(Media.id).where(Media.tweet_id.in_(tweet_ids)).limit(batch_size)
+        deleted_media = (
+            await session.execute(
+                delete(Media)
+                .where(Media.id.in_(media))
+                .returning(Media.link, Media.sha256)
+            )
+        ).all()
+        unreferenced = await release_media_files(
+            [sha256 for _, sha256 in deleted_media], session
+        )
+        await get_storage().remove(
+            await filter_unshared_files(
+                [link for link, sha256 in deleted_media if sha256 is None]
+                + unreferenced,
+                other_sessions,
+            )
+        )
+        await session.commit()
+        if len(deleted_media) < batch_size:
+            break
+
+    await session.execute(delete(Tweet).where(Tweet.id.in_(tweet_ids)))
+    await session.commit()
+
+    return len(tweet_ids)
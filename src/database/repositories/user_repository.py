@@ -1,15 +1,21 @@
-from typing import Optional, Sequence
+from functools import partial
+from typing import Optional, Sequence, Tuple
 
-from sqlalchemy import exists, select
+from sqlalchemy import Row, bindparam, exists, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import Follow, User
+from src.database.repositories.media_repository import insert_into
+from src.database.sharding import gather_shards
 from src.handlers.exceptions import RowNotFoundException
-from src.schemas.user_schemas import (
-    UserResponseSchema,
-    UserSchema,
-    UserWithFollowSchema,
-)
+from src.schemas.user_schemas import UserResponseSchema
+
+# Hot statements are built once with bound parameters: their cache keys are
+# memoized, so every call goes straight to the compiled SQL cache
+USER_EXISTS = select(exists().where(User.id == bindparam("user_id")))
+USER_ID_BY_USERNAME = select(User.id).where(User.username == bindparam("username"))
+
+USER_REPLICATION_BATCH_SIZE = 1000
 
 
 async def is_user_exist(user_id: int, session: AsyncSession) -> bool:
@@ -25,8 +31,7 @@ async def is_user_exist(user_id: int, session: AsyncSession) -> bool:
     Returns:
         bool: True if the user exists, False otherwise.
     """
-    query = select(exists().where(User.id == user_id))
-    response = await session.scalar(query)
+    response = await session.scalar(USER_EXISTS, {"user_id": user_id})
     return response is not None and response
 
 
@@ -43,11 +48,12 @@ async def get_user_id_by(username: str, session: AsyncSession) -> Optional[int]:
     Returns:
         Optional[int]: The user ID if found, or None if the user does not exist.
     """
-    query = select(User.id).where(User.username == username)
-    return await session.scalar(query)
+    return await session.scalar(USER_ID_BY_USERNAME, {"username": username})
 
 
-async def get_user_followers(user_id: int, session: AsyncSession) -> Sequence["User"]:
+async def get_user_followers(
+    user_id: int, session: AsyncSession
+) -> Sequence[Row[Tuple[int, str]]]:
     """
     Get the followers of a user.
 
@@ -58,17 +64,19 @@ async def get_user_followers(user_id: int, session: AsyncSession) -> Sequence["U
         session (AsyncSession): The database session used for executing queries.
 
     Returns:
-        Sequence[User]: A sequence of user objects representing the followers.
+        Sequence[Row]: `(id, name)` rows of the followers.
     """
     query = (
-        select(User)
+        select(User.id, User.name)
         .join(Follow, Follow.follower_id == User.id)
         .where(Follow.following_id == user_id)
     )
-    return (await session.scalars(query)).all()
+    return (await session.execute(query)).all()
 
 
-async def get_user_following(user_id: int, session: AsyncSession) -> Sequence["User"]:
+async def get_user_following(
+    user_id: int, session: AsyncSession
+) -> Sequence[Row[Tuple[int, str]]]:
     """
     Get the users a user is following.
 
@@ -79,33 +87,39 @@ async def get_user_following(user_id: int, session: AsyncSession) -> Sequence["U
         session (AsyncSession): The database session used for executing queries.
 
     Returns:
-        Sequence[User]: A sequence of user objects representing the users that the user is following.
+        Sequence[Row]: `(id, name)` rows of the users that the user is following.
     """
     query = (
-        select(User)
+        select(User.id, User.name)
         .join(Follow, Follow.following_id == User.id)
         .where(Follow.follower_id == user_id)
     )
-    return (await session.scalars(query)).all()
+    return (await session.execute(query)).all()
 
 
 async def get_user_with_followers_and_following(
     session: AsyncSession,
     username: Optional[str] = None,
     user_id: Optional[int] = None,
+    sessions: Optional[Sequence[AsyncSession]] = None,
 ) -> UserResponseSchema:
     """
     Get user with their followers and following list.
 
     This function retrieves detailed information about a user, including their followers
-    and the users they are following.
+    and the users they are following. Only the ID and name columns are selected,
+    so no user entities are loaded into the session. Follows are stored on the
+    shard of the followed user, so the following list is gathered from all
+    shards concurrently.
 
     Args:
-        session (AsyncSession): The database session used for executing queries.
+        session (AsyncSession): The database session of the user's shard.
         username (Optional[str]): The username of the user (optional, must be used
                                    if `user_id` is not provided).
         user_id (Optional[int]): The ID of the user (optional, must be used if
                                  `username` is not provided).
+        sessions (Optional[Sequence[AsyncSession]]): The sessions of all shards,
+                                                     only `session` if not provided.
 
     Returns:
         UserResponseSchema: A schema containing the user data along with their followers
@@ -115,7 +129,7 @@ async def get_user_with_followers_and_following(
         RowNotFoundException: If neither `username` nor `user_id` is provided, or if
                                no user matching the criteria is found.
     """
-    query = select(User)
+    query = select(User.id, User.name)
     if username:
         query = query.where(User.username == username)
     elif user_id:
@@ -123,17 +137,85 @@ async def get_user_with_followers_and_following(
     else:
         raise RowNotFoundException()
 
-    user = (await session.scalars(query)).one_or_none()
+    user = (await session.execute(query)).one_or_none()
     if not user:
         raise RowNotFoundException()
 
     followers = await get_user_followers(user.id, session)
-    followings = await get_user_following(user.id, session)
-
-    return UserResponseSchema(
-        user=UserWithFollowSchema(
-            **UserSchema.model_validate(user).model_dump(),
-            followers=[UserSchema.model_validate(follow) for follow in followers],
-            following=[UserSchema.model_validate(follow) for follow in followings],
+    followings = [
+        follow
+        for shard_followings in await gather_shards(
+            sessions or [session], partial(get_user_following, user.id)
         )
+        for follow in shard_followings
+    ]
+
+    return UserResponseSchema.model_validate(
+        {
+            "user": {
+                "id": user.id,
+                "name": user.name,
+                "followers": [
+                    {"id": follow.id, "name": follow.name} for follow in followers
+                ],
+                "following": [
+                    {"id": follow.id, "name": follow.name} for follow in followings
+                ],
+            }
+        }
     )
+
+
+async def replicate_users(
+    source: AsyncSession,
+    targets: Sequence[AsyncSession],
+    batch_size: int = USER_REPLICATION_BATCH_SIZE,
+) -> int:
+    """
+    Copy the users of the primary database to the other shards.
+
+    Users are created on the primary database only, while every shard joins
+    user names locally and references users by foreign keys, so each of them
+    keeps a copy of the users table. Users are never changed once created, so
+    only users with an ID above the highest one that every shard already has
+    are copied, in batches ordered by ID. Users a shard already has are
+    skipped.
+
+    Args:
+        source (AsyncSession): The session of the primary database.
+        targets (Sequence[AsyncSession]): The sessions of the other shards.
+        batch_size (int): The maximum number of users copied per batch.
+
+    Returns:
+        int: The number of users read from the primary database.
+    """
+    if not targets:
+        return 0
+
+    last_ids = [await target.scalar(select(func.max(User.id))) for target in targets]
+    after_id = min(last_id or 0 for last_id in last_ids)
+    copied = 0
+    while True:
+        query = (
+            select(User.id, User.username, User.name)
+            .where(User.id > after_id)
+            .order_by(User.id)
+            .limit(batch_size)
+        )
+        users = [row._asdict() for row in (await source.execute(query)).all()]
+        if not users:
+            break
+
+        for target in targets:
+            await target.execute(
+                insert_into(User, target).on_conflict_do_nothing(
+                    index_elements=[User.id]
+                ),
+                users,
+            )
+            await target.commit()
+        copied += len(users)
+        after_id = users[-1]["id"]
+        if len(users) < batch_size:
+            break
+    return copied
@@ -1,14 +1,202 @@
-from typing import AsyncGenerator
+import math
+import time
+from contextlib import AsyncExitStack
+from typing import AsyncGenerator, List
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from src.database.config import settings
+from src.database.pool import InstrumentedPool
+from src.database.repositories.user_repository import get_user_id_by
+from src.database.sharding import ShardRouter
+from src.database.unit_of_work import SAFE_METHODS, request_unit_of_work
+
+# Time of the last change of a client, in seconds since the epoch
+LAST_WRITE_COOKIE = "last_write"
+
+
+def create_engine(url: str, name: str) -> AsyncEngine:
+    """Create an engine with the pool settings, its metrics kept under `name`."""
+    return create_async_engine(
+        url,
+        poolclass=InstrumentedPool,
+        pool_logging_name=name,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+    )
+
 
 DB_URL = settings.get_db_url
-engine = create_async_engine(DB_URL)
+engine = create_engine(DB_URL, "primary")
 async_session = async_sessionmaker(engine, expire_on_commit=False)
 
+# Without a replica every read goes to the primary
+REPLICA_DB_URL = settings.get_replica_db_url
+read_engine = create_engine(REPLICA_DB_URL, "replica") if REPLICA_DB_URL else engine
+async_read_session = async_sessionmaker(read_engine, expire_on_commit=False)
+
+
+# Shards after the primary database, which is shard 0
+shard_engines = [
+    create_engine(url, f"shard{number}")
+    for number, url in enumerate(settings.get_shard_db_urls, 1)
+]
+shard_sessions = [
+    async_sessionmaker(shard_engine, expire_on_commit=False)
+    for shard_engine in shard_engines
+]
+shard_router = ShardRouter(1 + len(shard_sessions))
+
+
+def get_shard_session_makers() -> List[async_sessionmaker[AsyncSession]]:
+    """Return the session factories of all shards, the primary database first."""
+    return [async_session, *shard_sessions]
+
+
+def wrote_recently(request: Request) -> bool:
+    """Check whether the client changed data within the read-your-writes window."""
+    try:
+        last_write = float(request.cookies.get(LAST_WRITE_COOKIE, ""))
+    except ValueError:
+        return False
+    return time.time() - last_write < settings.DB_READ_YOUR_WRITES_SECONDS
+
+
+class ReadYourWritesMiddleware:
+    """
+    Send the time of the last change of a client back to it in a cookie.
+
+    Successful requests that change data set the cookie, and reads of the
+    client go to the primary database while it is within the read-your-writes
+    window. The window travels with the client instead of being kept in a
+    worker, so it holds whichever worker or instance serves the next read.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                MutableHeaders(scope=message).append(
+                    "Set-Cookie",
+                    f"{LAST_WRITE_COOKIE}={time.time():.3f}; "
+                    f"Max-Age={math.ceil(settings.DB_READ_YOUR_WRITES_SECONDS)}; "
+                    "Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
 
-async def create_session() -> AsyncGenerator[AsyncSession, None]:
-    async with async_session() as session:
+
+async def get_request_shard(request: Request) -> int:
+    """
+    Find the shard that owns the data of a request.
+
+    Routes of a tweet or a media go to the shard of its ID, and routes of a
+    user to the shard of that user. Other routes act on behalf of the user of
+    the API key, whose ID is looked up in the copy of the users table on the
+    primary database. The shard is kept in the request state.
+    """
+    if shard_router.count == 1:
+        return 0
+    shard = getattr(request.state, "shard", None)
+    if shard is not None:
+        return shard
+
+    params = request.path_params
+    for name in ("tweet_id", "media_id"):
+        if str(params.get(name, "")).isdigit():
+            shard = shard_router.shard_of_id(int(params[name]))
+            break
+    else:
+        if str(params.get("user_id", "")).isdigit():
+            shard = shard_router.shard_of_user(int(params["user_id"]))
+        else:
+            shard = 0
+            api_key = request.headers.get("api-key")
+            if api_key is not None:
+                async with async_read_session() as session:
+                    user_id = await get_user_id_by(api_key, session)
+                if user_id is not None:
+                    shard = shard_router.shard_of_user(user_id)
+
+    request.state.shard = shard
+    return shard
+
+
+async def create_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Open the unit of work of a request on the primary database of its shard.
+
+    Requests that change data are committed once, after the route returns, and
+    rolled back if it raises. `ReadYourWritesMiddleware` then starts the
+    read-your-writes window of the client.
+    """
+    session_maker = get_shard_session_makers()[await get_request_shard(request)]
+    async with request_unit_of_work(request, session_maker) as session:
+        yield session
+
+
+async def create_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Open a session for a read-only request on its shard.
+
+    The primary database is read through its replica, except for clients that
+    changed data within the read-your-writes window, so their own changes are
+    visible despite replication lag. Other shards have no replicas.
+    """
+    shard = await get_request_shard(request)
+    if shard != 0:
+        session_maker = get_shard_session_makers()[shard]
+    elif wrote_recently(request):
+        session_maker = async_session
+    else:
+        session_maker = async_read_session
+    async with request_unit_of_work(request, session_maker) as session:
         yield session
+
+
+async def create_shard_read_sessions(
+    request: Request, session: AsyncSession = Depends(create_read_session)
+) -> AsyncGenerator[List[AsyncSession], None]:
+    """
+    Open read sessions on every shard, for queries gathered from all of them.
+
+    The session of the request is used for its own shard. Sessions connect on
+    their first query, so a single database adds no connections.
+    """
+    shard = await get_request_shard(request)
+    async with AsyncExitStack() as stack:
+        sessions = [
+            (
+                session
+                if number == shard
+                else await stack.enter_async_context(
+                    request_unit_of_work(request, session_maker)
+                )
+            )
+            for number, session_maker in enumerate(get_shard_session_makers())
+        ]
+        yield sessions
+
+
+async def get_session_maker(request: Request) -> async_sessionmaker[AsyncSession]:
+    """Return the session factory of the request shard for work that outlives it."""
+    return get_shard_session_makers()[await get_request_shard(request)]
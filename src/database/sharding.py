@@ -0,0 +1,117 @@
+"""
+Horizontal sharding of user data across several databases.
+
+Data is placed so that every request changes a single shard, and the feed
+is built by running the same query on every shard:
+
+- tweets live on the shard of their author, and media on the shard of the
+  user who uploaded them;
+- likes live on the shard of the liked tweet;
+- follows live on the shard of the followed user, next to the tweets that
+  the follow brings into the feed of the follower;
+- users are reference data that every shard holds a copy of, so queries
+  join user names locally. Users are created on the primary database, and
+  `replicate_users_job` copies new ones to the other shards at startup and
+  every few seconds.
+
+Users are mapped to shards by their ID. Tweet and media IDs are allocated
+from a separate range on every shard, so the shard of a tweet or a media is
+known from its ID alone.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from src.database.config import settings
+
+T = TypeVar("T")
+
+# Tables whose IDs are exposed by the API and allocated per shard
+SHARDED_ID_TABLES = ("tweets", "medias")
+
+
+class ShardRouter:
+    """Maps users, tweets and media to the number of the shard that owns them."""
+
+    def __init__(self, count: int, id_span: int = settings.DB_SHARD_ID_SPAN):
+        self.count = count
+        self.id_span = id_span
+
+    def shard_of_user(self, user_id: int) -> int:
+        """Return the shard of a user, which holds the user's tweets and follows."""
+        return user_id % self.count
+
+    def shard_of_id(self, entity_id: int) -> int:
+        """Return the shard a tweet or media ID was allocated on."""
+        return min(entity_id // self.id_span, self.count - 1)
+
+    def id_range(self, shard: int) -> Tuple[int, Optional[int]]:
+        """
+        Return the IDs allocated on a shard: from the start up to, not
+        including, the end. The last shard has no end, so a single database
+        allocates IDs as before.
+        """
+        start = max(shard * self.id_span, 1)
+        end = (shard + 1) * self.id_span if shard < self.count - 1 else None
+        return start, end
+
+    async def reserve_id_ranges(self, engines: Sequence[AsyncEngine]) -> None:
+        """Make the database of every shard allocate IDs from the shard range."""
+        for shard, engine in enumerate(engines):
+            start, end = self.id_range(shard)
+            async with engine.begin() as connection:
+                for table in SHARDED_ID_TABLES:
+                    await reserve_id_range(connection, table, start, end)
+
+
+async def reserve_id_range(
+    connection: AsyncConnection, table: str, start: int, end: Optional[int]
+) -> None:
+    """
+    Make new rows of `table` take their IDs from the range of the shard.
+
+    On PostgreSQL the sequence of the table is moved to the range start and
+    capped at its end, so inserts fail rather than take IDs of the next
+    shard. On SQLite, used by the tests, the next AUTOINCREMENT value is moved
+    to the range start.
+    """
+    if connection.dialect.name == "postgresql":
+        sequence = await connection.scalar(
+            text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}
+        )
+        await connection.execute(
+            text(
+                f"SELECT setval(:sequence, greatest(:start, "
+                f"(SELECT coalesce(max(id), 0) + 1 FROM {table})), false)"
+            ),
+            {"sequence": sequence, "start": start},
+        )
+        if end is not None:
+            await connection.execute(
+                text(f"ALTER SEQUENCE {sequence} MAXVALUE {end - 1}")
+            )
+        return
+
+    current = await connection.scalar(
+        text("SELECT seq FROM sqlite_sequence WHERE name = :table"), {"table": table}
+    )
+    if current is None:
+        await connection.execute(
+            text("INSERT INTO sqlite_sequence (name, seq) VALUES (:table, :seq)"),
+            {"table": table, "seq": start - 1},
+        )
+    elif current < start - 1:
+        await connection.execute(
+            text("UPDATE sqlite_sequence SET seq = :seq WHERE name = :table"),
+            {"table": table, "seq": start - 1},
+        )
+
+
+async def gather_shards(
+    sessions: Sequence[AsyncSession], work: Callable[[AsyncSession], Awaitable[T]]
+) -> List[T]:
+    """Run `work` on the session of every shard concurrently."""
+    return list(await asyncio.gather(*(work(session) for session in sessions)))
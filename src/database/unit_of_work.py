@@ -0,0 +1,104 @@
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, AsyncContextManager, AsyncIterator, Callable, Dict, NamedTuple
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, SessionTransaction
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+BACKGROUND_ENDPOINT = "background"
+
+ENDPOINT_KEY = "endpoint"
+ON_COMMIT_KEY = "on_commit"
+
+
+class TransactionCounts(NamedTuple):
+    """Transactions of an endpoint in this worker process."""
+
+    commits: int
+    rollbacks: int
+
+
+commit_counts: Counter[str] = Counter()
+rollback_counts: Counter[str] = Counter()
+
+
+def get_transaction_counts() -> Dict[str, TransactionCounts]:
+    """Return the commit and rollback counts of every endpoint, sorted by name."""
+    return {
+        endpoint: TransactionCounts(commit_counts[endpoint], rollback_counts[endpoint])
+        for endpoint in sorted(commit_counts.keys() | rollback_counts.keys())
+    }
+
+
+def on_commit(session: AsyncSession, callback: Callable[..., Any], *args: Any) -> None:
+    """
+    Call `callback(*args)` once the transaction of `session` is committed.
+
+    Used for side effects outside of the database, such as cache invalidation,
+    so they never run for changes that are rolled back.
+    """
+    session.info.setdefault(ON_COMMIT_KEY, []).append((callback, args))
+
+
+@event.listens_for(Session, "after_commit")
+def run_commit_callbacks(session: Session) -> None:
+    commit_counts[session.info.get(ENDPOINT_KEY, BACKGROUND_ENDPOINT)] += 1
+    for callback, args in session.info.pop(ON_COMMIT_KEY, []):
+        callback(*args)
+
+
+@event.listens_for(Session, "after_rollback")
+def count_rollback(session: Session) -> None:
+    rollback_counts[session.info.get(ENDPOINT_KEY, BACKGROUND_ENDPOINT)] += 1
+
+
+@event.listens_for(Session, "after_transaction_end")
+def drop_commit_callbacks(session: Session, transaction: SessionTransaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(ON_COMMIT_KEY, None)
+
+
+def get_endpoint(request: Request) -> str:
+    """Return the metrics label of the request: its method and route template."""
+    route = request.scope.get("route")
+    path = getattr(route, "path", request.url.path)
+    return f"{request.method} {path}"
+
+
+@asynccontextmanager
+async def unit_of_work(
+    session_maker: async_sessionmaker[AsyncSession], endpoint: str, commit: bool
+) -> AsyncIterator[AsyncSession]:
+    """
+    Open a session whose changes are committed at most once, at the end.
+
+    Repository functions only flush their changes. The transaction is rolled
+    back if the block raises, and committed when it completes and `commit` is
+    set, so a request is applied as a whole or not at all.
+
+    Args:
+        session_maker (async_sessionmaker): The session factory.
+        endpoint (str): The label the transactions are counted under.
+        commit (bool): Whether to commit the changes, False for reads.
+    """
+    async with session_maker() as session:
+        session.info[ENDPOINT_KEY] = endpoint
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+        if commit:
+            await session.commit()
+
+
+def request_unit_of_work(
+    request: Request, session_maker: async_sessionmaker[AsyncSession]
+) -> AsyncContextManager[AsyncSession]:
+    """Open the unit of work of a request, committed unless the method is safe."""
+    return unit_of_work(
+        session_maker, get_endpoint(request), request.method not in SAFE_METHODS
+    )
@@ -1,10 +1,27 @@
+import hashlib
+import re
 from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+from uuid import uuid4
 
 import aiofiles
 from fastapi import UploadFile
 from werkzeug.utils import secure_filename
 
-from src.handlers.exceptions import FileException
+from src.database.config import settings
+from src.handlers.exceptions import FileException, FileTooLargeException
+from src.storage import media_folder_path
+
+SHA256_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+class ReceivedFile(NamedTuple):
+    """A complete upload kept in a local temporary file until it is stored."""
+
+    path: Path
+    sha256: str
+    size: int
+    extension: str
 
 
 async def allowed_file(filename: str) -> bool:
@@ -22,34 +39,118 @@ async def allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1] in allowed_extensions
 
 
-async def save_uploaded_file(api_key: str, upload_file: UploadFile) -> str:
+def content_digest(link: str) -> Optional[str]:
     """
-    Asynchronously saves an uploaded file to disk.
+    Returns the digest a content-addressed file or its derivative is stored under.
+
+    Args:
+        link (str): The path link to a stored file.
+
+    Returns:
+        Optional[str]: The SHA-256 digest, or None for files saved before media
+        storage became content-addressed.
+    """
+    path = Path(link)
+    digest = path.name[:64]
+    if SHA256_PATTERN.fullmatch(digest) and path.parent.name == digest[:2]:
+        return digest
+    return None
+
+
+async def save_uploaded_file(
+    upload_file: UploadFile,
+    chunk_size: int = settings.MEDIA_CHUNK_SIZE,
+    max_size: int = settings.MEDIA_MAX_SIZE,
+) -> ReceivedFile:
+    """
+    Asynchronously saves an uploaded file to a temporary file.
+
+    The file is copied in chunks of `chunk_size` bytes into a temporary file
+    while its SHA-256 digest is computed. The copy is aborted as soon as more
+    than `max_size` bytes have been read, and the partial file is removed. The
+    complete file is moved into content-addressed storage once a reference to
+    its content is taken in the database, see `add_uploaded_media`.
 
     Args:
-        api_key (str): A unique identifier to determine the upload folder.
         upload_file (UploadFile): The uploaded file object to save.
+        chunk_size (int): The number of bytes read and written at a time.
+        max_size (int): The maximum allowed size of the file in bytes.
 
     Raises:
-        ValueError: If the file format is not allowed or an error occurs during saving.
+        FileException: If the file format is not allowed.
+        FileTooLargeException: If the file is larger than `max_size`.
 
     Returns:
-        str: The absolute path to the saved file.
+        ReceivedFile: The temporary file with the digest and size of its content.
     """
-    upload_folder = Path(__file__).parent.parent / "media" / secure_filename(api_key)
-    upload_folder.mkdir(parents=True, exist_ok=True)
-
     if upload_file.filename is None or not await allowed_file(upload_file.filename):
         raise FileException("File format is not allowed. Please upload a valid file.")
 
-    filename = upload_file.filename
-    filename = secure_filename(filename)
-    output_file = (upload_folder / filename).resolve()
+    too_large_message = f"File is too large. Maximum size is {max_size} bytes."
+    if upload_file.size is not None and upload_file.size > max_size:
+        raise FileTooLargeException(too_large_message)
+
+    extension = Path(secure_filename(upload_file.filename)).suffix.lower()
+    media_folder_path.mkdir(parents=True, exist_ok=True)
+    temp_file = media_folder_path / f".{uuid4().hex}.part"
+
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        async with aiofiles.open(temp_file, "wb") as opened_file:
+            while chunk := await upload_file.read(chunk_size):
+                written += len(chunk)
+                if written > max_size:
+                    raise FileTooLargeException(too_large_message)
+                digest.update(chunk)
+                await opened_file.write(chunk)
+
+    except BaseException:
+        temp_file.unlink(missing_ok=True)
+        raise
 
-    if not str(output_file).startswith(str(upload_folder)):
-        raise FileException("Attempt to write outside the media directory.")
+    return ReceivedFile(
+        path=temp_file, sha256=digest.hexdigest(), size=written, extension=extension
+    )
 
-    async with aiofiles.open(output_file, "wb") as opened_file:
-        await opened_file.write(await upload_file.read())
 
-    return str(output_file)
+def get_media_url(media_id: int, width: Optional[int] = None) -> str:
+    """
+    Builds the public URL of a media file.
+
+    Args:
+        media_id (int): The ID of the media.
+        width (Optional[int]): The width of a derivative, or None for the original.
+
+    Returns:
+        str: A stable URL that does not expose the storage layout.
+    """
+    url = f"/api/medias/{media_id}"
+    return url if width is None else f"{url}?width={width}"
+
+
+def parse_quality_values(header: str) -> Dict[str, float]:
+    """
+    Parses a content negotiation header such as `Accept` or `Accept-Encoding`.
+
+    Args:
+        header (str): The header value, e.g. `gzip;q=0.5, br`.
+
+    Returns:
+        Dict[str, float]: Lowercased values mapped to their quality, 1 by default
+        and 0 when the quality cannot be parsed.
+    """
+    qualities: Dict[str, float] = {}
+    for item in header.split(","):
+        value, *params = item.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, number = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        if value.strip():
+            qualities[value.strip().lower()] = quality
+    return qualities
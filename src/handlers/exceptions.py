@@ -20,6 +20,13 @@ class FileException(HTTPException):
         )
 
 
+class FileTooLargeException(HTTPException):
+    def __init__(self, message: str):
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=message
+        )
+
+
 class RowAlreadyExists(HTTPException):
     default_message = "Like already exists"
 
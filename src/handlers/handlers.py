@@ -1,15 +1,17 @@
 from typing import Coroutine
 
 from fastapi import HTTPException, Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
 from src.handlers.exceptions import (
     FileException,
+    FileTooLargeException,
     PermissionException,
     RowAlreadyExists,
     RowNotFoundException,
 )
 from src.logger_setup import get_logger
+from src.responses import SchemaResponse
 from src.schemas.base_schemas import ErrorResponseSchema
 
 logger = get_logger(__name__)
@@ -18,12 +20,13 @@ EXCEPTION_HANDLERS = (
     PermissionException,
     RowNotFoundException,
     FileException,
+    FileTooLargeException,
     RowAlreadyExists,
 )
 
 
 async def exception_to_json(exc: HTTPException) -> JSONResponse:
-    """Convert the exception to a JSON response."""
+    """Convert the exception to a JSON, or MessagePack on request, response."""
     exc_type = exc.__class__.__name__
     exc_message = exc.detail
 
@@ -35,7 +38,7 @@ async def exception_to_json(exc: HTTPException) -> JSONResponse:
         result=False, error_type=exc_type, error_message=exc_message
     )
 
-    return JSONResponse(schema.model_dump(), exc.status_code)
+    return SchemaResponse(schema, exc.status_code)
 
 
 async def exception_handler(request: Request, exc: Exception) -> JSONResponse:
@@ -45,7 +48,7 @@ async def exception_handler(request: Request, exc: Exception) -> JSONResponse:
 
     schema = ErrorResponseSchema(
         result=False, error_type=error_type, error_message=error_message
-    ).model_dump()
+    )
 
     logger.exception(
         "Internal Error!!!\nerror_type: %s\nerror_message: %s",
@@ -53,7 +56,7 @@ async def exception_handler(request: Request, exc: Exception) -> JSONResponse:
         error_message,
     )
 
-    return JSONResponse(
+    return SchemaResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content=schema,
     )
@@ -65,3 +68,16 @@ async def secure_request(coroutine: Coroutine) -> JSONResponse:
         return await coroutine
     except EXCEPTION_HANDLERS as exc:
         return await exception_to_json(exc)
+
+
+async def secure_response(coroutine: Coroutine) -> Response:
+    """
+    Wrap read coroutine calls and encode the result once.
+
+    The response is returned as is, so FastAPI does not validate and serialize
+    it again against the response model of the route.
+    """
+    try:
+        return SchemaResponse(await coroutine)
+    except EXCEPTION_HANDLERS as exc:
+        return await exception_to_json(exc)
@@ -0,0 +1,156 @@
+"""
+Prometheus metrics of the application.
+
+Request metrics are recorded once per request from the numbers already
+collected by the timing middleware, so statements are counted without
+touching the metrics on every query. Pool and cache statistics are kept by
+the pools and caches themselves and copied into the metrics periodically
+and on every scrape.
+
+With several uvicorn workers, `PROMETHEUS_MULTIPROC_DIR` must point to an
+empty directory shared by the workers: every worker writes its values to
+memory-mapped files there, and `/metrics` served by any worker sums them up.
+"""
+
+import os
+from typing import Dict, Iterable, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.cache import VersionedCache, compressed_body_cache, tweet_cache
+from src.database.pool import get_pool_metrics
+
+MULTIPROCESS_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+# Requests that match no route share a label, so scans of random paths do not
+# create a series each
+UNMATCHED_ENDPOINT = "unmatched"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+CACHES: Dict[str, VersionedCache] = {
+    "tweet": tweet_cache,
+    "compressed_body": compressed_body_cache,
+}
+
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, until the response is sent",
+    ["endpoint", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+requests_in_progress = Gauge(
+    "http_requests_in_progress",
+    "Requests being handled",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+request_statements = Histogram(
+    "http_request_db_statements",
+    "Database statements executed by a request",
+    ["endpoint"],
+    buckets=STATEMENT_BUCKETS,
+)
+db_statements = Counter(
+    "db_statements", "Database statements executed by requests", ["endpoint"]
+)
+db_duration = Counter(
+    "db_duration_seconds", "Time requests spent in database statements", ["endpoint"]
+)
+
+pool_size = Gauge(
+    "db_pool_size",
+    "Connections kept by the pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+pool_checked_out = Gauge(
+    "db_pool_checked_out",
+    "Connections in use",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+pool_overflow = Gauge(
+    "db_pool_overflow",
+    "Connections open above the pool size",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+pool_checkouts = Counter("db_pool_checkouts", "Connection checkouts", ["pool"])
+pool_timeouts = Counter(
+    "db_pool_timeouts", "Checkouts that timed out waiting for a connection", ["pool"]
+)
+pool_wait = Counter(
+    "db_pool_wait_seconds", "Time checkouts waited for a connection", ["pool"]
+)
+cache_requests = Counter(
+    "cache_requests", "Lookups of in-process caches", ["cache", "result"]
+)
+
+# The values last copied into the counters, to add only the growth since then
+_exported: Dict[Tuple[Counter, Tuple[str, ...]], float] = {}
+
+
+def record_request(
+    endpoint: str, status: int, duration: float, statements: int, db_seconds: float
+) -> None:
+    """Record a handled request under the label of its route."""
+    request_duration.labels(endpoint, str(status)).observe(duration)
+    request_statements.labels(endpoint).observe(statements)
+    db_statements.labels(endpoint).inc(statements)
+    db_duration.labels(endpoint).inc(db_seconds)
+
+
+def _increase_to(counter: Counter, labels: Tuple[str, ...], value: float) -> None:
+    key = (counter, labels)
+    counter.labels(*labels).inc(max(value - _exported.get(key, 0), 0))
+    _exported[key] = value
+
+
+def refresh_metrics(engines: Iterable[AsyncEngine]) -> None:
+    """Copy the statistics of the connection pools and caches of this worker."""
+    for engine in dict.fromkeys(engines):
+        name = engine.pool.logging_name or ""
+        stats = get_pool_metrics(name).snapshot(engine.pool)
+        pool_size.labels(name).set(stats.size)
+        pool_checked_out.labels(name).set(stats.checked_out)
+        pool_overflow.labels(name).set(stats.overflow)
+        _increase_to(pool_checkouts, (name,), stats.checkouts)
+        _increase_to(pool_timeouts, (name,), stats.timeouts)
+        _increase_to(pool_wait, (name,), stats.wait_seconds)
+
+    for name, cache in CACHES.items():
+        _increase_to(cache_requests, (name, "hit"), cache.stats["hits"])
+        _increase_to(cache_requests, (name, "miss"), cache.stats["misses"])
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Render the metrics in the Prometheus text format.
+
+    Returns:
+        Tuple[bytes, str]: The body and its content type. The metrics of all
+        workers are combined in multiprocess mode.
+    """
+    if MULTIPROCESS_DIR_ENV not in os.environ:
+        return generate_latest(), CONTENT_TYPE_LATEST
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead() -> None:
+    """Drop the live gauges of this worker from the shared multiprocess files."""
+    if MULTIPROCESS_DIR_ENV in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
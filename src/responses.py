@@ -0,0 +1,87 @@
+from typing import Any, Mapping, Optional
+
+import msgpack  # type: ignore[import-untyped]
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+from starlette.datastructures import Headers
+from starlette.types import Receive, Scope, Send
+
+from src.functions import parse_quality_values
+from src.timing import measure_serialization
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+JSON_MEDIA_RANGES = ("application/json", "application/*", "*/*")
+MSGPACK_MEDIA_RANGES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+
+def encode_model(value: Any) -> Any:
+    """
+    Encode values that orjson and msgpack do not support natively.
+
+    Pydantic models are encoded through their field values, without
+    validating or copying them, so a response is serialized in a single pass.
+    """
+    if isinstance(value, BaseModel):
+        return value.__dict__
+    raise TypeError(f"Type is not serializable: {type(value).__name__}")
+
+
+def accepts_msgpack(accept: str) -> bool:
+    """
+    Check whether the client prefers MessagePack according to `Accept`.
+
+    MessagePack has to be listed explicitly, with a quality not lower than the
+    one of JSON, which is matched by `application/*` and `*/*` as well.
+    """
+    qualities = parse_quality_values(accept)
+    msgpack_quality = max(qualities.get(media, 0.0) for media in MSGPACK_MEDIA_RANGES)
+    json_quality = next(
+        (qualities[media] for media in JSON_MEDIA_RANGES if media in qualities), 0.0
+    )
+    return msgpack_quality > 0 and msgpack_quality >= json_quality
+
+
+class SchemaResponse(JSONResponse):
+    """
+    Response encoded as JSON with orjson, or as MessagePack on request.
+
+    Accepts pydantic schemas as content. Both formats are encoded from the
+    same schema data and use the schema field names as keys. The body is
+    encoded when the response is sent, after the format is negotiated, so it
+    is serialized only once. Routes that
+    return this response skip the validation against their `response_model`,
+    so the schemas must already be validated when they are built from
+    database rows.
+    """
+
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        background: Optional[BackgroundTask] = None,
+    ) -> None:
+        self.content = content
+        super().__init__(content, status_code, headers, media_type, background)
+
+    def render(self, content: Any) -> bytes:
+        # The format is only known once the request is seen, see `render_for`
+        return b""
+
+    def render_for(self, accept: str) -> None:
+        """Encode the content once, in the format preferred by `accept`."""
+        with measure_serialization():
+            if accepts_msgpack(accept):
+                self.body = msgpack.packb(self.content, default=encode_model)
+                self.headers["Content-Type"] = MSGPACK_MEDIA_TYPE
+            else:
+                self.body = orjson.dumps(self.content, default=encode_model)
+        self.headers["Content-Length"] = str(len(self.body))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.headers.add_vary_header("Accept")
+        self.render_for(Headers(scope=scope).get("accept", ""))
+        await super().__call__(scope, receive, send)
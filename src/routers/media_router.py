@@ -1,16 +1,46 @@
-from typing import Annotated, Union
+from typing import Annotated, Optional, Union
 
-from fastapi import APIRouter, Depends, Header, UploadFile, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
 from fastapi.responses import JSONResponse
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from src.database.repositories.media_repository import add_media
-from src.database.service import create_session
-from src.functions import save_uploaded_file
-from src.handlers.exceptions import FileException
+from src.database.repositories.media_repository import (
+    add_uploaded_media,
+    get_media_link,
+)
+from src.database.service import create_session, get_session_maker
+from src.functions import ReceivedFile, save_uploaded_file
+from src.handlers.exceptions import (
+    FileException,
+    FileTooLargeException,
+    RowNotFoundException,
+)
 from src.handlers.handlers import exception_to_json
 from src.schemas.base_schemas import ErrorResponseSchema
 from src.schemas.tweet_schemas import NewMediaResponseSchema
+from src.schemas.upload_schemas import (
+    UploadSessionBaseSchema,
+    UploadSessionResponseSchema,
+)
+from src.storage import get_storage
+from src.tasks import generate_media_derivatives
+from src.uploads import (
+    complete_upload,
+    create_upload_session,
+    get_upload_progress,
+    get_upload_session,
+    write_chunk,
+)
 
 media_router = APIRouter(
     prefix="/api/medias",
@@ -18,30 +48,199 @@ media_router = APIRouter(
 )
 
 
+async def register_received_file(
+    received_file: ReceivedFile,
+    session: AsyncSession,
+    background_tasks: BackgroundTasks,
+    session_maker: async_sessionmaker[AsyncSession],
+) -> NewMediaResponseSchema:
+    """Add a media entry for a received file and schedule rendering of its thumbnails."""
+    response, link = await add_uploaded_media(received_file, session)
+    background_tasks.add_task(
+        generate_media_derivatives,
+        received_file.sha256,
+        link,
+        session_maker,
+    )
+    return response
+
+
 @media_router.post(
     "",
     response_model=Union[NewMediaResponseSchema, ErrorResponseSchema],
     status_code=status.HTTP_201_CREATED,
     summary="Upload a media file",
-    description="Upload a media file to the server and save link to database.",
+    description="Upload a media file to the server and save link to database. "
+    "Thumbnails of images are rendered in the background after the response.",
     responses={
         201: {
             "description": "Media file added successfully",
             "model": NewMediaResponseSchema,
         },
         400: {"description": "Bad request", "model": ErrorResponseSchema},
+        413: {"description": "File is too large", "model": ErrorResponseSchema},
+        422: {"description": "File is not allowed", "model": ErrorResponseSchema},
     },
 )
 async def upload_media(
     api_key: Annotated[str, Header(description="User's API key")],
     file: UploadFile,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(create_session),
+    session_maker: async_sessionmaker[AsyncSession] = Depends(get_session_maker),
 ) -> Union[NewMediaResponseSchema, JSONResponse]:
     try:
-        link = await save_uploaded_file(api_key, file)
-    except FileException as exc:
+        received_file = await save_uploaded_file(file)
+    except (FileException, FileTooLargeException) as exc:
         return await exception_to_json(exc)
     finally:
         await file.close()
 
-    return await add_media(link, session=db)
+    return await register_received_file(
+        received_file, db, background_tasks, session_maker
+    )
+
+
+@media_router.post(
+    "/uploads",
+    response_model=Union[UploadSessionResponseSchema, ErrorResponseSchema],
+    status_code=status.HTTP_201_CREATED,
+    summary="Start a resumable upload",
+    description="Creates an upload session for a large media file. The file is "
+    "then sent in numbered chunks, which can be retried independently.",
+    responses={
+        201: {
+            "description": "Upload session created successfully",
+            "model": UploadSessionResponseSchema,
+        },
+        413: {"description": "File is too large", "model": ErrorResponseSchema},
+        422: {"description": "File is not allowed", "model": ErrorResponseSchema},
+    },
+)
+async def start_upload(
+    api_key: Annotated[str, Header(description="User's API key")],
+    upload_data: UploadSessionBaseSchema,
+) -> Union[UploadSessionResponseSchema, JSONResponse]:
+    try:
+        upload = await create_upload_session(
+            owner=api_key, filename=upload_data.filename, size=upload_data.size
+        )
+    except (FileException, FileTooLargeException) as exc:
+        return await exception_to_json(exc)
+    return get_upload_progress(upload)
+
+
+@media_router.get(
+    "/uploads/{upload_id}",
+    response_model=Union[UploadSessionResponseSchema, ErrorResponseSchema],
+    status_code=status.HTTP_200_OK,
+    summary="Get the progress of a resumable upload",
+    description="Returns the chunks received so far, so that an interrupted "
+    "upload can be resumed from the first missing chunk.",
+    responses={
+        200: {
+            "description": "Upload progress fetched successfully",
+            "model": UploadSessionResponseSchema,
+        },
+        404: {"description": "Upload session not found", "model": ErrorResponseSchema},
+    },
+)
+async def get_upload(
+    api_key: Annotated[str, Header(description="User's API key")],
+    upload_id: str,
+) -> Union[UploadSessionResponseSchema, JSONResponse]:
+    try:
+        upload = await get_upload_session(upload_id, owner=api_key)
+    except RowNotFoundException as exc:
+        return await exception_to_json(exc)
+    return get_upload_progress(upload)
+
+
+@media_router.put(
+    "/uploads/{upload_id}/chunks/{index}",
+    response_model=Union[UploadSessionResponseSchema, ErrorResponseSchema],
+    status_code=status.HTTP_200_OK,
+    summary="Upload a chunk of a resumable upload",
+    description="Stores the raw request body as the chunk with the given number. "
+    "Sending the same chunk again replaces it.",
+    responses={
+        200: {
+            "description": "Chunk stored successfully",
+            "model": UploadSessionResponseSchema,
+        },
+        404: {"description": "Upload session not found", "model": ErrorResponseSchema},
+        422: {"description": "Chunk does not match", "model": ErrorResponseSchema},
+    },
+)
+async def upload_chunk(
+    api_key: Annotated[str, Header(description="User's API key")],
+    upload_id: str,
+    index: int,
+    request: Request,
+    offset: int = Query(..., description="Position of the chunk in the file"),
+) -> Union[UploadSessionResponseSchema, JSONResponse]:
+    try:
+        upload = await get_upload_session(upload_id, owner=api_key)
+        await write_chunk(upload, index, offset, request.stream())
+    except (FileException, RowNotFoundException) as exc:
+        return await exception_to_json(exc)
+    return get_upload_progress(upload)
+
+
+@media_router.post(
+    "/uploads/{upload_id}/complete",
+    response_model=Union[NewMediaResponseSchema, ErrorResponseSchema],
+    status_code=status.HTTP_201_CREATED,
+    summary="Finish a resumable upload",
+    description="Assembles the uploaded chunks into a media file and saves it "
+    "like a regular upload.",
+    responses={
+        201: {
+            "description": "Media file added successfully",
+            "model": NewMediaResponseSchema,
+        },
+        404: {"description": "Upload session not found", "model": ErrorResponseSchema},
+        422: {"description": "Upload is incomplete", "model": ErrorResponseSchema},
+    },
+)
+async def finish_upload(
+    api_key: Annotated[str, Header(description="User's API key")],
+    upload_id: str,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(create_session),
+    session_maker: async_sessionmaker[AsyncSession] = Depends(get_session_maker),
+) -> Union[NewMediaResponseSchema, JSONResponse]:
+    try:
+        upload = await get_upload_session(upload_id, owner=api_key)
+        received_file = await complete_upload(upload)
+    except (FileException, RowNotFoundException) as exc:
+        return await exception_to_json(exc)
+
+    return await register_received_file(
+        received_file, db, background_tasks, session_maker
+    )
+
+
+@media_router.get(
+    "/{media_id}",
+    response_class=Response,
+    status_code=status.HTTP_200_OK,
+    summary="Get a media file",
+    description="Returns the content of a media attached to a tweet, "
+    "or of its thumbnail of the given width.",
+    responses={
+        200: {"description": "Media file content"},
+        206: {"description": "Requested byte range of the media file"},
+        404: {"description": "Media not found", "model": ErrorResponseSchema},
+    },
+)
+async def get_media(
+    media_id: int,
+    width: Optional[int] = Query(None, description="Width of the thumbnail"),
+    db: AsyncSession = Depends(create_session),
+) -> Response:
+    try:
+        link = await get_media_link(media_id, session=db, width=width)
+        return get_storage().build_response(link)
+    except RowNotFoundException as exc:
+        return await exception_to_json(exc)
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Response, status
+
+from src.database.service import engine, read_engine, shard_engines
+from src.metrics import refresh_metrics, render_metrics
+
+metrics_router = APIRouter(tags=["METRICS"])
+
+
+@metrics_router.get(
+    "/metrics",
+    status_code=status.HTTP_200_OK,
+    summary="Get Prometheus metrics",
+    description="Returns the metrics of the service in the Prometheus text format.",
+    include_in_schema=False,
+)
+async def get_metrics() -> Response:
+    refresh_metrics([engine, read_engine, *shard_engines])
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
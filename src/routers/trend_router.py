@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Query, status
+
+from src.responses import SchemaResponse
+from src.schemas.trend_schemas import TrendResponseSchema, TrendSchema
+from src.trends import trend_tracker
+
+trend_router = APIRouter(
+    prefix="/api/trends",
+    tags=["TREND"],
+)
+
+
+@trend_router.get(
+    "",
+    response_model=TrendResponseSchema,
+    status_code=status.HTTP_200_OK,
+    summary="Get trending hashtags",
+    description="Returns the hashtags most mentioned in recent tweets.",
+    responses={
+        200: {
+            "description": "Trends fetched successfully",
+            "model": TrendResponseSchema,
+        },
+    },
+)
+async def get_trends(
+    limit: int = Query(10, ge=1, le=100, description="Number of hashtags"),
+) -> SchemaResponse:
+    return SchemaResponse(
+        TrendResponseSchema.model_construct(
+            trends=[
+                TrendSchema.model_construct(hashtag=hashtag, score=score)
+                for hashtag, score in trend_tracker.top(limit)
+            ]
+        )
+    )
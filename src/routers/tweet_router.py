@@ -1,22 +1,29 @@
-from typing import Annotated, Union
+from typing import Annotated, List, Optional, Union
 
-from fastapi import APIRouter, Depends, Header, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Header, Query, Request, status
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.compression import cache_compressed_body
 from src.database.repositories.like_repository import add_like, delete_like
 from src.database.repositories.tweet_repository import (
     add_tweet,
     delete_tweet,
+    get_tweet,
     get_tweets_selection,
 )
-from src.database.service import create_session
-from src.handlers.handlers import secure_request
+from src.database.service import (
+    create_read_session,
+    create_session,
+    create_shard_read_sessions,
+)
+from src.handlers.handlers import secure_request, secure_response
 from src.schemas.base_schemas import ErrorResponseSchema, SuccessSchema
 from src.schemas.tweet_schemas import (
     NewTweetResponseSchema,
     TweetBaseSchema,
-    TweetResponseSchema,
+    TweetDetailResponseSchema,
+    TweetPageResponseSchema,
 )
 
 tweet_router = APIRouter(
@@ -27,24 +34,61 @@ tweet_router = APIRouter(
 
 @tweet_router.get(
     "/tweets",
-    response_model=Union[TweetResponseSchema, ErrorResponseSchema],
+    response_model=Union[TweetPageResponseSchema, ErrorResponseSchema],
     status_code=status.HTTP_200_OK,
     summary="Get tweets from followed users",
-    description="Returns a list of tweets created by users the current user is following.",
+    description="Returns a page of tweets created by users the current user "
+    "is following, newest first.",
     responses={
         200: {
-            "description": "List of tweets fetched successfully",
-            "model": TweetResponseSchema,
+            "description": "Page of tweets fetched successfully",
+            "model": TweetPageResponseSchema,
         },
         404: {"description": "User not found", "model": ErrorResponseSchema},
     },
 )
 async def get_tweets(
     api_key: Annotated[str, Header(description="User's API key")],
+    limit: int = Query(20, ge=1, le=100, description="Page size"),
+    before_id: Optional[int] = Query(
+        None, description="Cursor: return tweets older than this tweet"
+    ),
+    db: AsyncSession = Depends(create_read_session),
+    shards: List[AsyncSession] = Depends(create_shard_read_sessions),
+) -> Response:
+    coroutine = get_tweets_selection(
+        username=api_key,
+        session=db,
+        sessions=shards,
+        limit=limit,
+        before_id=before_id,
+    )
+    return await secure_response(coroutine)
+
+
+@tweet_router.get(
+    "/tweets/{tweet_id}",
+    response_model=Union[TweetDetailResponseSchema, ErrorResponseSchema],
+    status_code=status.HTTP_200_OK,
+    summary="Get a tweet by ID",
+    description="Returns a single tweet with its attachments, author and likes.",
+    responses={
+        200: {
+            "description": "Tweet fetched successfully",
+            "model": TweetDetailResponseSchema,
+        },
+        404: {"description": "Tweet or User not found", "model": ErrorResponseSchema},
+    },
+)
+async def get_tweet_by_id(
+    api_key: Annotated[str, Header(description="User's API key")],
+    tweet_id: int,
+    request: Request,
     db: AsyncSession = Depends(create_session),
-) -> JSONResponse:
-    coroutine = get_tweets_selection(username=api_key, session=db)
-    return await secure_request(coroutine)
+) -> Response:
+    cache_compressed_body(request)
+    coroutine = get_tweet(username=api_key, tweet_id=tweet_id, session=db)
+    return await secure_response(coroutine)
 
 
 @tweet_router.post(
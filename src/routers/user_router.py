@@ -1,16 +1,22 @@
-from typing import Annotated, Union
+from typing import Annotated, List, Optional, Union
 
-from fastapi import APIRouter, Depends, Header, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Header, Query, status
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.repositories.follow_repository import delete_follow, follow
+from src.database.repositories.tweet_repository import get_user_tweets
 from src.database.repositories.user_repository import (
     get_user_with_followers_and_following,
 )
-from src.database.service import create_session
-from src.handlers.handlers import secure_request
+from src.database.service import (
+    create_read_session,
+    create_session,
+    create_shard_read_sessions,
+)
+from src.handlers.handlers import secure_request, secure_response
 from src.schemas.base_schemas import ErrorResponseSchema, SuccessSchema
+from src.schemas.tweet_schemas import TweetPageResponseSchema
 from src.schemas.user_schemas import UserResponseSchema
 
 user_router = APIRouter(
@@ -36,10 +42,13 @@ user_router = APIRouter(
 )
 async def get_my_profile(
     api_key: Annotated[str, Header(description="User's API key")],
-    db: AsyncSession = Depends(create_session),
-) -> JSONResponse:
-    coroutine = get_user_with_followers_and_following(username=api_key, session=db)
-    return await secure_request(coroutine)
+    db: AsyncSession = Depends(create_read_session),
+    shards: List[AsyncSession] = Depends(create_shard_read_sessions),
+) -> Response:
+    coroutine = get_user_with_followers_and_following(
+        username=api_key, session=db, sessions=shards
+    )
+    return await secure_response(coroutine)
 
 
 @user_router.get(
@@ -58,10 +67,43 @@ async def get_my_profile(
     },
 )
 async def get_user_profile(
-    user_id: int, db: AsyncSession = Depends(create_session)
-) -> JSONResponse:
-    coroutine = get_user_with_followers_and_following(user_id=user_id, session=db)
-    return await secure_request(coroutine)
+    user_id: int,
+    db: AsyncSession = Depends(create_read_session),
+    shards: List[AsyncSession] = Depends(create_shard_read_sessions),
+) -> Response:
+    coroutine = get_user_with_followers_and_following(
+        user_id=user_id, session=db, sessions=shards
+    )
+    return await secure_response(coroutine)
+
+
+@user_router.get(
+    "/{user_id}/tweets",
+    response_model=Union[TweetPageResponseSchema, ErrorResponseSchema],
+    status_code=status.HTTP_200_OK,
+    summary="Get user's tweets",
+    description="Returns tweets authored by the user, newest first, "
+    "paginated with the `before_id` cursor.",
+    responses={
+        200: {
+            "description": "Tweets fetched successfully",
+            "model": TweetPageResponseSchema,
+        },
+        404: {"description": "User not found", "model": ErrorResponseSchema},
+    },
+)
+async def get_user_timeline(
+    user_id: int,
+    limit: int = Query(20, ge=1, le=100, description="Page size"),
+    before_id: Optional[int] = Query(
+        None, description="Cursor: return tweets with a lower ID"
+    ),
+    db: AsyncSession = Depends(create_read_session),
+) -> Response:
+    coroutine = get_user_tweets(
+        user_id=user_id, session=db, limit=limit, before_id=before_id
+    )
+    return await secure_response(coroutine)
 
 
 @user_router.post(
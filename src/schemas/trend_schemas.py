@@ -0,0 +1,26 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from src.schemas.base_schemas import SuccessSchema
+
+
+class TrendSchema(BaseModel):
+    """Schema for a trending hashtag."""
+
+    hashtag: str = Field(..., title="Hashtag", description="Hashtag without `#`.")
+    score: float = Field(
+        ...,
+        title="Trend score",
+        description="Time-decayed number of tweets mentioning the hashtag.",
+    )
+
+
+class TrendResponseSchema(SuccessSchema):
+    """Schema for the response containing trending hashtags."""
+
+    trends: List[TrendSchema] = Field(
+        default_factory=list,
+        title="Trends",
+        description="Trending hashtags, the heaviest first.",
+    )
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -40,6 +40,35 @@ class NewMediaResponseSchema(SuccessSchema):
     )
 
 
+class MediaDerivativeSchema(BaseModel):
+    """Schema for a resized version of a media file."""
+
+    kind: str = Field(
+        ...,
+        title="Derivative kind",
+        description="`thumbnail` or a tiny `placeholder` to show while loading.",
+    )
+    width: int = Field(..., title="Width in pixels")
+    height: int = Field(..., title="Height in pixels")
+    link: str = Field(..., title="Derivative link")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class MediaSchema(BaseModel):
+    """Schema for a media file attached to a tweet."""
+
+    id: int = Field(..., title="Media ID")
+    link: str = Field(..., title="Original media link")
+    derivatives: List[MediaDerivativeSchema] = Field(
+        default_factory=list,
+        title="Derivatives",
+        description="Resized versions of the media, the narrowest first.",
+    )
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class TweetSchema(BaseModel):
     """Schema for tweet information."""
 
@@ -55,6 +84,11 @@ class TweetSchema(BaseModel):
         title="Media attachments",
         description="A list of URLs of media files associated with the tweet.",
     )
+    media: List[MediaSchema] = Field(
+        default_factory=list,
+        title="Media",
+        description="Media files of the tweet with their resized versions.",
+    )
     author: UserSchema = Field(
         ...,
         title="Tweet author",
@@ -77,3 +111,24 @@ class TweetResponseSchema(SuccessSchema):
         title="Tweets",
         description="A list of tweets with detailed information.",
     )
+
+
+class TweetDetailResponseSchema(SuccessSchema):
+    """Schema for the response containing a single tweet."""
+
+    tweet: TweetSchema = Field(
+        ...,
+        title="Tweet",
+        description="Detailed information about the tweet.",
+    )
+
+
+class TweetPageResponseSchema(TweetResponseSchema):
+    """Schema for a page of tweets fetched with keyset pagination."""
+
+    next_cursor: Optional[int] = Field(
+        None,
+        title="Next page cursor",
+        description="Pass as `before_id` to fetch the next page, "
+        "null when there are no more tweets.",
+    )
@@ -0,0 +1,37 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from src.schemas.base_schemas import SuccessSchema
+
+
+class UploadSessionBaseSchema(BaseModel):
+    """Schema for starting a resumable upload."""
+
+    filename: str = Field(
+        ...,
+        title="File name",
+        description="Name of the uploaded file, its extension must be allowed.",
+        examples=["video.gif"],
+    )
+    size: int = Field(..., gt=0, title="File size", description="Size in bytes.")
+
+
+class UploadSessionResponseSchema(SuccessSchema):
+    """Schema for the state of a resumable upload."""
+
+    upload_id: str = Field(..., title="Upload session ID")
+    size: int = Field(..., title="File size", description="Size in bytes.")
+    chunk_size: int = Field(
+        ...,
+        title="Chunk size",
+        description="Size of every chunk except the last one, in bytes. "
+        "Chunk `n` starts at offset `n * chunk_size`.",
+    )
+    chunk_count: int = Field(..., title="Number of chunks")
+    received_chunks: List[int] = Field(
+        default_factory=list,
+        title="Received chunks",
+        description="Numbers of the chunks stored so far, in ascending order.",
+    )
+    received_bytes: int = Field(0, title="Received bytes")
@@ -0,0 +1,595 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import mimetypes
+import shutil
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import (
+    AsyncContextManager,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+from urllib.parse import quote
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+import aiofiles
+import httpx
+from aiofiles.threadpool.binary import AsyncBufferedReader
+from fastapi import Response
+from fastapi.responses import FileResponse, RedirectResponse
+
+from src.database.config import settings
+from src.handlers.exceptions import RowNotFoundException
+
+media_folder_path = Path(__file__).parent.parent / "media"
+
+ACCEL_REDIRECT_PREFIX = "/protected_media/"
+# Published media is loaded by <img> tags, which cannot send the API key, and
+# the content of a stored file never changes, so any cache may keep it forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REDIRECT_CACHE_CONTROL = "private, max-age=300"
+
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+S3_ALGORITHM = "AWS4-HMAC-SHA256"
+# The most keys S3 accepts in one DeleteObjects request
+S3_DELETE_BATCH_SIZE = 1000
+
+_storage: Optional["MediaStorage"] = None
+
+
+def content_key(sha256: str, name: str) -> str:
+    """
+    Build the storage key of a content-addressed file.
+
+    Args:
+        sha256 (str): The SHA-256 digest of the original content.
+        name (str): The file name, `<digest><extension>` for originals and
+                    `<digest>_<width>w<extension>` for derivatives.
+
+    Returns:
+        str: The key, `<first two hex digits>/<name>`.
+    """
+    return f"{sha256[:2]}/{name}"
+
+
+class MediaStorage(ABC):
+    """
+    Where media files are kept.
+
+    Links returned by a storage are opaque to the rest of the application and
+    are only passed back to the same storage.
+    """
+
+    @abstractmethod
+    async def save(self, source: Path, key: str) -> str:
+        """
+        Move a complete local file into the storage.
+
+        Args:
+            source (Path): The local file, it is consumed.
+            key (str): The key to store the file under.
+
+        Returns:
+            str: The link to the stored file.
+        """
+
+    @abstractmethod
+    def link_for(self, key: str) -> str:
+        """Return the link a file saved under the key gets, without saving it."""
+
+    @abstractmethod
+    def local_copy(self, link: str) -> AsyncContextManager[Path]:
+        """Async context manager giving a local path with the file content."""
+
+    @abstractmethod
+    async def remove(
+        self, links: Iterable[str], unmodified_for: Optional[float] = None
+    ) -> int:
+        """
+        Remove files, skipping the ones that are already gone.
+
+        With `unmodified_for`, the age of every file is checked again right
+        before it is removed, and files written in the meantime, such as a new
+        upload of the same content, are kept.
+
+        Returns:
+            int: The number of bytes reclaimed, as far as the storage learns
+            the sizes of the removed files.
+        """
+
+    @abstractmethod
+    async def list_stale(self, older_than: float) -> List[str]:
+        """Return links of the files not modified for `older_than` seconds."""
+
+    @abstractmethod
+    def build_response(self, link: str) -> Response:
+        """
+        Build the response that transfers a stored file to the client.
+
+        Raises:
+            RowNotFoundException: If the file does not exist.
+        """
+
+    async def close(self) -> None:
+        """Release the resources held by the storage."""
+
+
+class LocalStorage(MediaStorage):
+    """
+    Media kept on the local filesystem.
+
+    Links are absolute paths. Behind nginx the transfer of a file is handed off
+    with `X-Accel-Redirect`, and nginx serves it with sendfile, ETag, byte
+    ranges and caching headers. Otherwise the file is streamed by the
+    application itself.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    async def save(self, source: Path, key: str) -> str:
+        target = self.root / key
+        if source.resolve() != target.resolve():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(shutil.move, source, target)
+        return self.link_for(key)
+
+    def link_for(self, key: str) -> str:
+        return str((self.root / key).resolve())
+
+    @asynccontextmanager
+    async def local_copy(self, link: str) -> AsyncIterator[Path]:
+        yield Path(link)
+
+    async def remove(
+        self, links: Iterable[str], unmodified_for: Optional[float] = None
+    ) -> int:
+        def unlink_all() -> int:
+            deadline = None if unmodified_for is None else time.time() - unmodified_for
+            reclaimed = 0
+            for link in links:
+                path = Path(link)
+                try:
+                    stat = path.stat()
+                    if deadline is not None and stat.st_mtime >= deadline:
+                        continue
+                    path.unlink()
+                except FileNotFoundError:
+                    continue
+                reclaimed += stat.st_size
+            return reclaimed
+
+        return await asyncio.to_thread(unlink_all)
+
+    async def list_stale(self, older_than: float) -> List[str]:
+        """
+        Hidden files and folders, such as partial uploads, are skipped. Paths
+        are built the same way as the links of media saved before storage
+        became content-addressed.
+        """
+
+        def list_files() -> List[str]:
+            deadline = time.time() - older_than
+            return [
+                str(path)
+                for path in self.root.rglob("*")
+                if not any(
+                    part.startswith(".") for part in path.relative_to(self.root).parts
+                )
+                and path.is_file()
+                and path.stat().st_mtime < deadline
+            ]
+
+        if not self.root.exists():
+            return []
+        return await asyncio.to_thread(list_files)
+
+    def build_response(self, link: str) -> Response:
+        media_root = self.root.resolve()
+        path = Path(link).resolve()
+        if not path.is_relative_to(media_root) or not path.is_file():
+            raise RowNotFoundException("Media file does not exist")
+
+        if settings.MEDIA_ACCEL_REDIRECT:
+            media_type, _ = mimetypes.guess_type(path.name)
+            return Response(
+                headers={
+                    "X-Accel-Redirect": ACCEL_REDIRECT_PREFIX
+                    + path.relative_to(media_root).as_posix()
+                },
+                media_type=media_type,
+            )
+
+        return FileResponse(path, headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL})
+
+
+def sign_v4(
+    method: str,
+    host: str,
+    path: str,
+    query: Dict[str, str],
+    headers: Dict[str, str],
+    payload_hash: str,
+    timestamp: datetime,
+    secret_key: str,
+    region: str,
+    service: str = "s3",
+) -> str:
+    """
+    Compute an AWS Signature Version 4 for a request.
+
+    Args:
+        method (str): The HTTP method.
+        host (str): The value of the `Host` header.
+        path (str): The URI-encoded path of the request.
+        query (Dict[str, str]): The query parameters, not encoded.
+        headers (Dict[str, str]): The headers to sign besides `Host`.
+        payload_hash (str): The hex SHA-256 of the body, or `UNSIGNED-PAYLOAD`.
+        timestamp (datetime): The time of the request, in UTC.
+        secret_key (str): The secret access key.
+        region (str): The region of the service.
+        service (str): The name of the service.
+
+    Returns:
+        str: The hex signature.
+    """
+    date = timestamp.strftime("%Y%m%d")
+    signed = {name.lower(): value.strip() for name, value in headers.items()}
+    signed["host"] = host
+    canonical_headers = "".join(f"{name}:{signed[name]}\n" for name in sorted(signed))
+    canonical_request = "\n".join(
+        [
+            method,
+            path,
+            encode_query(query),
+            canonical_headers,
+            ";".join(sorted(signed)),
+            payload_hash,
+        ]
+    )
+    scope = f"{date}/{region}/{service}/aws4_request"
+    string_to_sign = "\n".join(
+        [
+            S3_ALGORITHM,
+            timestamp.strftime("%Y%m%dT%H%M%SZ"),
+            scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ]
+    )
+
+    key = f"AWS4{secret_key}".encode()
+    for part in (date, region, service, "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    return hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+
+def encode_query(query: Dict[str, str]) -> str:
+    """URI-encode query parameters in the canonical form of Signature Version 4."""
+    return "&".join(
+        f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}"
+        for name, value in sorted(query.items())
+    )
+
+
+class S3Storage(MediaStorage):
+    """
+    Media kept in an S3-compatible object storage, such as MinIO.
+
+    Requests go through a single pooled HTTP client, so connections are reused
+    across requests. Links are object keys, all under `prefix`, so the
+    orphaned file collector never looks at other objects of the bucket. Files
+    larger than a part are sent with a multipart upload, one part at a time, so
+    memory use does not depend on the file size. Objects are removed with
+    DeleteObjects, many per request. Clients are redirected to presigned URLs
+    to download files.
+    """
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        part_size: int = 8 * 1024 * 1024,
+        max_connections: int = 20,
+        presign_expires: int = 3600,
+        prefix: str = "",
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.endpoint = httpx.URL(endpoint_url)
+        self.bucket = bucket
+        self.prefix = prefix
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.part_size = part_size
+        self.presign_expires = presign_expires
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=httpx.Timeout(30.0),
+            transport=transport,
+        )
+
+    def object_path(self, key: str = "") -> str:
+        return f"/{quote(self.bucket, safe='')}/{quote(key, safe='/-_.~')}"
+
+    def object_url(self, path: str, query: Dict[str, str]) -> str:
+        url = f"{self.endpoint.scheme}://{self.endpoint.netloc.decode()}{path}"
+        return f"{url}?{encode_query(query)}" if query else url
+
+    async def request(
+        self,
+        method: str,
+        key: str = "",
+        query: Optional[Dict[str, str]] = None,
+        content: bytes = b"",
+        headers: Optional[Dict[str, str]] = None,
+        stream: bool = False,
+    ) -> httpx.Response:
+        """Send a signed request about an object of the bucket."""
+        query = query or {}
+        path = self.object_path(key)
+        timestamp = datetime.now(timezone.utc)
+        signed_headers = {
+            **(headers or {}),
+            "x-amz-content-sha256": UNSIGNED_PAYLOAD,
+            "x-amz-date": timestamp.strftime("%Y%m%dT%H%M%SZ"),
+        }
+        signature = sign_v4(
+            method,
+            self.endpoint.netloc.decode(),
+            path,
+            query,
+            signed_headers,
+            UNSIGNED_PAYLOAD,
+            timestamp,
+            self.secret_key,
+            self.region,
+        )
+        names = ";".join(sorted(["host", *(name.lower() for name in signed_headers)]))
+        scope = f"{timestamp:%Y%m%d}/{self.region}/s3/aws4_request"
+        signed_headers["Authorization"] = (
+            f"{S3_ALGORITHM} Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={names}, Signature={signature}"
+        )
+        request = self.client.build_request(
+            method,
+            self.object_url(path, query),
+            content=content,
+            headers=signed_headers,
+        )
+        response = await self.client.send(request, stream=stream)
+        if response.status_code >= 400 and response.status_code != 404:
+            await response.aread()
+            response.raise_for_status()
+        return response
+
+    async def save(self, source: Path, key: str) -> str:
+        link = self.link_for(key)
+        size = source.stat().st_size
+        async with aiofiles.open(source, "rb") as opened_file:
+            if size <= self.part_size:
+                await self.request("PUT", link, content=await opened_file.read())
+            else:
+                await self.upload_multipart(link, opened_file)
+        source.unlink()
+        return link
+
+    async def upload_multipart(
+        self, key: str, opened_file: AsyncBufferedReader
+    ) -> None:
+        """Send a file part by part, aborting the upload if a part fails."""
+        response = await self.request("POST", key, {"uploads": ""})
+        upload_id = find_text(response.content, "UploadId")
+        try:
+            etags: List[Tuple[int, str]] = []
+            while part := await opened_file.read(self.part_size):
+                number = len(etags) + 1
+                response = await self.request(
+                    "PUT",
+                    key,
+                    {"partNumber": str(number), "uploadId": upload_id},
+                    content=part,
+                )
+                etags.append((number, response.headers["ETag"]))
+
+            body = "".join(
+                f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+                for number, etag in etags
+            )
+            await self.request(
+                "POST",
+                key,
+                {"uploadId": upload_id},
+                content=(
+                    f"<CompleteMultipartUpload>{body}</CompleteMultipartUpload>"
+                ).encode(),
+            )
+        except BaseException:
+            await self.request("DELETE", key, {"uploadId": upload_id})
+            raise
+
+    async def list_objects(self, prefix: str) -> AsyncIterator[Tuple[str, int, float]]:
+        """Yield the key, size and modification time of objects under a prefix."""
+        query = {"list-type": "2", "prefix": prefix}
+        while True:
+            response = await self.request("GET", query=query)
+            root = ElementTree.fromstring(response.content)
+            for item in root.iterfind("{*}Contents"):
+                modified = datetime.fromisoformat(
+                    item.findtext("{*}LastModified", "").replace("Z", "+00:00")
+                )
+                yield (
+                    item.findtext("{*}Key", ""),
+                    int(item.findtext("{*}Size", "0")),
+                    modified.timestamp(),
+                )
+            token = root.findtext("{*}NextContinuationToken")
+            if root.findtext("{*}IsTruncated") != "true" or not token:
+                return
+            query = {**query, "continuation-token": token}
+
+    def link_for(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    @asynccontextmanager
+    async def local_copy(self, link: str) -> AsyncIterator[Path]:
+        with tempfile.TemporaryDirectory() as folder:
+            path = Path(folder) / Path(link).name
+            response = await self.request("GET", link, stream=True)
+            try:
+                if response.status_code == 404:
+                    raise FileNotFoundError(link)
+                async with aiofiles.open(path, "wb") as opened_file:
+                    async for chunk in response.aiter_bytes():
+                        await opened_file.write(chunk)
+            finally:
+                await response.aclose()
+            yield path
+
+    async def remove(
+        self, links: Iterable[str], unmodified_for: Optional[float] = None
+    ) -> int:
+        """
+        Deleting a missing object succeeds, so objects are deleted without
+        being looked up, and their size is not counted. Only the age recheck
+        of `unmodified_for` sends a HEAD request per object, all of them
+        concurrently, and counts the size of the objects it lets through.
+        """
+        keys = list(dict.fromkeys(links))
+        reclaimed = 0
+        if unmodified_for is not None:
+            deadline = time.time() - unmodified_for
+            responses = await asyncio.gather(
+                *(self.request("HEAD", key) for key in keys)
+            )
+            checked, keys = zip(keys, responses), []
+            for key, response in checked:
+                if response.status_code == 404 or (
+                    parsedate_to_datetime(response.headers["Last-Modified"]).timestamp()
+                    >= deadline
+                ):
+                    continue
+                keys.append(key)
+                reclaimed += int(response.headers.get("Content-Length", 0))
+
+        for start in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+            await self.delete_objects(keys[start : start + S3_DELETE_BATCH_SIZE])
+        return reclaimed
+
+    async def delete_objects(self, keys: List[str]) -> None:
+        """
+        Delete up to `S3_DELETE_BATCH_SIZE` objects with a single request.
+
+        Raises:
+            OSError: If some of the objects could not be deleted.
+        """
+        objects = "".join(f"<Object><Key>{escape(key)}</Key></Object>" for key in keys)
+        content = f"<Delete><Quiet>true</Quiet>{objects}</Delete>".encode()
+        checksum = hashlib.md5(content, usedforsecurity=False).digest()
+        response = await self.request(
+            "POST",
+            query={"delete": ""},
+            content=content,
+            headers={"Content-MD5": base64.b64encode(checksum).decode()},
+        )
+        errors = [
+            f"{error.findtext('{*}Key')}: {error.findtext('{*}Code')}"
+            for error in ElementTree.fromstring(response.content).iterfind("{*}Error")
+        ]
+        if errors:
+            raise OSError(f"Failed to delete objects: {', '.join(errors)}")
+
+    async def list_stale(self, older_than: float) -> List[str]:
+        deadline = time.time() - older_than
+        return [
+            key
+            async for key, _, modified in self.list_objects(self.prefix)
+            if modified < deadline
+        ]
+
+    def presign(self, key: str) -> str:
+        """Build a URL that allows anyone to download an object for a while."""
+        timestamp = datetime.now(timezone.utc)
+        scope = f"{timestamp:%Y%m%d}/{self.region}/s3/aws4_request"
+        path = self.object_path(key)
+        query = {
+            "X-Amz-Algorithm": S3_ALGORITHM,
+            "X-Amz-Credential": f"{self.access_key}/{scope}",
+            "X-Amz-Date": timestamp.strftime("%Y%m%dT%H%M%SZ"),
+            "X-Amz-Expires": str(self.presign_expires),
+            "X-Amz-SignedHeaders": "host",
+        }
+        query["X-Amz-Signature"] = sign_v4(
+            "GET",
+            self.endpoint.netloc.decode(),
+            path,
+            query,
+            {},
+            UNSIGNED_PAYLOAD,
+            timestamp,
+            self.secret_key,
+            self.region,
+        )
+        return self.object_url(path, query)
+
+    def build_response(self, link: str) -> Response:
+        return RedirectResponse(
+            self.presign(link), headers={"Cache-Control": REDIRECT_CACHE_CONTROL}
+        )
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def find_text(document: bytes, tag: str) -> str:
+    """Return the text of the first element with the tag in an XML document."""
+    text = ElementTree.fromstring(document).findtext(f".//{{*}}{tag}")
+    if text is None:
+        raise ValueError(f"Element {tag} not found in the response")
+    return text
+
+
+def get_storage() -> MediaStorage:
+    """Return the configured media storage, creating it on first use."""
+    global _storage
+    if _storage is None:
+        if settings.MEDIA_STORAGE == "s3":
+            _storage = S3Storage(
+                endpoint_url=settings.S3_ENDPOINT_URL,
+                bucket=settings.S3_BUCKET,
+                access_key=settings.S3_ACCESS_KEY,
+                secret_key=settings.S3_SECRET_KEY,
+                region=settings.S3_REGION,
+                part_size=settings.S3_PART_SIZE,
+                max_connections=settings.S3_MAX_CONNECTIONS,
+                presign_expires=settings.S3_PRESIGN_EXPIRES,
+                prefix=settings.S3_PREFIX,
+            )
+        else:
+            _storage = LocalStorage(media_folder_path)
+    return _storage
+
+
+async def close_storage() -> None:
+    """Close the media storage if it was created."""
+    global _storage
+    if _storage is not None:
+        await _storage.close()
+        _storage = None
@@ -0,0 +1,252 @@
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.database.config import settings
+from src.database.outbox import OUTBOX_BATCH_SIZE, dispatch_events
+from src.database.partitions import create_future_partitions
+from src.database.pool import get_pool_metrics
+from src.database.repositories.media_repository import (
+    ORPHAN_BATCH_SIZE,
+    add_media_derivatives,
+    filter_unshared_files,
+    has_media_derivatives,
+    purge_orphaned_media,
+)
+from src.database.repositories.tweet_repository import purge_deleted_tweets
+from src.database.repositories.user_repository import replicate_users
+from src.database.service import (
+    engine,
+    get_shard_session_makers,
+    read_engine,
+    shard_engines,
+)
+from src.database.unit_of_work import get_transaction_counts
+from src.logger_setup import get_logger
+from src.metrics import refresh_metrics
+from src.storage import content_key, get_storage
+from src.thumbnails import create_derivatives, is_image
+
+logger = get_logger(__name__)
+
+PURGE_INTERVAL_SECONDS = 30
+UPLOAD_CLEANUP_INTERVAL_SECONDS = 60 * 60
+ORPHAN_GC_INTERVAL_SECONDS = 60 * 60
+ORPHAN_GC_PAUSE_SECONDS = 1.0
+POOL_METRICS_INTERVAL_SECONDS = 60
+PARTITION_INTERVAL_SECONDS = 60 * 60
+OUTBOX_INTERVAL_SECONDS = 1
+METRICS_INTERVAL_SECONDS = 15
+USER_REPLICATION_INTERVAL_SECONDS = 10
+
+
+async def run_periodically(job: Callable[[], Awaitable[Any]], interval: float) -> None:
+    """
+    Run a background job every `interval` seconds until cancelled.
+
+    Errors are logged and do not stop the loop.
+    """
+    while True:
+        try:
+            await job()
+        except Exception:
+            logger.exception("Background job %s failed", job.__name__)
+        await asyncio.sleep(interval)
+
+
+@asynccontextmanager
+async def open_shard_sessions(
+    session_makers: Sequence[async_sessionmaker[AsyncSession]],
+) -> AsyncIterator[List[AsyncSession]]:
+    """Open a session on every shard."""
+    async with AsyncExitStack() as stack:
+        yield [
+            await stack.enter_async_context(session_maker())
+            for session_maker in session_makers
+        ]
+
+
+async def purge_deleted_tweets_job() -> None:
+    """Purge soft-deleted tweets of every shard batch by batch until none are left."""
+    purged = 0
+    async with open_shard_sessions(get_shard_session_makers()) as sessions:
+        for shard, session in enumerate(sessions):
+            other_sessions = sessions[:shard] + sessions[shard + 1 :]
+            while batch := await purge_deleted_tweets(
+                session, other_sessions=other_sessions
+            ):
+                purged += batch
+    if purged:
+        logger.info("Purged %s deleted tweets", purged)
+
+
+async def dispatch_outbox_job() -> None:
+    """Dispatch the due outbox events of every shard until none are left."""
+    delivered = failed = 0
+    for session_maker in get_shard_session_makers():
+        while True:
+            batch = await dispatch_events(session_maker)
+            delivered += batch.delivered
+            failed += batch.failed
+            if batch.delivered + batch.failed < OUTBOX_BATCH_SIZE:
+                break
+    if failed:
+        logger.warning(
+            "Dispatched %s outbox events, %s failed and will be retried",
+            delivered,
+            failed,
+        )
+
+
+async def replicate_users_job() -> None:
+    """Copy new users of the primary database to the other shards."""
+    session_makers = get_shard_session_makers()
+    if len(session_makers) == 1:
+        return
+    async with open_shard_sessions(session_makers) as sessions:
+        copied = await replicate_users(sessions[0], sessions[1:])
+    if copied:
+        logger.info("Copied %s users to the shards", copied)
+
+
+async def create_partitions_job() -> None:
+    """Create the tweets and likes partitions of every shard for the upcoming IDs."""
+    for shard_engine in [engine, *shard_engines]:
+        async with shard_engine.begin() as connection:
+            created = await create_future_partitions(connection)
+        if created:
+            logger.info(
+                "Created partitions %s on %s",
+                ", ".join(created),
+                shard_engine.pool.logging_name,
+            )
+
+
+async def log_pool_metrics() -> None:
+    """Log the state of the database connection pools of this worker."""
+    # The read engine is the primary one when no replica is configured
+    for pool_engine in dict.fromkeys([engine, read_engine, *shard_engines]):
+        name = pool_engine.pool.logging_name or ""
+        stats = get_pool_metrics(name).snapshot(pool_engine.pool)
+        logger.info(
+            "Connection pool %s of worker %s: %s of %s checked out, %s overflow, "
+            "%s checkouts, %s timeouts, average wait %.1f ms, max wait %.1f ms",
+            name,
+            stats.pid,
+            stats.checked_out,
+            stats.size,
+            stats.overflow,
+            stats.checkouts,
+            stats.timeouts,
+            stats.average_wait_seconds * 1000,
+            stats.max_wait_seconds * 1000,
+        )
+
+
+async def refresh_metrics_job() -> None:
+    """Copy the pool and cache statistics of this worker into the metrics."""
+    refresh_metrics([engine, read_engine, *shard_engines])
+
+
+async def log_transaction_metrics() -> None:
+    """Log the commits and rollbacks of every endpoint of this worker."""
+    for endpoint, counts in get_transaction_counts().items():
+        logger.info(
+            "Transactions of %s: %s commits, %s rollbacks",
+            endpoint,
+            counts.commits,
+            counts.rollbacks,
+        )
+
+
+async def collect_orphaned_media(
+    session_makers: Optional[Sequence[async_sessionmaker[AsyncSession]]] = None,
+    grace_period: float = settings.MEDIA_ORPHAN_GRACE_PERIOD,
+    batch_size: int = ORPHAN_BATCH_SIZE,
+    pause: float = ORPHAN_GC_PAUSE_SECONDS,
+) -> int:
+    """
+    Remove media that is not used by any tweet, together with its files.
+
+    Media never attached to a tweet is removed first, then files on disk that
+    no database entry refers to, such as files left behind by deleted rows.
+    Both are removed in batches with a pause between them to limit the load on
+    the database and the disk. Anything newer than the grace period is kept.
+    The media of every shard in `session_makers`, all shards by default, is
+    collected. Files are shared by the shards, so a file is removed only when
+    no shard refers to it.
+
+    Returns:
+        int: The number of bytes reclaimed on disk.
+    """
+    if session_makers is None:
+        session_makers = get_shard_session_makers()
+    entries = reclaimed = 0
+    async with open_shard_sessions(session_makers) as sessions:
+        for shard, session in enumerate(sessions):
+            other_sessions = sessions[:shard] + sessions[shard + 1 :]
+            while True:
+                batch = await purge_orphaned_media(
+                    session,
+                    timedelta(seconds=grace_period),
+                    batch_size,
+                    other_sessions,
+                )
+                entries += batch.entries
+                reclaimed += batch.size
+                if batch.entries < batch_size:
+                    break
+                await asyncio.sleep(pause)
+
+        storage = get_storage()
+        stale_files = await storage.list_stale(grace_period)
+        for start in range(0, len(stale_files), batch_size):
+            links = stale_files[start : start + batch_size]
+            reclaimed += await storage.remove(
+                await filter_unshared_files(links, sessions),
+                unmodified_for=grace_period,
+            )
+            await asyncio.sleep(pause)
+
+    if entries or reclaimed:
+        logger.info(
+            "Collected %s orphaned media, reclaimed %s bytes", entries, reclaimed
+        )
+    return reclaimed
+
+
+async def generate_media_derivatives(
+    sha256: str, link: str, session_maker: async_sessionmaker[AsyncSession]
+) -> None:
+    """
+    Render and record thumbnails of an uploaded image.
+
+    Scheduled after the upload response is sent. Content that was uploaded
+    before already has its derivatives and is skipped. The image is rendered
+    from a local copy, and the thumbnails are saved to media storage.
+    """
+    if not is_image(link):
+        return
+
+    storage = get_storage()
+    async with session_maker() as session:
+        if await has_media_derivatives(sha256, session):
+            return
+
+        async with storage.local_copy(link) as source:
+            derivatives = [
+                derivative._replace(
+                    link=await storage.save(
+                        Path(derivative.link),
+                        content_key(sha256, Path(derivative.link).name),
+                    )
+                )
+                for derivative in await create_derivatives(str(source))
+            ]
+        if derivatives:
+            await add_media_derivatives(sha256, derivatives, session)
+            await session.commit()
@@ -0,0 +1,139 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence
+
+from PIL import Image
+
+from src.logger_setup import get_logger
+
+logger = get_logger(__name__)
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif"}
+THUMBNAIL_WIDTHS = (320, 640, 1280)
+PLACEHOLDER_WIDTH = 16
+PROCESS_POOL_WORKERS = 2
+# Larger images are refused before they are decoded, so a small file that
+# declares huge dimensions cannot exhaust the memory of a worker
+MAX_IMAGE_PIXELS = 40_000_000
+
+# Errors of images that cannot be decoded, Pillow raises several kinds
+IMAGE_ERRORS = (
+    OSError,
+    ValueError,
+    TypeError,
+    SyntaxError,
+    EOFError,
+    Image.DecompressionBombError,
+)
+
+THUMBNAIL = "thumbnail"
+PLACEHOLDER = "placeholder"
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+
+class Derivative(NamedTuple):
+    """A resized version of an image."""
+
+    kind: str
+    width: int
+    height: int
+    link: str
+
+
+def is_image(link: str) -> bool:
+    """Check whether a stored media file is an image that can be resized."""
+    return Path(link).suffix.lower() in IMAGE_EXTENSIONS
+
+
+def render_derivatives(
+    source: str,
+    widths: Sequence[int] = THUMBNAIL_WIDTHS,
+    placeholder_width: int = PLACEHOLDER_WIDTH,
+) -> List[Derivative]:
+    """
+    Resize an image into thumbnails and a tiny placeholder.
+
+    Runs in a worker process. Derivatives are written next to the source as
+    `<name>_<width>w<extension>`. Only widths smaller than the original are
+    rendered, so small images get no thumbnails besides the placeholder.
+
+    Args:
+        source (str): Path to the original image.
+        widths (Sequence[int]): Widths of the thumbnails to render.
+        placeholder_width (int): Width of the placeholder image.
+
+    Returns:
+        List[Derivative]: The rendered derivatives.
+
+    Raises:
+        Image.DecompressionBombError: If the image has more than
+                                      `MAX_IMAGE_PIXELS` pixels.
+    """
+    source_path = Path(source)
+    extension = ".png" if source_path.suffix.lower() in {".png", ".gif"} else ".jpg"
+    derivatives: List[Derivative] = []
+
+    with Image.open(source_path) as opened_image:
+        if opened_image.width * opened_image.height > MAX_IMAGE_PIXELS:
+            raise Image.DecompressionBombError(
+                f"Image has {opened_image.width * opened_image.height} pixels, "
+                f"more than {MAX_IMAGE_PIXELS}"
+            )
+        opened_image.seek(0)
+        image = opened_image.convert("RGBA" if extension == ".png" else "RGB")
+        targets = [(THUMBNAIL, width) for width in widths if width < image.width]
+        targets.append((PLACEHOLDER, min(placeholder_width, image.width)))
+
+        for kind, width in targets:
+            height = max(1, round(image.height * width / image.width))
+            output = source_path.with_name(f"{source_path.stem}_{width}w{extension}")
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            resized.save(output, optimize=True)
+            derivatives.append(Derivative(kind, width, height, str(output)))
+
+    return derivatives
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the process pool for image processing, creating it on first use."""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=PROCESS_POOL_WORKERS)
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Shut down the image processing pool if it was started."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
+
+
+async def create_derivatives(source: str) -> List[Derivative]:
+    """
+    Render derivatives of an image in the process pool, off the event loop.
+
+    Files that are not images or cannot be decoded get no derivatives.
+
+    Args:
+        source (str): Path to the original image.
+
+    Returns:
+        List[Derivative]: The rendered derivatives.
+    """
+    if not is_image(source):
+        return []
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            get_process_pool(), render_derivatives, source
+        )
+    except IMAGE_ERRORS as exc:
+        logger.warning("Failed to render derivatives of %s: %s", source, exc)
+        return []
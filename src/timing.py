@@ -0,0 +1,143 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Iterator, Optional
+
+from fastapi import Request
+from sqlalchemy import Engine, event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.database.unit_of_work import get_endpoint
+from src.logger_setup import get_logger
+from src.metrics import UNMATCHED_ENDPOINT, record_request, requests_in_progress
+
+logger = get_logger(__name__)
+
+QUERY_START_KEY = "query_start"
+
+
+class RequestTimings:
+    """Time a request spent in the database and in response serialization."""
+
+    def __init__(self) -> None:
+        self.start = perf_counter()
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.serialize_seconds = 0.0
+
+
+request_timings: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+@contextmanager
+def measure_serialization() -> Iterator[None]:
+    """Count the time spent in the block as serialization of the current request."""
+    timings = request_timings.get()
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings.serialize_seconds += perf_counter() - start
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_query_timer(conn: Any, *args: Any) -> None:
+    conn.info[QUERY_START_KEY] = perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def record_query_time(conn: Any, *args: Any) -> None:
+    timings = request_timings.get()
+    if timings is not None:
+        timings.db_seconds += perf_counter() - conn.info.pop(QUERY_START_KEY)
+        timings.queries += 1
+
+
+def format_server_timing(timings: RequestTimings, total_seconds: float) -> str:
+    """
+    Build the `Server-Timing` header value of a request.
+
+    `app` is the time left after the database and serialization, spent on
+    building ORM objects and schemas and in the handler code. Queries run on
+    several shards at once may add up to more database time than the total.
+    """
+    app_seconds = max(
+        total_seconds - timings.db_seconds - timings.serialize_seconds, 0.0
+    )
+    return ", ".join(
+        [
+            f'db;dur={timings.db_seconds * 1000:.1f};desc="{timings.queries} queries"',
+            f"serialize;dur={timings.serialize_seconds * 1000:.1f}",
+            f"app;dur={app_seconds * 1000:.1f}",
+            f"total;dur={total_seconds * 1000:.1f}",
+        ]
+    )
+
+
+class ServerTimingMiddleware:
+    """
+    Report where the time of every request was spent.
+
+    The breakdown is sent in the `Server-Timing` header and logged with the
+    route template of the request, so endpoints can be compared with each
+    other. The total is measured up to the start of the response, after the
+    body was rendered and compressed. The Prometheus request metrics are
+    recorded once the response is sent.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total_seconds = perf_counter() - timings.start
+                MutableHeaders(scope=message).append(
+                    "Server-Timing", format_server_timing(timings, total_seconds)
+                )
+                logger.info(
+                    "endpoint=%r status=%s total_ms=%.1f db_ms=%.1f queries=%s "
+                    "serialize_ms=%.1f",
+                    get_endpoint(Request(scope)),
+                    status,
+                    total_seconds * 1000,
+                    timings.db_seconds * 1000,
+                    timings.queries,
+                    timings.serialize_seconds * 1000,
+                )
+            await send(message)
+
+        # The route is only known once the router has handled the request
+        in_progress = requests_in_progress.labels(scope["method"])
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            in_progress.dec()
+            request_timings.reset(token)
+            endpoint = (
+                get_endpoint(Request(scope))
+                if scope.get("route") is not None
+                else UNMATCHED_ENDPOINT
+            )
+            record_request(
+                endpoint,
+                status,
+                perf_counter() - timings.start,
+                timings.queries,
+                timings.db_seconds,
+            )
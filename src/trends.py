@@ -0,0 +1,341 @@
+import asyncio
+import json
+import os
+import re
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import aiofiles
+
+from src.database.config import settings
+from src.logger_setup import get_logger
+
+logger = get_logger(__name__)
+
+HASHTAG_PATTERN = re.compile(r"#(\w+)")
+
+SNAPSHOT_INTERVAL_SECONDS = 60
+SNAPSHOT_PREFIX = "trends-"
+
+
+def snapshot_path(pid: Optional[int] = None) -> Path:
+    """Return the snapshot file of a worker process, the current one by default."""
+    pid = os.getpid() if pid is None else pid
+    return settings.TRENDS_SNAPSHOT_DIR / f"{SNAPSHOT_PREFIX}{pid}.json"
+
+
+def snapshot_pid(path: Path) -> Optional[int]:
+    """Return the ID of the worker process that wrote a snapshot, if it has one."""
+    try:
+        return int(path.stem.removeprefix(SNAPSHOT_PREFIX))
+    except ValueError:
+        return None
+
+
+def is_process_alive(pid: int) -> bool:
+    """Check whether a process with the ID is running on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+async def read_snapshot(path: Path) -> Optional[Dict]:
+    """Read a snapshot file, None if it is missing or unreadable."""
+    try:
+        async with aiofiles.open(path) as opened_file:
+            return json.loads(await opened_file.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        logger.warning("Failed to load trends snapshot %s: %s", path.name, exc)
+        return None
+
+
+def extract_hashtags(text: str) -> List[str]:
+    """
+    Extract unique, lower-cased hashtags from a tweet text.
+
+    Args:
+        text (str): The content of the tweet.
+
+    Returns:
+        List[str]: Hashtags without the leading `#`, in order of appearance.
+    """
+    return list(dict.fromkeys(tag.lower() for tag in HASHTAG_PATTERN.findall(text)))
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitters summary.
+
+    Keeps at most `capacity` counters no matter how many distinct items are
+    offered. When the summary is full, the item with the smallest count is
+    evicted and the newcomer inherits its count, so the estimate of every
+    item is an upper bound overestimating by no more than that minimum.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counters: Dict[str, int] = {}
+
+    def offer(self, item: str, count: int = 1) -> None:
+        """Add `count` occurrences of `item` to the summary."""
+        if item in self.counters:
+            self.counters[item] += count
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = count
+        else:
+            victim = min(self.counters, key=self.counters.__getitem__)
+            self.counters[item] = self.counters.pop(victim) + count
+
+    def to_dict(self) -> Dict[str, int]:
+        """Return the counters as a plain dictionary."""
+        return dict(self.counters)
+
+    @classmethod
+    def from_dict(cls, capacity: int, counters: Dict[str, int]) -> "SpaceSaving":
+        """Restore a summary from a dictionary, keeping the heaviest items."""
+        summary = cls(capacity)
+        heaviest = sorted(counters.items(), key=lambda pair: pair[1], reverse=True)
+        summary.counters = dict(heaviest[:capacity])
+        return summary
+
+
+class TrendTracker:
+    """
+    Sliding-window trending hashtags.
+
+    The window is split into `window_buckets` time buckets of
+    `bucket_seconds` each, every bucket holding its own Space-Saving summary.
+    Buckets that fall out of the window are dropped, and older buckets are
+    weighted down by `decay` per bucket of age when trends are computed.
+
+    Every worker process counts only the tweets it handles. The counters of
+    the other workers are read from their snapshots into `peer_buckets` and
+    added to the trends, so all workers converge on the same trends within a
+    snapshot interval. The snapshot of a stopped worker is adopted by the first
+    worker that finds it, so its counters are kept and its file removed.
+    """
+
+    def __init__(
+        self,
+        bucket_seconds: int = 300,
+        window_buckets: int = 12,
+        capacity: int = 500,
+        decay: float = 0.8,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.window_buckets = window_buckets
+        self.capacity = capacity
+        self.decay = decay
+        self.clock = clock
+        self.buckets: Deque[Tuple[int, SpaceSaving]] = deque()
+        self.peer_buckets: Dict[int, Dict[str, int]] = {}
+
+    def _current_bucket(self) -> int:
+        return int(self.clock() // self.bucket_seconds)
+
+    def _expire(self, current: int) -> None:
+        while self.buckets and self.buckets[0][0] <= current - self.window_buckets:
+            self.buckets.popleft()
+
+    def add(self, text: str) -> None:
+        """
+        Feed the hashtags of a tweet into the current time bucket.
+
+        Args:
+            text (str): The content of the tweet.
+        """
+        hashtags = extract_hashtags(text)
+        if not hashtags:
+            return
+
+        current = self._current_bucket()
+        self._expire(current)
+        if not self.buckets or self.buckets[-1][0] != current:
+            self.buckets.append((current, SpaceSaving(self.capacity)))
+
+        summary = self.buckets[-1][1]
+        for hashtag in hashtags:
+            summary.offer(hashtag)
+
+    def top(self, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Get the heaviest hashtags of the window.
+
+        Args:
+            limit (int): The maximum number of hashtags to return.
+
+        Returns:
+            List[Tuple[str, float]]: Pairs of hashtag and decayed score,
+            heaviest first.
+        """
+        current = self._current_bucket()
+        self._expire(current)
+
+        counters = [(index, summary.counters) for index, summary in self.buckets]
+        counters.extend(
+            (index, peer_counters)
+            for index, peer_counters in self.peer_buckets.items()
+            if index > current - self.window_buckets
+        )
+        scores: Dict[str, float] = {}
+        for index, bucket_counters in counters:
+            weight = self.decay ** (current - index)
+            for hashtag, count in bucket_counters.items():
+                scores[hashtag] = scores.get(hashtag, 0.0) + count * weight
+
+        ranked = sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+        return ranked[:limit]
+
+    def to_dict(self) -> Dict:
+        """Serialize the tracker state for a snapshot."""
+        return {
+            "bucket_seconds": self.bucket_seconds,
+            "buckets": [[index, summary.to_dict()] for index, summary in self.buckets],
+        }
+
+    def load_dict(self, data: Dict) -> None:
+        """
+        Restore the tracker state from a snapshot.
+
+        Snapshots taken with a different bucket size are ignored, and buckets
+        that already fell out of the window are dropped.
+        """
+        if data.get("bucket_seconds") != self.bucket_seconds:
+            logger.warning("Trends snapshot bucket size mismatch, skipping restore")
+            return
+
+        self.buckets = deque(
+            (int(index), SpaceSaving.from_dict(self.capacity, counters))
+            for index, counters in data.get("buckets", [])
+        )
+        self._expire(self._current_bucket())
+
+    def merge_dict(self, data: Dict) -> None:
+        """
+        Add the counters of a snapshot to the tracker state.
+
+        Snapshots taken with a different bucket size are ignored.
+        """
+        if data.get("bucket_seconds") != self.bucket_seconds:
+            return
+
+        summaries = dict(self.buckets)
+        for index, counters in data.get("buckets", []):
+            summary = summaries.setdefault(int(index), SpaceSaving(self.capacity))
+            for hashtag, count in counters.items():
+                summary.offer(hashtag, count)
+        self.buckets = deque(sorted(summaries.items(), key=lambda pair: pair[0]))
+        self._expire(self._current_bucket())
+
+    async def save_snapshot(self, path: Optional[Path] = None) -> None:
+        """
+        Write the tracker state to disk.
+
+        The snapshot is written to a temporary file and renamed over the
+        previous one, so a crash never leaves a truncated snapshot behind.
+        """
+        path = path or snapshot_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(".tmp")
+
+        async with aiofiles.open(temp_path, "w") as opened_file:
+            await opened_file.write(json.dumps(self.to_dict()))
+        temp_path.replace(path)
+
+    async def load_snapshot(self, path: Optional[Path] = None) -> None:
+        """
+        Restore the tracker state from disk if a snapshot exists.
+
+        By default the snapshot left by a previous process with the same ID is
+        taken over, the snapshots of other stopped workers are adopted by
+        `load_peers`.
+        """
+        data = await read_snapshot(path or snapshot_path())
+        if data is not None:
+            self.load_dict(data)
+
+    async def adopt_snapshot(self, path: Path) -> None:
+        """
+        Take over the counters of a stopped worker and remove its snapshot.
+
+        The snapshot is renamed before it is read, so only one of the workers
+        that find it adopts it.
+        """
+        claimed = path.with_name(f".{path.stem}.{os.getpid()}.claimed")
+        try:
+            path.rename(claimed)
+        except FileNotFoundError:
+            return
+        data = await read_snapshot(claimed)
+        claimed.unlink(missing_ok=True)
+        if data is not None:
+            self.merge_dict(data)
+
+    async def load_peers(self, folder: Optional[Path] = None) -> None:
+        """
+        Read the counters of the other workers from their snapshots.
+
+        Snapshots of workers that are no longer running are adopted instead.
+        """
+        folder = folder or settings.TRENDS_SNAPSHOT_DIR
+        current = self._current_bucket()
+        peer_buckets: Dict[int, Dict[str, int]] = {}
+        for path in folder.glob(f"{SNAPSHOT_PREFIX}*.json"):
+            pid = snapshot_pid(path)
+            if pid is None or pid == os.getpid():
+                continue
+            if not is_process_alive(pid):
+                await self.adopt_snapshot(path)
+                continue
+
+            data = await read_snapshot(path)
+            if data is None or data.get("bucket_seconds") != self.bucket_seconds:
+                continue
+
+            buckets = [
+                (int(index), counters)
+                for index, counters in data.get("buckets", [])
+                if int(index) > current - self.window_buckets
+            ]
+            for index, counters in buckets:
+                merged = peer_buckets.setdefault(index, {})
+                for hashtag, count in counters.items():
+                    merged[hashtag] = merged.get(hashtag, 0) + count
+        self.peer_buckets = peer_buckets
+
+
+trend_tracker = TrendTracker()
+
+
+async def run_snapshots(
+    tracker: TrendTracker = trend_tracker,
+    interval: float = SNAPSHOT_INTERVAL_SECONDS,
+) -> None:
+    """
+    Periodically persist the tracker state and read the peers until cancelled.
+
+    A final snapshot is written on cancellation so that a graceful restart
+    loses nothing.
+    """
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await tracker.save_snapshot()
+                await tracker.load_peers()
+            except OSError as exc:
+                logger.warning("Failed to save trends snapshot: %s", exc)
+    finally:
+        try:
+            await tracker.save_snapshot()
+        except OSError as exc:
+            logger.warning("Failed to save trends snapshot: %s", exc)
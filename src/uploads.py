@@ -0,0 +1,306 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import IO, AsyncIterator, List, NamedTuple
+from uuid import UUID, uuid4
+
+import aiofiles
+from werkzeug.utils import secure_filename
+
+from src.database.config import settings
+from src.functions import ReceivedFile, allowed_file
+from src.handlers.exceptions import (
+    FileException,
+    FileTooLargeException,
+    RowNotFoundException,
+)
+from src.logger_setup import get_logger
+from src.schemas.upload_schemas import UploadSessionResponseSchema
+from src.storage import media_folder_path
+
+logger = get_logger(__name__)
+
+uploads_folder_path = media_folder_path / ".uploads"
+
+SESSION_FILE = "session.json"
+CHUNK_SUFFIX = ".chunk"
+SESSION_NOT_FOUND = "Upload session with this ID does not exist"
+
+
+class UploadSession(NamedTuple):
+    """A resumable upload of a single file sent in numbered chunks."""
+
+    upload_id: str
+    owner: str
+    filename: str
+    size: int
+    chunk_size: int
+
+    @property
+    def chunk_count(self) -> int:
+        return -(-self.size // self.chunk_size)
+
+    @property
+    def folder(self) -> Path:
+        return uploads_folder_path / self.upload_id
+
+    def chunk_path(self, index: int) -> Path:
+        return self.folder / f"{index:06d}{CHUNK_SUFFIX}"
+
+    def chunk_length(self, index: int) -> int:
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+
+async def create_upload_session(
+    owner: str,
+    filename: str,
+    size: int,
+    chunk_size: int = settings.MEDIA_UPLOAD_CHUNK_SIZE,
+    max_size: int = settings.MEDIA_UPLOAD_MAX_SIZE,
+) -> UploadSession:
+    """
+    Start a resumable upload.
+
+    The session is kept on disk in `media/.uploads/<upload id>/`, so it
+    survives restarts of the application.
+
+    Args:
+        owner (str): API key of the user that uploads the file.
+        filename (str): Name of the uploaded file.
+        size (int): Total size of the file in bytes.
+        chunk_size (int): Size of every chunk except the last one.
+        max_size (int): The maximum allowed size of the file in bytes.
+
+    Returns:
+        UploadSession: The created session.
+
+    Raises:
+        FileException: If the file format is not allowed or the file is empty.
+        FileTooLargeException: If the file is larger than `max_size`.
+    """
+    if not await allowed_file(filename):
+        raise FileException("File format is not allowed. Please upload a valid file.")
+    if size <= 0:
+        raise FileException("File is empty.")
+    if size > max_size:
+        raise FileTooLargeException(
+            f"File is too large. Maximum size is {max_size} bytes."
+        )
+
+    upload = UploadSession(
+        upload_id=uuid4().hex,
+        owner=owner,
+        filename=secure_filename(filename),
+        size=size,
+        chunk_size=chunk_size,
+    )
+    upload.folder.mkdir(parents=True)
+    async with aiofiles.open(upload.folder / SESSION_FILE, "w") as opened_file:
+        await opened_file.write(json.dumps(upload._asdict()))
+    return upload
+
+
+async def get_upload_session(upload_id: str, owner: str) -> UploadSession:
+    """
+    Load an upload session of the user.
+
+    Args:
+        upload_id (str): The ID of the upload session.
+        owner (str): API key of the user that uploads the file.
+
+    Returns:
+        UploadSession: The upload session.
+
+    Raises:
+        RowNotFoundException: If the session does not exist or belongs to
+                              another user.
+    """
+    try:
+        session_file = uploads_folder_path / UUID(hex=upload_id).hex / SESSION_FILE
+        async with aiofiles.open(session_file) as opened_file:
+            upload = UploadSession(**json.loads(await opened_file.read()))
+    except (ValueError, OSError):
+        raise RowNotFoundException(SESSION_NOT_FOUND)
+
+    if upload.owner != owner:
+        raise RowNotFoundException(SESSION_NOT_FOUND)
+    return upload
+
+
+async def write_chunk(
+    upload: UploadSession, index: int, offset: int, content: AsyncIterator[bytes]
+) -> None:
+    """
+    Store a chunk of an upload.
+
+    The chunk is written to a temporary file and renamed into place once it is
+    complete, so a retried chunk simply replaces the previous attempt.
+
+    Args:
+        upload (UploadSession): The upload session.
+        index (int): The number of the chunk, starting from zero.
+        offset (int): The position of the chunk in the file, in bytes.
+        content (AsyncIterator[bytes]): The streamed content of the chunk.
+
+    Raises:
+        FileException: If the index, offset or length of the chunk does not
+                       match the session.
+    """
+    if not 0 <= index < upload.chunk_count:
+        raise FileException(
+            f"Chunk index must be between 0 and {upload.chunk_count - 1}."
+        )
+    if offset != index * upload.chunk_size:
+        raise FileException(
+            f"Chunk {index} must start at offset {index * upload.chunk_size}."
+        )
+
+    expected_length = upload.chunk_length(index)
+    length_message = f"Chunk {index} must be exactly {expected_length} bytes long."
+    temp_file = upload.folder / f".{uuid4().hex}.part"
+    written = 0
+    try:
+        async with aiofiles.open(temp_file, "wb") as opened_file:
+            async for data in content:
+                written += len(data)
+                if written > expected_length:
+                    raise FileException(length_message)
+                await opened_file.write(data)
+        if written != expected_length:
+            raise FileException(length_message)
+        temp_file.replace(upload.chunk_path(index))
+    except BaseException:
+        temp_file.unlink(missing_ok=True)
+        raise
+
+
+def get_received_chunks(upload: UploadSession) -> List[int]:
+    """Return the numbers of the chunks that were stored, in ascending order."""
+    return sorted(int(path.stem) for path in upload.folder.glob(f"*{CHUNK_SUFFIX}"))
+
+
+def get_upload_progress(upload: UploadSession) -> UploadSessionResponseSchema:
+    """
+    Describe the state of an upload session.
+
+    Args:
+        upload (UploadSession): The upload session.
+
+    Returns:
+        UploadSessionResponseSchema: The session parameters and received chunks.
+    """
+    received_chunks = get_received_chunks(upload)
+    return UploadSessionResponseSchema(
+        upload_id=upload.upload_id,
+        size=upload.size,
+        chunk_size=upload.chunk_size,
+        chunk_count=upload.chunk_count,
+        received_chunks=received_chunks,
+        received_bytes=sum(upload.chunk_length(index) for index in received_chunks),
+    )
+
+
+def copy_file_contents(source: IO[bytes], target: IO[bytes]) -> None:
+    """
+    Append a file to another one without copying it through user space.
+
+    `os.copy_file_range` lets the kernel copy the data, or share the extents
+    on filesystems with reflink support. Platforms and filesystems without it
+    fall back to a regular buffered copy.
+    """
+    remaining = os.fstat(source.fileno()).st_size
+    try:
+        while remaining > 0:
+            copied = os.copy_file_range(source.fileno(), target.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+    except (AttributeError, OSError):
+        shutil.copyfileobj(source, target)
+
+
+def assemble_file(upload: UploadSession, target_file: Path) -> str:
+    """
+    Concatenate the chunks of a complete upload into a single local file.
+
+    Runs in a worker thread. The digest of the assembled file is computed by
+    reading it once.
+
+    Returns:
+        str: The SHA-256 digest of the assembled file.
+    """
+    # Unbuffered, so kernel copies and the buffered fallback cannot interleave
+    with open(target_file, "wb", buffering=0) as target:
+        for index in range(upload.chunk_count):
+            with open(upload.chunk_path(index), "rb") as source:
+                copy_file_contents(source, target)
+
+    with open(target_file, "rb") as assembled:
+        return hashlib.file_digest(assembled, "sha256").hexdigest()
+
+
+async def complete_upload(upload: UploadSession) -> ReceivedFile:
+    """
+    Assemble a complete upload into a temporary file and remove its session.
+
+    Args:
+        upload (UploadSession): The upload session.
+
+    Returns:
+        ReceivedFile: The assembled file with the digest and size of its content.
+
+    Raises:
+        FileException: If some chunks were not uploaded yet.
+    """
+    received = set(get_received_chunks(upload))
+    missing = [index for index in range(upload.chunk_count) if index not in received]
+    if missing:
+        raise FileException(f"Upload is incomplete. Missing chunks: {missing}.")
+
+    # Next to the session folders, so that removing the session keeps the file
+    temp_file = uploads_folder_path / f".{uuid4().hex}.part"
+    try:
+        sha256 = await asyncio.to_thread(assemble_file, upload, temp_file)
+    except BaseException:
+        temp_file.unlink(missing_ok=True)
+        raise
+
+    await asyncio.to_thread(shutil.rmtree, upload.folder, True)
+    return ReceivedFile(
+        path=temp_file,
+        sha256=sha256,
+        size=upload.size,
+        extension=Path(upload.filename).suffix.lower(),
+    )
+
+
+async def remove_expired_upload_sessions(
+    max_age: float = settings.MEDIA_UPLOAD_SESSION_TTL,
+) -> int:
+    """
+    Remove upload sessions that have not received a chunk for `max_age` seconds.
+
+    Returns:
+        int: The number of removed sessions.
+    """
+
+    def remove_expired() -> int:
+        if not uploads_folder_path.exists():
+            return 0
+
+        deadline = time.time() - max_age
+        removed = 0
+        for folder in uploads_folder_path.iterdir():
+            if folder.is_dir() and folder.stat().st_mtime < deadline:
+                shutil.rmtree(folder, ignore_errors=True)
+                removed += 1
+        return removed
+
+    removed = await asyncio.to_thread(remove_expired)
+    if removed:
+        logger.info("Removed %s abandoned upload sessions", removed)
+    return removed
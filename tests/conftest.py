@@ -1,13 +1,18 @@
 from pathlib import Path
 
 import pytest
+from fastapi import Request
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.pool import NullPool
 
 from main import app
+from src import functions, storage
+from src.cache import tweet_cache
 from src.database.config import settings
 from src.database.models import Base, Follow, Tweet, User
-from src.database.service import create_session
+from src.database.service import create_read_session, create_session, get_session_maker
+from src.database.unit_of_work import request_unit_of_work
+from src.storage import LocalStorage
 from tests.prepare_data import populate_database
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///test.db-dev"
@@ -17,12 +22,14 @@ session_test = async_sessionmaker(
 )
 
 
-async def override_create_session():
-    async with session_test() as session:
+async def override_create_session(request: Request):
+    async with request_unit_of_work(request, session_test) as session:
         yield session
 
 
 app.dependency_overrides[create_session] = override_create_session
+app.dependency_overrides[create_read_session] = override_create_session
+app.dependency_overrides[get_session_maker] = lambda: session_test
 
 
 async def setup_db():
@@ -38,6 +45,7 @@ async def teardown_db():
 @pytest.fixture(scope="class", autouse=True)
 async def prepare_database():
     assert settings.MODE == "TEST"
+    tweet_cache.clear()
     await setup_db()
     yield
     await teardown_db()
@@ -88,3 +96,12 @@ async def test_tweet(session, users_and_followers):
     await session.commit()
     await session.refresh(tweet)
     return tweet
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch) -> LocalStorage:
+    """Media storage in a temporary folder."""
+    media_storage = LocalStorage(tmp_path)
+    monkeypatch.setattr(storage, "_storage", media_storage)
+    monkeypatch.setattr(functions, "media_folder_path", tmp_path)
+    return media_storage
@@ -0,0 +1,39 @@
+from src.cache import VersionedCache
+
+
+class TestVersionedCache:
+    def test_get_and_set(self) -> None:
+        """Тест чтения значения, сохраненного для текущей версии."""
+        cache: VersionedCache[str] = VersionedCache(maxsize=10)
+        assert cache.get(1) is None
+
+        cache.set(1, cache.version(1), "tweet")
+        assert cache.get(1) == "tweet"
+
+    def test_invalidate_discards_stale_value(self) -> None:
+        """Тест отбрасывания значения, загруженного до инвалидации."""
+        cache: VersionedCache[str] = VersionedCache(maxsize=10)
+        version = cache.version(1)
+
+        cache.invalidate(1)
+        cache.set(1, version, "stale")
+
+        assert cache.get(1) is None
+        assert cache.version(1) == version + 1
+
+    def test_lru_eviction(self) -> None:
+        """Тест ограничения размера кэша с вытеснением давних записей."""
+        cache: VersionedCache[int] = VersionedCache(maxsize=2)
+        for key in range(3):
+            cache.set(key, 0, key)
+
+        assert cache.get(0) is None
+        assert cache.get(2) == 2
+
+    def test_ttl_expiration(self) -> None:
+        """Тест истечения срока жизни записи, не зависящего от инвалидации."""
+        cache: VersionedCache[str] = VersionedCache(maxsize=10, ttl=-1)
+        cache.set(1, cache.version(1), "tweet")
+
+        assert cache.get(1) is None
+        assert not cache.entries
@@ -0,0 +1,108 @@
+import gzip
+from typing import AsyncGenerator
+
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from httpx import ASGITransport, AsyncClient
+
+from src import compression
+from src.cache import compressed_body_cache
+from src.compression import (
+    CompressionMiddleware,
+    cache_compressed_body,
+    negotiate_encoding,
+)
+
+PREFERRED = "br" if compression.brotli is not None else "gzip"
+PAYLOAD = {"tweets": [{"id": i, "content": "Hello, #world"} for i in range(100)]}
+
+
+@pytest.fixture
+async def client() -> AsyncGenerator[AsyncClient, None]:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500, thread_size=2000)
+
+    @app.get("/feed")
+    async def feed() -> JSONResponse:
+        return JSONResponse(PAYLOAD)
+
+    @app.get("/cached")
+    async def cached(request: Request) -> JSONResponse:
+        cache_compressed_body(request)
+        return JSONResponse(PAYLOAD)
+
+    @app.get("/small")
+    async def small() -> JSONResponse:
+        return JSONResponse({"result": True})
+
+    @app.get("/image")
+    async def image() -> Response:
+        return Response(b"\xff" * 1000, media_type="image/jpeg")
+
+    compressed_body_cache.clear()
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        yield ac
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip", "gzip"),
+        ("gzip, deflate", "gzip"),
+        ("", None),
+        ("identity", None),
+        ("gzip;q=0", None),
+        ("br;q=0.5, gzip", "gzip"),
+        ("*", PREFERRED),
+        ("*;q=0, gzip;q=0.1", "gzip"),
+    ],
+)
+def test_negotiate_encoding(accept_encoding: str, expected: str) -> None:
+    """Тест выбора способа сжатия по заголовку Accept-Encoding."""
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+async def test_compress_json(client: AsyncClient) -> None:
+    """Тест сжатия большого JSON-ответа gzip в потоке."""
+    response = await client.get("/feed", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json() == PAYLOAD
+
+
+@pytest.mark.parametrize(
+    "path, accept_encoding",
+    [("/small", "gzip"), ("/image", "gzip"), ("/feed", "identity")],
+)
+async def test_skip_compression(
+    client: AsyncClient, path: str, accept_encoding: str
+) -> None:
+    """Тест отправки маленьких, бинарных и не принимаемых клиентом ответов без сжатия."""
+    response = await client.get(path, headers={"Accept-Encoding": accept_encoding})
+
+    assert "content-encoding" not in response.headers
+    assert int(response.headers["content-length"]) == len(response.content)
+
+
+async def test_cache_compressed_body(client: AsyncClient, monkeypatch) -> None:
+    """Тест однократного сжатия повторяющегося тела закэшированного ответа."""
+    calls = []
+
+    def counting_compress(body: bytes, encoding: str) -> bytes:
+        calls.append(encoding)
+        return gzip.compress(body)
+
+    monkeypatch.setattr(compression, "compress", counting_compress)
+
+    for _ in range(3):
+        response = await client.get("/cached", headers={"Accept-Encoding": "gzip"})
+        assert response.json() == PAYLOAD
+    await client.get("/feed", headers={"Accept-Encoding": "gzip"})
+
+    assert calls == ["gzip", "gzip"]
+    assert compressed_body_cache.stats["hits"] == 2
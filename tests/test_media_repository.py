@@ -1,4 +1,19 @@
-from src.database.repositories.media_repository import add_media
+import hashlib
+import os
+import time
+from datetime import timedelta
+
+from sqlalchemy import select, update
+
+from src.database.models import Media, MediaFile, Tweet
+from src.database.repositories.media_repository import (
+    add_media,
+    add_uploaded_media,
+    filter_unreferenced_files,
+    purge_orphaned_media,
+    release_media_files,
+)
+from src.functions import ReceivedFile
 from src.schemas.tweet_schemas import NewMediaResponseSchema
 
 
@@ -7,3 +22,129 @@ async def test_add_media_success(session):
     test_link = "media/test/test_media.jpg"
     response = await add_media(test_link, session)
     assert isinstance(response, NewMediaResponseSchema)
+
+
+class TestMediaFileReferences:
+    async def test_add_media_deduplicated(self, session):
+        """Тест подсчета ссылок на один файл при повторной загрузке"""
+        sha256 = "a" * 64
+        link = f"media/aa/{sha256}.jpg"
+
+        first = await add_media(link, session, sha256=sha256, size=4)
+        second = await add_media(link, session, sha256=sha256, size=4)
+        assert first.media_id != second.media_id
+
+        media_file = await session.get(MediaFile, sha256)
+        await session.refresh(media_file)
+        assert media_file.ref_count == 2
+
+    async def test_add_uploaded_media(self, session, local_storage):
+        """Тест сохранения файла только при первой ссылке на его содержимое"""
+        sha256 = hashlib.sha256(b"meme").hexdigest()
+        links = []
+        for name, extension in (("first", ".png"), ("repost", ".jpeg")):
+            temp_file = local_storage.root / f".{name}.part"
+            temp_file.write_bytes(b"meme")
+            response, link = await add_uploaded_media(
+                ReceivedFile(temp_file, sha256, 4, extension), session
+            )
+            assert isinstance(response, NewMediaResponseSchema)
+            assert not temp_file.exists()
+            links.append(link)
+
+        stored_file = (local_storage.root / sha256[:2] / f"{sha256}.png").resolve()
+        assert links == [str(stored_file), str(stored_file)]
+        assert stored_file.read_bytes() == b"meme"
+        assert len(list(local_storage.root.rglob("*"))) == 2
+
+        media_file = await session.get(MediaFile, sha256)
+        await session.refresh(media_file)
+        assert media_file.ref_count == 2
+
+    async def test_release_media_files(self, session):
+        """Тест освобождения файла после удаления последней ссылки"""
+        sha256 = "a" * 64
+        media = (
+            await session.scalars(select(Media).where(Media.sha256 == sha256))
+        ).all()
+        for entry in media:
+            await session.delete(entry)
+
+        assert await release_media_files([sha256], session) == []
+        assert await release_media_files([sha256, None], session) == [
+            f"media/aa/{sha256}.jpg"
+        ]
+        await session.commit()
+
+        session.expunge_all()
+        assert await session.get(MediaFile, sha256) is None
+
+
+class TestOrphanedMedia:
+    async def test_purge_orphaned_media(self, session, users_and_followers, tmp_path):
+        """Тест удаления старых неприкрепленных медиа вместе с файлами"""
+        files = []
+        for name in ("orphan", "fresh", "published"):
+            path = tmp_path / f"{name}.jpg"
+            path.write_bytes(name.encode())
+            files.append(path)
+        orphan, fresh, published = [
+            (await add_media(str(path), session)).media_id for path in files
+        ]
+        tweet = Tweet(author_id=users_and_followers[0].id, tweet_data="With media")
+        session.add(tweet)
+        await session.flush()
+        await session.execute(
+            update(Media).where(Media.id == published).values(tweet_id=tweet.id)
+        )
+        await session.execute(
+            update(Media)
+            .where(Media.id.in_([orphan, published]))
+            .values(created_at=Media.created_at - timedelta(days=2))
+        )
+        await session.commit()
+
+        reclaimed = await purge_orphaned_media(session, timedelta(days=1))
+        assert reclaimed.entries == 1
+        assert reclaimed.size == len(b"orphan")
+        assert [path.exists() for path in files] == [False, True, True]
+
+        reclaimed = await purge_orphaned_media(session, timedelta(days=1))
+        assert reclaimed.entries == 0
+
+        session.expunge_all()
+        remaining = (await session.scalars(select(Media.id))).all()
+        assert orphan not in remaining
+        assert {fresh, published} <= set(remaining)
+
+    async def test_filter_unreferenced_files(self, session, local_storage):
+        """Тест поиска файлов на диске, на которые не ссылается ни одна запись"""
+        tmp_path = local_storage.root
+        sha256 = hashlib.sha256(b"kept").hexdigest()
+        lost_sha256 = hashlib.sha256(b"lost").hexdigest()
+        kept_file = tmp_path / sha256[:2] / f"{sha256}.jpg"
+        kept_file.parent.mkdir()
+        kept_file.write_bytes(b"kept")
+        thumbnail = kept_file.with_name(f"{sha256}_320w.jpg")
+        thumbnail.write_bytes(b"thumb")
+        lost_file = tmp_path / lost_sha256[:2] / f"{lost_sha256}.jpg"
+        lost_file.parent.mkdir(exist_ok=True)
+        lost_file.write_bytes(b"lost")
+        legacy_file = tmp_path / "legacy.jpg"
+        legacy_file.write_bytes(b"legacy")
+        lost_legacy_file = tmp_path / "lost_legacy.jpg"
+        lost_legacy_file.write_bytes(b"lost legacy")
+        (tmp_path / ".uploads").mkdir()
+        (tmp_path / ".uploads" / "chunk").write_bytes(b"chunk")
+
+        await add_media(str(kept_file), session, sha256=sha256, size=4)
+        await add_media(str(legacy_file), session)
+
+        expired = time.time() - 3600
+        for path in tmp_path.rglob("*"):
+            os.utime(path, (expired, expired))
+        links = await local_storage.list_stale(older_than=60)
+        assert len(links) == 5
+
+        unreferenced = await filter_unreferenced_files(links, session)
+        assert sorted(unreferenced) == sorted([str(lost_file), str(lost_legacy_file)])
@@ -0,0 +1,63 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+
+from main import app
+from src.cache import tweet_cache
+from src.database.service import engine
+from src.metrics import refresh_metrics
+
+
+def sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.usefixtures("populate_database_fixture")
+class TestMetrics:
+    async def test_request_metrics(self) -> None:
+        """Тест гистограммы задержек и числа запросов к базе по маршрутам."""
+        endpoint = "GET /api/tweets/{tweet_id}"
+        requests_before = sample(
+            "http_request_duration_seconds_count", endpoint=endpoint, status="200"
+        )
+        statements_before = sample("db_statements_total", endpoint=endpoint)
+
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as ac:
+            for _ in range(2):
+                response = await ac.get("/api/tweets/1", headers={"api-key": "test"})
+                assert response.status_code == 200
+            await ac.get("/api/unknown/path")
+            response = await ac.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert f'http_request_duration_seconds_bucket{{endpoint="{endpoint}"' in (
+            response.text
+        )
+        assert 'http_requests_in_progress{method="GET"}' in response.text
+        assert (
+            sample(
+                "http_request_duration_seconds_count", endpoint=endpoint, status="200"
+            )
+            == requests_before + 2
+        )
+        assert sample("db_statements_total", endpoint=endpoint) > statements_before
+        assert sample(
+            "http_request_duration_seconds_count", endpoint="unmatched", status="404"
+        )
+
+    def test_refresh_adds_growth_only(self) -> None:
+        """Тест переноса счётчиков кэша и пула без повторного учёта."""
+        refresh_metrics([engine])
+        hits = sample("cache_requests_total", cache="tweet", result="hit")
+
+        tweet_cache.stats["hits"] += 3
+        refresh_metrics([engine])
+        refresh_metrics([engine])
+
+        assert sample("cache_requests_total", cache="tweet", result="hit") == hits + 3
+        assert (
+            REGISTRY.get_sample_value("db_pool_size", {"pool": "primary"}) is not None
+        )
@@ -1,6 +1,16 @@
+import hashlib
+import io
+import json
+
+import msgpack
 import pytest
+from fastapi import UploadFile
 
-from src.functions import allowed_file
+from src import responses
+from src.functions import allowed_file, save_uploaded_file
+from src.handlers.exceptions import FileException, FileTooLargeException
+from src.responses import SchemaResponse, accepts_msgpack
+from src.schemas.tweet_schemas import TweetResponseSchema
 
 
 @pytest.mark.parametrize(
@@ -26,3 +36,98 @@ async def test_allowed_file(filename, expected):
     Функция проверяет, разрешен ли файл для загрузки, в зависимости от его расширения.
     """
     assert await allowed_file(filename) == expected
+
+
+class TestSaveUploadedFile:
+    @pytest.fixture
+    def media_folder(self, local_storage):
+        return local_storage.root
+
+    async def test_save_uploaded_file_in_chunks(self, media_folder) -> None:
+        """Тест сохранения файла по частям во временный файл с хэшем содержимого."""
+        content = b"x" * 10_000
+        sha256 = hashlib.sha256(content).hexdigest()
+        upload_file = UploadFile(file=io.BytesIO(content), filename="image.jpg")
+
+        received_file = await save_uploaded_file(upload_file, chunk_size=1024)
+
+        assert received_file.path.parent == media_folder
+        assert received_file.path.suffix == ".part"
+        assert received_file.path.read_bytes() == content
+        assert received_file.sha256 == sha256
+        assert received_file.size == len(content)
+        assert received_file.extension == ".jpg"
+
+    async def test_save_uploaded_file_too_large(self, media_folder) -> None:
+        """Тест прерывания загрузки слишком большого файла без остатков на диске."""
+        upload_file = UploadFile(file=io.BytesIO(b"x" * 5000), filename="image.jpg")
+
+        with pytest.raises(FileTooLargeException) as exc_info:
+            await save_uploaded_file(upload_file, chunk_size=1024, max_size=4096)
+
+        assert exc_info.value.status_code == 413
+        assert not any(media_folder.iterdir())
+
+    async def test_save_uploaded_file_not_allowed(self, media_folder) -> None:
+        """Тест отказа в сохранении файла с неразрешенным расширением."""
+        upload_file = UploadFile(file=io.BytesIO(b"x"), filename="script.js")
+
+        with pytest.raises(FileException):
+            await save_uploaded_file(upload_file)
+
+
+def test_schema_response() -> None:
+    """Тест кодирования схем через orjson так же, как их сериализует pydantic."""
+    schema = TweetResponseSchema.model_validate(
+        {
+            "tweets": [
+                {
+                    "id": 1,
+                    "content": "Привет, #мир",
+                    "attachments": ["/api/medias/1"],
+                    "media": [{"id": 1, "link": "/api/medias/1", "derivatives": []}],
+                    "author": {"id": 1, "name": "Test"},
+                    "likes": [{"user_id": 2, "name": "Other"}],
+                }
+            ]
+        }
+    )
+
+    response = SchemaResponse(schema)
+    response.render_for("application/json")
+
+    assert json.loads(response.body) == schema.model_dump(mode="json")
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["content-length"] == str(len(response.body))
+
+
+def test_schema_response_msgpack_rendered_once(monkeypatch) -> None:
+    """Тест кодирования MessagePack без предварительного кодирования в JSON."""
+
+    def fail(*args, **kwargs):
+        raise AssertionError("JSON must not be rendered")
+
+    monkeypatch.setattr(responses.orjson, "dumps", fail)
+    response = SchemaResponse({"result": True})
+    response.render_for("application/msgpack")
+
+    assert msgpack.unpackb(response.body) == {"result": True}
+    assert response.headers["content-type"] == "application/msgpack"
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        ("application/msgpack", True),
+        ("application/x-msgpack", True),
+        ("application/msgpack, application/json", True),
+        ("application/json, application/msgpack;q=0.5", False),
+        ("application/msgpack;q=0.9, */*;q=0.1", True),
+        ("application/msgpack;q=0", False),
+        ("*/*", False),
+        ("", False),
+    ],
+)
+def test_accepts_msgpack(accept: str, expected: bool) -> None:
+    """Тест выбора формата MessagePack по заголовку Accept."""
+    assert accepts_msgpack(accept) is expected
@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete, select
+
+from main import app
+from src.cache import tweet_cache
+from src.database import outbox
+from src.database.models import OutboxEvent, User
+from src.database.outbox import (
+    LIKE_ADDED,
+    TWEET_CREATED,
+    TWEET_DELETED,
+    add_event,
+    dispatch_events,
+    handler_name,
+    retry_delay,
+)
+from src.database.repositories.user_repository import get_user_id_by
+from src.trends import trend_tracker
+from tests.conftest import session_test
+
+
+@pytest.mark.usefixtures("populate_database_fixture")
+class TestOutbox:
+    async def test_events_written_with_changes(self) -> None:
+        """Тест записи событий в outbox вместе с изменениями запроса."""
+        async with session_test() as session:
+            followed = User(username="outbox_user", name="Outbox User")
+            session.add(followed)
+            await session.commit()
+            user_id = await get_user_id_by("test", session)
+
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as ac:
+            response = await ac.post(
+                "/api/tweets",
+                json={"tweet_data": "Outbox #events", "tweet_media_ids": []},
+                headers={"api-key": "test"},
+            )
+            tweet_id = response.json()["tweet_id"]
+            await ac.post(f"/api/tweets/{tweet_id}/likes", headers={"api-key": "test"})
+            await ac.post(
+                f"/api/users/{followed.id}/follow", headers={"api-key": "test"}
+            )
+            response = await ac.post(
+                "/api/users/999/follow", headers={"api-key": "test"}
+            )
+            assert response.status_code == 404
+
+        async with session_test() as session:
+            events = (await session.scalars(select(OutboxEvent))).all()
+        assert [(event.topic, event.payload) for event in events] == [
+            (
+                TWEET_CREATED,
+                {
+                    "tweet_id": tweet_id,
+                    "author_id": user_id,
+                    "tweet_data": "Outbox #events",
+                },
+            ),
+            (LIKE_ADDED, {"tweet_id": tweet_id, "user_id": user_id}),
+        ]
+
+    async def test_dispatch_and_retry(self, monkeypatch) -> None:
+        """Тест доставки событий обработчикам и повтора неудачных с задержкой."""
+        received: List[Dict[str, Any]] = []
+
+        async def flaky_handler(payload: Dict[str, Any]) -> None:
+            received.append(payload)
+            raise RuntimeError("Unavailable")
+
+        monkeypatch.setitem(outbox.handlers, LIKE_ADDED, [flaky_handler])
+        trend_tracker.buckets.clear()
+
+        assert await dispatch_events(session_test) == (1, 1)
+        assert len(received) == 1
+        assert trend_tracker.top()[0][0] == "events"
+
+        async with session_test() as session:
+            (event,) = (await session.scalars(select(OutboxEvent))).all()
+        assert event.topic == LIKE_ADDED
+        assert event.attempts == 1
+        assert event.last_error == "RuntimeError('Unavailable')"
+
+        # The failed event waits for its retry delay
+        assert await dispatch_events(session_test) == (0, 0)
+        assert retry_delay(1).total_seconds() == 1
+        assert retry_delay(20).total_seconds() == 60 * 60
+
+    async def test_retry_skips_delivered_handlers(self, monkeypatch) -> None:
+        """Тест повтора только тех обработчиков, которые не обработали событие."""
+        calls: List[str] = []
+
+        async def counting_handler(payload: Dict[str, Any]) -> None:
+            calls.append("counting")
+
+        async def flaky_handler(payload: Dict[str, Any]) -> None:
+            calls.append("flaky")
+            if calls.count("flaky") == 1:
+                raise RuntimeError("Unavailable")
+
+        monkeypatch.setitem(
+            outbox.handlers, LIKE_ADDED, [counting_handler, flaky_handler]
+        )
+        async with session_test() as session:
+            await session.execute(delete(OutboxEvent))
+            add_event(session, LIKE_ADDED, tweet_id=1, user_id=1)
+            await session.commit()
+
+        assert await dispatch_events(session_test) == (0, 1)
+        async with session_test() as session:
+            (event,) = (await session.scalars(select(OutboxEvent))).all()
+            assert event.delivered_handlers == [handler_name(counting_handler)]
+            event.available_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+            await session.commit()
+
+        assert await dispatch_events(session_test) == (1, 0)
+        assert calls == ["counting", "flaky", "flaky"]
+
+    async def test_events_invalidate_cached_tweet(self) -> None:
+        """Тест сброса кэша твита обработчиком событий лайков и удаления."""
+        async with session_test() as session:
+            await session.execute(delete(OutboxEvent))
+            add_event(session, LIKE_ADDED, tweet_id=1, user_id=1)
+            add_event(session, TWEET_DELETED, tweet_id=2, author_id=1)
+            await session.commit()
+        for tweet_id in (1, 2):
+            tweet_cache.set(tweet_id, tweet_cache.version(tweet_id), "cached")
+
+        assert await dispatch_events(session_test) == (2, 0)
+        assert tweet_cache.get(1) is None
+        assert tweet_cache.get(2) is None
@@ -0,0 +1,33 @@
+from src.database.partitions import (
+    create_future_partitions,
+    create_partition_statements,
+    detach_partition_statements,
+    partition_number,
+)
+from tests.conftest import engine_test
+
+
+class TestPartitions:
+    def test_partition_bounds(self) -> None:
+        """Тест общих границ партиций твитов и лайков по ID твита."""
+        assert partition_number(2999, size=1000) == 2
+        assert partition_number(3000, size=1000) == 3
+
+        assert create_partition_statements(3, size=1000) == [
+            "CREATE TABLE IF NOT EXISTS tweets_p0003 PARTITION OF tweets "
+            "FOR VALUES FROM (3000) TO (4000)",
+            "CREATE TABLE IF NOT EXISTS likes_p0003 PARTITION OF likes "
+            "FOR VALUES FROM (3000) TO (4000)",
+        ]
+
+    def test_detach_likes_first(self) -> None:
+        """Тест отсоединения партиции лайков раньше партиции твитов."""
+        assert detach_partition_statements(3) == [
+            "ALTER TABLE likes DETACH PARTITION likes_p0003 CONCURRENTLY",
+            "ALTER TABLE tweets DETACH PARTITION tweets_p0003 CONCURRENTLY",
+        ]
+
+    async def test_no_partitions_without_postgres(self) -> None:
+        """Тест пропуска создания партиций на базах кроме PostgreSQL."""
+        async with engine_test.begin() as connection:
+            assert await create_future_partitions(connection) == []
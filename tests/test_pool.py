@@ -0,0 +1,38 @@
+import os
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.database.pool import InstrumentedPool, get_pool_metrics
+
+
+async def test_pool_metrics(tmp_path) -> None:
+    """Тест учета занятых соединений, ожидания и таймаутов пула соединений."""
+    metrics = get_pool_metrics("test")
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedPool,
+        pool_logging_name="test",
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05,
+    )
+    try:
+        async with engine.connect() as first, engine.connect() as second:
+            await first.execute(text("SELECT 1"))
+            await second.execute(text("SELECT 1"))
+            stats = metrics.snapshot(engine.pool)
+            assert (stats.size, stats.checked_out, stats.overflow) == (1, 2, 1)
+
+            with pytest.raises(PoolTimeoutError):
+                await engine.connect().start()
+    finally:
+        await engine.dispose()
+
+    stats = metrics.snapshot(engine.pool)
+    assert stats.pid == os.getpid()
+    assert (stats.checked_out, stats.overflow) == (0, 0)
+    assert (stats.checkouts, stats.timeouts) == (2, 1)
+    assert stats.max_wait_seconds >= 0.05
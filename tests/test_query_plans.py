@@ -0,0 +1,186 @@
+import re
+from contextlib import contextmanager, suppress
+from datetime import timedelta
+from typing import Any, Callable, Coroutine, Dict, Iterator, List, Tuple
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import Base
+from src.database.repositories.follow_repository import delete_follow, follow
+from src.database.repositories.like_repository import (
+    add_like,
+    delete_like,
+    is_like_exist,
+)
+from src.database.repositories.media_repository import (
+    filter_unreferenced_files,
+    purge_orphaned_media,
+)
+from src.database.repositories.tweet_repository import (
+    delete_tweet,
+    get_tweet,
+    get_tweets_selection,
+    get_user_tweets,
+    is_tweet_exist,
+    purge_deleted_tweets,
+)
+from src.database.repositories.user_repository import (
+    get_user_followers,
+    get_user_following,
+    get_user_id_by,
+    get_user_with_followers_and_following,
+    is_user_exist,
+)
+from src.handlers.exceptions import IntegrityViolationException
+from tests.conftest import engine_test
+
+TEST_USERNAME = "test"
+TEST_USER_ID = 11
+
+# A read of tweets bounded by the ID, which prunes the partitions on PostgreSQL
+TWEET_ID_BOUND_PATTERN = re.compile(r"^SEARCH tweets USING .*\bid<\?")
+FULL_SCAN_PATTERN = re.compile(r"^SCAN (\w+)(?! USING (?:COVERING )?INDEX)")
+# SQLite names an aliased table by its alias in the plan
+TABLE_ALIAS_PATTERN = re.compile(
+    r'(?:"?(\w+)"? AS|\b(?:FROM|JOIN) "?(\w+)"?(?! AS\b)) "?(\w+)"?', re.IGNORECASE
+)
+
+RepositoryCall = Callable[[AsyncSession], Coroutine[Any, Any, Any]]
+
+REPOSITORY_CALLS: List[Tuple[str, RepositoryCall]] = [
+    ("is_user_exist", lambda s: is_user_exist(TEST_USER_ID, s)),
+    ("get_user_id_by", lambda s: get_user_id_by(TEST_USERNAME, s)),
+    ("get_user_followers", lambda s: get_user_followers(TEST_USER_ID, s)),
+    ("get_user_following", lambda s: get_user_following(TEST_USER_ID, s)),
+    (
+        "get_user_with_followers_and_following",
+        lambda s: get_user_with_followers_and_following(s, user_id=TEST_USER_ID),
+    ),
+    ("is_tweet_exist", lambda s: is_tweet_exist(1, s)),
+    ("get_tweet", lambda s: get_tweet(TEST_USERNAME, 1, s)),
+    ("get_tweets_selection", lambda s: get_tweets_selection(TEST_USERNAME, s)),
+    (
+        "get_tweets_selection_page",
+        lambda s: get_tweets_selection(TEST_USERNAME, s, limit=5, before_id=100),
+    ),
+    ("get_user_tweets", lambda s: get_user_tweets(2, s, limit=5, before_id=100)),
+    ("is_like_exist", lambda s: is_like_exist(TEST_USER_ID, 1, s)),
+    ("add_like", lambda s: add_like(TEST_USERNAME, 1, s)),
+    ("delete_like", lambda s: delete_like(TEST_USERNAME, 1, s)),
+    ("follow", lambda s: follow(TEST_USERNAME, 3, s)),
+    ("delete_follow", lambda s: delete_follow(TEST_USERNAME, 3, s)),
+    ("delete_tweet", lambda s: delete_tweet(TEST_USERNAME, 5, s)),
+    ("purge_deleted_tweets", lambda s: purge_deleted_tweets(s)),
+    ("purge_orphaned_media", lambda s: purge_orphaned_media(s, timedelta(days=1))),
+    (
+        "filter_unreferenced_files",
+        lambda s: filter_unreferenced_files([f"media/aa/{'a' * 64}.jpg", "x.jpg"], s),
+    ),
+]
+
+
+@contextmanager
+def capture_statements() -> Iterator[List[Tuple[str, Any]]]:
+    """Collect every statement sent to the test database."""
+    statements: List[Tuple[str, Any]] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        statements.append((statement, parameters))
+
+    event.listen(
+        engine_test.sync_engine, "before_cursor_execute", before_cursor_execute
+    )
+    try:
+        yield statements
+    finally:
+        event.remove(
+            engine_test.sync_engine, "before_cursor_execute", before_cursor_execute
+        )
+
+
+async def explain(statement: str, parameters: Any) -> List[str]:
+    """Return the query plan lines of a statement."""
+    async with engine_test.connect() as conn:
+        result = await conn.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        )
+        return [row[-1] for row in result]
+
+
+def table_aliases(statement: str) -> Dict[str, str]:
+    """Map the names a statement gives to its tables back to the tables."""
+    aliases = {name: name for name in Base.metadata.tables}
+    for match in TABLE_ALIAS_PATTERN.finditer(statement):
+        table = match.group(1) or match.group(2)
+        if table in Base.metadata.tables:
+            aliases[match.group(3)] = table
+    return aliases
+
+
+def full_table_scans(statement: str, plan: List[str]) -> List[str]:
+    """Return the plan lines that read a whole table without an index."""
+    aliases = table_aliases(statement)
+    return [
+        line
+        for line in plan
+        if (match := FULL_SCAN_PATTERN.match(line)) and match.group(1) in aliases
+    ]
+
+
+def test_full_table_scans_resolve_aliases() -> None:
+    """Тест распознавания полного чтения таблицы под псевдонимом."""
+    statement = (
+        "SELECT t.id FROM tweets AS t JOIN users u ON u.id = t.author_id "
+        "WHERE t.id = ?"
+    )
+    plan = ["SCAN t", "SEARCH u USING INTEGER PRIMARY KEY (rowid=?)", "SCAN u"]
+
+    assert full_table_scans(statement, plan) == ["SCAN t", "SCAN u"]
+    assert not full_table_scans(statement, ["SCAN CONSTANT ROW"])
+
+
+@pytest.mark.usefixtures("populate_database_fixture")
+class TestQueryPlans:
+    @pytest.mark.parametrize(
+        "call",
+        [call for _, call in REPOSITORY_CALLS],
+        ids=[n for n, _ in REPOSITORY_CALLS],
+    )
+    async def test_repository_query_uses_indexes(
+        self, session: AsyncSession, call: RepositoryCall
+    ) -> None:
+        """Проверяет, что запросы репозиториев не читают таблицы целиком."""
+        with capture_statements() as statements:
+            with suppress(HTTPException, IntegrityViolationException):
+                await call(session)
+
+        queries = [
+            (statement, parameters)
+            for statement, parameters in statements
+            if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE"))
+        ]
+        assert queries
+
+        for statement, parameters in queries:
+            plan = await explain(statement, parameters)
+            assert not full_table_scans(statement, plan), f"{statement}\n{plan}"
+
+    async def test_feed_query_is_bounded(self, session: AsyncSession) -> None:
+        """Проверяет, что лента читает твиты ниже курсора и не больше страницы."""
+        with capture_statements() as statements:
+            await get_tweets_selection(TEST_USERNAME, session, limit=5, before_id=100)
+
+        feed_queries = [
+            (statement, parameters)
+            for statement, parameters in statements
+            if re.search(r"\bJOIN follows\b", statement)
+        ]
+        assert len(feed_queries) == 1
+
+        statement, parameters = feed_queries[0]
+        assert "LIMIT" in statement
+        plan = await explain(statement, parameters)
+        assert any(TWEET_ID_BOUND_PATTERN.match(line) for line in plan), plan
@@ -0,0 +1,73 @@
+import time
+from typing import AsyncGenerator
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from main import app
+from src.database import service
+from src.database.models import Base, User
+from src.database.service import LAST_WRITE_COOKIE, create_read_session, create_session
+
+
+@pytest.fixture
+async def databases(tmp_path, monkeypatch) -> AsyncGenerator[AsyncClient, None]:
+    """Основная база и отстающая от нее реплика с разными именами пользователя."""
+    for name, user_name in [
+        ("async_session", "Primary"),
+        ("async_read_session", "Replica"),
+    ]:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / name}.db", poolclass=NullPool
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_maker() as session:
+            session.add_all(
+                [
+                    User(username="writer", name=user_name),
+                    User(username="reader", name=user_name),
+                ]
+            )
+            await session.commit()
+        monkeypatch.setattr(service, name, session_maker)
+
+    monkeypatch.delitem(app.dependency_overrides, create_session)
+    monkeypatch.delitem(app.dependency_overrides, create_read_session)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        yield ac
+
+
+async def get_name(ac: AsyncClient, api_key: str) -> str:
+    response = await ac.get("/api/users/me", headers={"api-key": api_key})
+    return response.json()["user"]["name"]
+
+
+async def test_read_your_writes(databases: AsyncClient) -> None:
+    """Тест чтения с реплики и с основной базы в течение окна после записи."""
+    ac = databases
+    assert await get_name(ac, "writer") == "Replica"
+
+    response = await ac.post(
+        "/api/tweets",
+        json={"tweet_data": "Hello", "tweet_media_ids": []},
+        headers={"api-key": "writer"},
+    )
+    assert response.status_code == 201
+    assert LAST_WRITE_COOKIE in response.cookies
+
+    assert await get_name(ac, "writer") == "Primary"
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as other_client:
+        assert await get_name(other_client, "reader") == "Replica"
+
+    ac.cookies.clear()
+    ac.cookies.set(LAST_WRITE_COOKIE, str(time.time() - 3600))
+    assert await get_name(ac, "writer") == "Replica"
@@ -3,10 +3,14 @@ import tempfile
 from pathlib import Path
 from typing import Any, AsyncGenerator, Dict, Generator
 
+import msgpack
 import pytest
 from httpx import ASGITransport, AsyncClient
 
 from main import app
+from src import functions, storage, uploads
+from src.database.config import settings
+from src.storage import LocalStorage
 
 
 @pytest.mark.usefixtures("populate_database_fixture")
@@ -35,6 +39,18 @@ class TestApi:
         tweet_data = {"tweet_data": "Test tweet", "tweet_media_ids": []}
         return await ac.post("/api/tweets", json=tweet_data, headers=api_key)
 
+    @pytest.fixture(scope="class", autouse=True)
+    def media_storage(self, tmp_path_factory) -> Generator[LocalStorage, None, None]:
+        """Хранение загруженных медиафайлов во временной папке на время класса."""
+        media_storage = LocalStorage(tmp_path_factory.mktemp("media"))
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            monkeypatch.setattr(storage, "_storage", media_storage)
+            monkeypatch.setattr(functions, "media_folder_path", media_storage.root)
+            monkeypatch.setattr(
+                uploads, "uploads_folder_path", media_storage.root / ".uploads"
+            )
+            yield media_storage
+
     @pytest.fixture(scope="class")
     def temp_image(self) -> Generator[str, None, None]:
         """Создание временного изображения для тестов."""
@@ -111,6 +127,32 @@ class TestApi:
         else:
             assert data["error_message"] == expected_error
 
+    @pytest.mark.parametrize(
+        "user_id, expected_status, expected_result",
+        [
+            (2, 200, True),
+            (1000, 404, False),
+        ],
+    )
+    async def test_get_user_timeline(
+        self,
+        ac: AsyncClient,
+        user_id: int,
+        expected_status: int,
+        expected_result: bool,
+    ) -> None:
+        """Тест получения твитов пользователя с курсорной пагинацией."""
+        response = await ac.get(f"/api/users/{user_id}/tweets", params={"limit": 1})
+
+        assert response.status_code == expected_status
+        data = response.json()
+        assert data["result"] is expected_result
+
+        if expected_result:
+            assert len(data["tweets"]) == 1
+            assert data["tweets"][0]["author"]["id"] == user_id
+            assert data["next_cursor"] == data["tweets"][0]["id"]
+
     @pytest.mark.parametrize(
         "headers_value, expected_status, expected_result",
         [
@@ -137,6 +179,69 @@ class TestApi:
         data = response.json()
         assert data["result"] is expected_result
 
+    @pytest.mark.parametrize(
+        "headers_value, tweet_id, expected_status, expected_result",
+        [
+            ("api_key", "valid_tweet", 200, True),
+            ("api_key", 999, 404, False),
+            ("wrong_api_key", "valid_tweet", 404, False),
+        ],
+    )
+    async def test_get_tweet_by_id(
+        self,
+        ac: AsyncClient,
+        api_key: Dict[str, str],
+        wrong_api_key: Dict[str, str],
+        add_tweet: Any,
+        headers_value: str,
+        tweet_id: Any,
+        expected_status: int,
+        expected_result: bool,
+    ) -> None:
+        """Тест получения одного твита по идентификатору."""
+        headers = api_key if headers_value == "api_key" else wrong_api_key
+        if tweet_id == "valid_tweet":
+            tweet_id = add_tweet.json()["tweet_id"]
+
+        response = await ac.get(f"/api/tweets/{tweet_id}", headers=headers)
+
+        assert response.status_code == expected_status
+        data = response.json()
+        assert data["result"] is expected_result
+
+        if expected_result:
+            assert data["tweet"]["id"] == tweet_id
+            assert data["tweet"]["content"] == "Test tweet"
+
+    @pytest.mark.parametrize(
+        "path, headers_value",
+        [
+            ("/api/tweets", "api_key"),
+            ("/api/users/me", "api_key"),
+            ("/api/tweets", "wrong_api_key"),
+        ],
+    )
+    async def test_msgpack_response(
+        self,
+        ac: AsyncClient,
+        api_key: Dict[str, str],
+        wrong_api_key: Dict[str, str],
+        path: str,
+        headers_value: str,
+    ) -> None:
+        """Тест выдачи ответа в формате MessagePack с теми же полями, что и JSON."""
+        headers = api_key if headers_value == "api_key" else wrong_api_key
+
+        json_response = await ac.get(path, headers=headers)
+        response = await ac.get(
+            path, headers={**headers, "Accept": "application/msgpack"}
+        )
+
+        assert response.status_code == json_response.status_code
+        assert response.headers["content-type"] == "application/msgpack"
+        assert "Accept" in response.headers["vary"]
+        assert msgpack.unpackb(response.content) == json_response.json()
+
     @pytest.mark.parametrize(
         "headers_value, tweet_data, expected_status, expected_result, expected_error_message",
         [
@@ -373,3 +478,104 @@ class TestApi:
         response_data = response.json()
         assert response_data["result"] is True
         assert "media_id" in response_data
+
+    @pytest.fixture(scope="function")
+    async def published_media_id(
+        self, ac: AsyncClient, api_key: Dict[str, str], temp_image: str
+    ) -> int:
+        """Загрузка медиафайла и публикация его в твите."""
+        file_path = Path(temp_image)
+        with open(file_path, "rb") as file:
+            files = {"file": (file_path.name, file, "image/jpeg")}
+            response = await ac.post("/api/medias", files=files, headers=api_key)
+        media_id = response.json()["media_id"]
+
+        tweet_data = {"tweet_data": "Tweet with media", "tweet_media_ids": [media_id]}
+        await ac.post("/api/tweets", json=tweet_data, headers=api_key)
+        return media_id
+
+    async def test_resumable_upload(
+        self, ac: AsyncClient, api_key: Dict[str, str]
+    ) -> None:
+        """Тест загрузки медиафайла по частям через сессию загрузки."""
+        content = b"resumable" * 100
+        response = await ac.post(
+            "/api/medias/uploads",
+            json={"filename": "big.gif", "size": len(content)},
+            headers=api_key,
+        )
+        assert response.status_code == 201
+        upload = response.json()
+        upload_id, chunk_size = upload["upload_id"], upload["chunk_size"]
+
+        for index in range(upload["chunk_count"]):
+            offset = index * chunk_size
+            response = await ac.put(
+                f"/api/medias/uploads/{upload_id}/chunks/{index}",
+                params={"offset": offset},
+                content=content[offset : offset + chunk_size],
+                headers=api_key,
+            )
+            assert response.status_code == 200
+
+        response = await ac.get(f"/api/medias/uploads/{upload_id}", headers=api_key)
+        assert response.json()["received_bytes"] == len(content)
+
+        response = await ac.post(
+            f"/api/medias/uploads/{upload_id}/complete", headers=api_key
+        )
+        assert response.status_code == 201
+        assert "media_id" in response.json()
+
+        response = await ac.get(f"/api/medias/uploads/{upload_id}", headers=api_key)
+        assert response.status_code == 404
+
+    async def test_get_media(self, ac: AsyncClient, published_media_id: int) -> None:
+        """Тест отдачи опубликованного медиафайла с заголовками кэширования."""
+        response = await ac.get(f"/api/medias/{published_media_id}")
+
+        assert response.status_code == 200
+        assert response.content == b"fakeimagecontent"
+        assert response.headers["content-type"] == "image/jpeg"
+        assert (
+            response.headers["cache-control"] == "public, max-age=31536000, immutable"
+        )
+        assert response.headers["accept-ranges"] == "bytes"
+
+    async def test_get_media_range(
+        self, ac: AsyncClient, published_media_id: int
+    ) -> None:
+        """Тест отдачи части медиафайла по заголовку Range."""
+        response = await ac.get(
+            f"/api/medias/{published_media_id}", headers={"Range": "bytes=0-3"}
+        )
+
+        assert response.status_code == 206
+        assert response.content == b"fake"
+
+    async def test_get_media_accel_redirect(
+        self, ac: AsyncClient, published_media_id: int, monkeypatch
+    ) -> None:
+        """Тест передачи отдачи медиафайла в nginx через X-Accel-Redirect."""
+        monkeypatch.setattr(settings, "MEDIA_ACCEL_REDIRECT", True)
+
+        response = await ac.get(f"/api/medias/{published_media_id}")
+
+        assert response.status_code == 200
+        assert response.content == b""
+        assert response.headers["x-accel-redirect"].startswith("/protected_media/")
+        assert response.headers["x-accel-redirect"].endswith(".jpg")
+
+    async def test_get_unpublished_media(
+        self, ac: AsyncClient, api_key: Dict[str, str], temp_image: str
+    ) -> None:
+        """Тест недоступности медиафайла, не прикреплённого к твиту."""
+        file_path = Path(temp_image)
+        with open(file_path, "rb") as file:
+            files = {"file": (file_path.name, file, "image/jpeg")}
+            response = await ac.post("/api/medias", files=files, headers=api_key)
+
+        response = await ac.get(f"/api/medias/{response.json()['media_id']}")
+
+        assert response.status_code == 404
+        assert response.json()["result"] is False
@@ -0,0 +1,167 @@
+from datetime import datetime
+from typing import AsyncGenerator, List, Tuple
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from main import app
+from src.database import service
+from src.database.models import Base, Follow, Like, Tweet, User
+from src.database.repositories.user_repository import replicate_users
+from src.database.service import create_read_session, create_session
+from src.database.sharding import ShardRouter
+from src.tasks import replicate_users_job
+
+ID_SPAN = 1000
+USERS = {"alice": 1, "bob": 2, "carol": 3}
+
+Shards = Tuple[AsyncClient, List[async_sessionmaker[AsyncSession]]]
+
+
+def test_shard_router() -> None:
+    """Тест сопоставления пользователей и ID твитов шардам."""
+    router = ShardRouter(3, id_span=ID_SPAN)
+    assert [router.shard_of_user(user_id) for user_id in range(1, 5)] == [1, 2, 0, 1]
+    assert [router.shard_of_id(i) for i in (1, 999, 1000, 2500, 10**6)] == [
+        0,
+        0,
+        1,
+        2,
+        2,
+    ]
+    assert router.id_range(0) == (1, 1000)
+    assert router.id_range(2) == (2000, None)
+
+    single = ShardRouter(1, id_span=ID_SPAN)
+    assert single.shard_of_id(10**6) == 0
+    assert single.id_range(0) == (1, None)
+
+
+@pytest.fixture
+async def shards(tmp_path, monkeypatch) -> AsyncGenerator[Shards, None]:
+    """Две базы-шарда; пользователи созданы только в основной базе."""
+    engines = [
+        create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / f'shard{number}'}.db",
+            poolclass=NullPool,
+        )
+        for number in range(2)
+    ]
+    session_makers = []
+    for engine in engines:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_makers.append(async_sessionmaker(engine, expire_on_commit=False))
+    async with session_makers[0]() as session:
+        session.add_all(
+            User(id=user_id, username=name, name=name.title())
+            for name, user_id in USERS.items()
+        )
+        await session.commit()
+
+    router = ShardRouter(len(engines), id_span=ID_SPAN)
+    await router.reserve_id_ranges(engines)
+
+    monkeypatch.setattr(service, "async_session", session_makers[0])
+    monkeypatch.setattr(service, "async_read_session", session_makers[0])
+    monkeypatch.setattr(service, "shard_sessions", session_makers[1:])
+    monkeypatch.setattr(service, "shard_router", router)
+    monkeypatch.delitem(app.dependency_overrides, create_session)
+    monkeypatch.delitem(app.dependency_overrides, create_read_session)
+    await replicate_users_job()
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        yield ac, session_makers
+    for engine in engines:
+        await engine.dispose()
+
+
+async def test_replicate_users(shards: Shards) -> None:
+    """Тест копирования новых пользователей основной базы на остальные шарды."""
+    _, session_makers = shards
+    async with session_makers[1]() as session:
+        names = (await session.scalars(select(User.name).order_by(User.id))).all()
+        assert names == ["Alice", "Bob", "Carol"]
+
+    async with session_makers[0]() as primary, session_makers[1]() as shard:
+        primary.add_all(
+            User(id=user_id, username=f"user{user_id}", name=f"User {user_id}")
+            for user_id in range(4, 9)
+        )
+        await primary.commit()
+
+        assert await replicate_users(primary, [shard], batch_size=2) == 5
+        assert await replicate_users(primary, [shard], batch_size=2) == 0
+        assert await shard.scalar(select(func.count(User.id))) == 8
+
+
+async def post_tweet(ac: AsyncClient, username: str, text: str) -> int:
+    response = await ac.post(
+        "/api/tweets",
+        json={"tweet_data": text, "tweet_media_ids": []},
+        headers={"api-key": username},
+    )
+    assert response.status_code == 201
+    return response.json()["tweet_id"]
+
+
+async def test_sharded_routes(shards: Shards) -> None:
+    """Тест записи на шард владельца и сбора ленты и профиля со всех шардов."""
+    ac, session_makers = shards
+    alice = {"api-key": "alice"}
+
+    bob_tweet = await post_tweet(ac, "bob", "Bob's tweet")
+    carol_tweet = await post_tweet(ac, "carol", "Carol's tweet")
+    assert bob_tweet < ID_SPAN <= carol_tweet
+
+    for user_id in (USERS["bob"], USERS["carol"]):
+        response = await ac.post(f"/api/users/{user_id}/follow", headers=alice)
+        assert response.status_code == 201
+    response = await ac.post(f"/api/tweets/{carol_tweet}/likes", headers=alice)
+    assert response.status_code == 201
+
+    async with session_makers[0]() as session:
+        assert (await session.scalars(select(Tweet.id))).all() == [bob_tweet]
+        assert (await session.scalars(select(Follow.following_id))).all() == [2]
+        assert not (await session.scalars(select(Like.id))).all()
+        # Both tweets share the second of creation, Bob's one is made older
+        await session.execute(update(Tweet).values(created_at=datetime(2000, 1, 1)))
+        await session.commit()
+    async with session_makers[1]() as session:
+        assert (await session.scalars(select(Tweet.id))).all() == [carol_tweet]
+        assert (await session.scalars(select(Follow.following_id))).all() == [3]
+        assert (await session.scalars(select(Like.tweet_id))).all() == [carol_tweet]
+
+    response = await ac.get("/api/tweets", headers=alice)
+    tweets = response.json()["tweets"]
+    assert [tweet["id"] for tweet in tweets] == [carol_tweet, bob_tweet]
+    assert tweets[0]["likes"] == [{"user_id": USERS["alice"], "name": "Alice"}]
+
+    # The cursor bounds its own shard by the ID and the others by its time
+    pages = []
+    before_id = None
+    for _ in range(3):
+        params = (
+            {"limit": 1} if before_id is None else {"limit": 1, "before_id": before_id}
+        )
+        response = await ac.get("/api/tweets", headers=alice, params=params)
+        page = response.json()
+        pages.append([tweet["id"] for tweet in page["tweets"]])
+        before_id = page["next_cursor"]
+    assert pages == [[carol_tweet], [bob_tweet], []]
+    assert before_id is None
+
+    response = await ac.get("/api/users/me", headers=alice)
+    following = response.json()["user"]["following"]
+    assert sorted(user["id"] for user in following) == [2, 3]
+
+    response = await ac.get(f"/api/users/{USERS['carol']}", headers=alice)
+    assert response.json()["user"]["followers"] == [{"id": 1, "name": "Alice"}]
+
+    response = await ac.get(f"/api/tweets/{carol_tweet}", headers=alice)
+    assert response.json()["tweet"]["content"] == "Carol's tweet"
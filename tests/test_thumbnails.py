@@ -0,0 +1,105 @@
+from pathlib import Path
+
+import pytest
+from PIL import Image
+from sqlalchemy import select
+
+from src import thumbnails
+from src.database.models import Media, MediaDerivative, Tweet
+from src.database.repositories.media_repository import add_media, add_media_derivatives
+from src.database.repositories.tweet_repository import (
+    collect_tweets_data,
+    select_tweet_rows,
+)
+from src.tasks import generate_media_derivatives
+from src.thumbnails import (
+    PLACEHOLDER,
+    THUMBNAIL,
+    Derivative,
+    create_derivatives,
+    render_derivatives,
+)
+from tests.conftest import session_test
+
+
+def make_image(path: Path, width: int = 800, height: int = 400) -> Path:
+    Image.new("RGB", (width, height), color="red").save(path)
+    return path
+
+
+class TestThumbnails:
+    def test_render_derivatives(self, tmp_path) -> None:
+        """Тест создания миниатюр только меньше исходной ширины и заглушки."""
+        source = make_image(tmp_path / "image.jpg")
+
+        derivatives = render_derivatives(str(source))
+
+        assert [(d.kind, d.width, d.height) for d in derivatives] == [
+            (THUMBNAIL, 320, 160),
+            (THUMBNAIL, 640, 320),
+            (PLACEHOLDER, 16, 8),
+        ]
+        for derivative in derivatives:
+            with Image.open(derivative.link) as image:
+                assert image.size == (derivative.width, derivative.height)
+
+    def test_render_refuses_decompression_bomb(self, tmp_path, monkeypatch) -> None:
+        """Тест отказа в обработке изображения больше допустимого числа пикселей."""
+        source = make_image(tmp_path / "image.jpg")
+        monkeypatch.setattr(thumbnails, "MAX_IMAGE_PIXELS", 800 * 400 - 1)
+
+        with pytest.raises(Image.DecompressionBombError):
+            render_derivatives(str(source))
+        assert list(tmp_path.iterdir()) == [source]
+
+    async def test_create_derivatives_skips_invalid_files(self, tmp_path) -> None:
+        """Тест пропуска файлов, которые не являются изображениями."""
+        broken = tmp_path / "broken.jpg"
+        broken.write_bytes(b"fakeimagecontent")
+        document = tmp_path / "document.pdf"
+        document.write_bytes(b"%PDF")
+
+        assert await create_derivatives(str(broken)) == []
+        assert await create_derivatives(str(document)) == []
+
+    async def test_generate_media_derivatives(
+        self, session, users_and_followers, local_storage
+    ) -> None:
+        """Тест записи миниатюр в базу и их выдачи в данных твита."""
+        source = make_image(local_storage.root / "photo.png", width=400, height=200)
+        sha256 = "b" * 64
+        media_id = (
+            await add_media(str(source), session, sha256=sha256, size=1)
+        ).media_id
+
+        tweet = Tweet(author_id=users_and_followers[0].id, tweet_data="Photo")
+        session.add(tweet)
+        await session.flush()
+        media = await session.get(Media, media_id)
+        media.tweet_id = tweet.id
+        await session.commit()
+
+        await generate_media_derivatives(sha256, str(source), session_test)
+
+        query = select_tweet_rows().where(Tweet.id == tweet.id)
+        (tweet_data,) = await collect_tweets_data(query, session)
+
+        assert tweet_data.media[0].id == media_id
+        assert [(d.kind, d.width) for d in tweet_data.media[0].derivatives] == [
+            (PLACEHOLDER, 16),
+            (THUMBNAIL, 320),
+        ]
+        # A concurrent render of the same content records nothing new
+        await add_media_derivatives(
+            sha256, [Derivative(THUMBNAIL, 320, 160, "duplicate.png")], session
+        )
+        await session.commit()
+        derivatives = await session.scalars(
+            select(MediaDerivative.link).where(MediaDerivative.sha256 == sha256)
+        )
+        assert "duplicate.png" not in derivatives.all()
+
+        assert sorted(path.name for path in (local_storage.root / "bb").iterdir()) == [
+            "photo_16w.png",
+            "photo_320w.png",
+        ]
@@ -0,0 +1,67 @@
+import re
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from main import app
+from src.responses import SchemaResponse
+from src.timing import RequestTimings, format_server_timing, request_timings
+
+SERVER_TIMING_PATTERN = re.compile(
+    r'db;dur=([\d.]+);desc="(\d+) queries", serialize;dur=([\d.]+), '
+    r"app;dur=([\d.]+), total;dur=([\d.]+)"
+)
+
+
+def test_format_server_timing() -> None:
+    """Тест формата заголовка Server-Timing."""
+    timings = RequestTimings()
+    timings.db_seconds = 0.012
+    timings.queries = 3
+    timings.serialize_seconds = 0.002
+    assert format_server_timing(timings, 0.02) == (
+        'db;dur=12.0;desc="3 queries", serialize;dur=2.0, app;dur=6.0, '
+        "total;dur=20.0"
+    )
+
+
+def test_serialization_time() -> None:
+    """Тест учёта времени сериализации ответа в текущем запросе."""
+    timings = RequestTimings()
+    token = request_timings.set(timings)
+    try:
+        SchemaResponse({"items": list(range(10_000))}).render_for("*/*")
+    finally:
+        request_timings.reset(token)
+    assert timings.serialize_seconds > 0
+    assert timings.queries == 0
+
+
+@pytest.mark.usefixtures("populate_database_fixture")
+class TestServerTiming:
+    @pytest.mark.parametrize("accept", ["application/json", "application/msgpack"])
+    async def test_feed_timing(self, accept: str) -> None:
+        """Тест разбивки времени запроса ленты в заголовке Server-Timing."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as ac:
+            response = await ac.get(
+                "/api/tweets", headers={"api-key": "test", "Accept": accept}
+            )
+
+        assert response.status_code == 200
+        match = SERVER_TIMING_PATTERN.fullmatch(response.headers["server-timing"])
+        assert match
+        db, queries, _, _, total = match.groups()
+        assert int(queries) > 0
+        assert 0 < float(db) <= float(total)
+
+    async def test_timing_of_errors(self) -> None:
+        """Тест заголовка Server-Timing у ответа с ошибкой."""
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as ac:
+            response = await ac.get("/api/tweets", headers={"api-key": "unknown"})
+
+        assert response.status_code == 404
+        assert SERVER_TIMING_PATTERN.fullmatch(response.headers["server-timing"])
@@ -0,0 +1,113 @@
+import os
+import subprocess
+import sys
+
+from httpx import ASGITransport, AsyncClient
+
+from main import app
+from src.database.config import settings
+from src.trends import (
+    SpaceSaving,
+    TrendTracker,
+    extract_hashtags,
+    snapshot_path,
+    trend_tracker,
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTrends:
+    def test_extract_hashtags(self) -> None:
+        """Тест извлечения уникальных хэштегов из текста твита."""
+        text = "Hello #Python and #fastapi, again #python!"
+        assert extract_hashtags(text) == ["python", "fastapi"]
+
+    def test_space_saving_bounded(self) -> None:
+        """Тест ограничения памяти Space-Saving при большой кардинальности."""
+        summary = SpaceSaving(capacity=3)
+        for index in range(100):
+            summary.offer("heavy")
+            summary.offer(f"rare{index}")
+
+        assert len(summary.counters) == 3
+        assert max(summary.counters, key=summary.counters.__getitem__) == "heavy"
+
+    def test_tracker_top_and_decay(self) -> None:
+        """Тест ранжирования хэштегов с затуханием по времени."""
+        clock = FakeClock()
+        tracker = TrendTracker(bucket_seconds=60, window_buckets=3, clock=clock)
+
+        for _ in range(3):
+            tracker.add("#old")
+        assert tracker.top() == [("old", 3.0)]
+
+        clock.now = 60
+        for _ in range(3):
+            tracker.add("#new")
+        assert [hashtag for hashtag, _ in tracker.top()] == ["new", "old"]
+
+        clock.now = 240
+        assert tracker.top() == []
+
+    async def test_snapshot_roundtrip(self, tmp_path) -> None:
+        """Тест восстановления трендов из снапшота после перезапуска."""
+        clock = FakeClock(1000)
+        tracker = TrendTracker(bucket_seconds=60, clock=clock)
+        tracker.add("#restart #python")
+
+        snapshot = tmp_path / "trends.json"
+        await tracker.save_snapshot(snapshot)
+
+        restored = TrendTracker(bucket_seconds=60, clock=clock)
+        await restored.load_snapshot(snapshot)
+        assert restored.top() == tracker.top()
+
+    async def test_peer_snapshots(self, tmp_path, monkeypatch) -> None:
+        """Тест сложения трендов других воркеров и переноса снапшотов остановленных."""
+        monkeypatch.setattr(settings, "TRENDS_SNAPSHOT_DIR", tmp_path)
+        process = subprocess.Popen([sys.executable, "-c", ""])
+        process.wait()
+        clock = FakeClock(1000)
+
+        peer = TrendTracker(bucket_seconds=60, clock=clock)
+        peer.add("#shared #peer")
+        await peer.save_snapshot(snapshot_path(os.getppid()))
+        stopped = TrendTracker(bucket_seconds=60, clock=clock)
+        stopped.add("#adopted")
+        await stopped.save_snapshot(snapshot_path(process.pid))
+
+        tracker = TrendTracker(bucket_seconds=60, clock=clock)
+        tracker.add("#shared")
+        await tracker.save_snapshot()
+        await tracker.load_peers()
+
+        assert tracker.top() == [("shared", 2.0), ("adopted", 1.0), ("peer", 1.0)]
+        assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+            [snapshot_path().name, snapshot_path(os.getppid()).name]
+        )
+
+        clock.now = 2000
+        await tracker.load_peers()
+        assert tracker.top() == []
+
+    async def test_get_trends(self) -> None:
+        """Тест эндпоинта трендов после создания твита с хэштегом."""
+        trend_tracker.buckets.clear()
+        trend_tracker.add("Trending #endpoint")
+
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as ac:
+            response = await ac.get("/api/trends")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["result"] is True
+        assert data["trends"][0]["hashtag"] == "endpoint"
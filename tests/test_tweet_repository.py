@@ -1,19 +1,28 @@
 import pytest
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database.models import Tweet
+from src.cache import tweet_cache
+from src.database.models import Like, Media, Tweet
+from src.database.repositories.like_repository import add_like
 from src.database.repositories.tweet_repository import (
     add_tweet,
-    collect_tweet_data,
+    collect_tweets_data,
     delete_tweet,
+    get_tweet,
     get_tweets_selection,
+    get_user_tweets,
     is_tweet_exist,
+    purge_deleted_tweets,
+    select_tweet_rows,
 )
 from src.handlers.exceptions import PermissionException, RowNotFoundException
 from src.schemas.base_schemas import SuccessSchema
 from src.schemas.tweet_schemas import (
     NewTweetResponseSchema,
     TweetBaseSchema,
+    TweetDetailResponseSchema,
+    TweetPageResponseSchema,
     TweetResponseSchema,
 )
 
@@ -36,6 +45,56 @@ class TestTweetModel:
         exists = await is_tweet_exist(tweet_id=tweet_id, session=session)
         assert exists is expected_result
 
+    async def test_get_tweet_read_through(
+        self, session: AsyncSession, users_and_followers: list, test_tweet: Tweet
+    ) -> None:
+        """Тестирует получение твита через кэш и его инвалидацию лайком."""
+        username = users_and_followers[0].username
+        response = await get_tweet(
+            username=username, tweet_id=test_tweet.id, session=session
+        )
+
+        assert isinstance(response, TweetDetailResponseSchema)
+        assert response.tweet.id == test_tweet.id
+        assert tweet_cache.get(test_tweet.id) == response.tweet
+
+        await add_like(
+            username=users_and_followers[3].username,
+            tweet_id=test_tweet.id,
+            session=session,
+        )
+        assert tweet_cache.get(test_tweet.id) is not None
+        await session.commit()
+        assert tweet_cache.get(test_tweet.id) is None
+
+        response = await get_tweet(
+            username=username, tweet_id=test_tweet.id, session=session
+        )
+        assert [like.user_id for like in response.tweet.likes] == [
+            users_and_followers[3].id
+        ]
+
+    async def test_get_tweet_not_found(
+        self, session: AsyncSession, users_and_followers: list
+    ) -> None:
+        """Тестирует получение несуществующего твита."""
+        with pytest.raises(RowNotFoundException) as exc_info:
+            await get_tweet(
+                username=users_and_followers[0].username, tweet_id=999, session=session
+            )
+        assert exc_info.value.detail == "Tweet with this ID does not exist"
+        assert exc_info.value.status_code == 404
+
+    async def test_get_tweet_user_not_found(
+        self, session: AsyncSession, test_tweet: Tweet
+    ) -> None:
+        """Тестирует получение твита несуществующим пользователем."""
+        with pytest.raises(RowNotFoundException) as exc_info:
+            await get_tweet(
+                username="non_existent_user", tweet_id=test_tweet.id, session=session
+            )
+        assert exc_info.value.status_code == 404
+
     async def test_add_tweet_success(
         self, session: AsyncSession, users_and_followers: list
     ) -> None:
@@ -74,6 +133,9 @@ class TestTweetModel:
         )
 
         assert isinstance(response, SuccessSchema)
+        await session.commit()
+        assert tweet_cache.get(tweet_id) is None
+        assert not await is_tweet_exist(tweet_id=tweet_id, session=session)
 
     async def test_delete_tweet_not_found(
         self, session: AsyncSession, users_and_followers: list
@@ -91,13 +153,28 @@ class TestTweetModel:
         )
         assert exc_info.value.status_code == 403
 
-    async def test_collect_tweet_data(self, test_tweet: Tweet) -> None:
-        """Тестирует сбор данных о твите для дальнейшего использования."""
-        tweet_data = await collect_tweet_data(tweet=test_tweet)
+    async def test_collect_tweets_data(
+        self, session: AsyncSession, users_and_followers: list
+    ) -> None:
+        """Тестирует сбор данных о твитах из выбранных столбцов без загрузки моделей."""
+        author, liker = users_and_followers[0], users_and_followers[2]
+        tweet = Tweet(author_id=author.id, tweet_data="Collected tweet")
+        session.add(tweet)
+        await session.flush()
+        session.add(Like(user_id=liker.id, tweet_id=tweet.id))
+        await session.commit()
+        tweet_id = tweet.id
+        session.expunge_all()
 
-        assert tweet_data.id == test_tweet.id
-        assert tweet_data.content == test_tweet.tweet_data
-        assert tweet_data.author.id == test_tweet.author.id
+        query = select_tweet_rows().where(Tweet.id == tweet_id)
+        tweets_data = await collect_tweets_data(query, session)
+
+        assert len(tweets_data) == 1
+        assert tweets_data[0].id == tweet_id
+        assert tweets_data[0].content == "Collected tweet"
+        assert tweets_data[0].author.id == author.id
+        assert [like.user_id for like in tweets_data[0].likes] == [liker.id]
+        assert not session.identity_map
 
     async def test_get_tweets_selection_success(
         self, session: AsyncSession, users_and_followers: list
@@ -117,6 +194,42 @@ class TestTweetModel:
         assert isinstance(response, TweetResponseSchema)
         assert len(response.tweets) > 0
 
+    async def test_get_tweets_selection_pagination(
+        self, session: AsyncSession, users_and_followers: list
+    ) -> None:
+        """Тестирует постраничное получение ленты по курсору."""
+        follower = users_and_followers[0]
+        session.add_all(
+            [
+                Tweet(author_id=users_and_followers[1].id, tweet_data=f"Feed {i}")
+                for i in range(3)
+            ]
+        )
+        await session.commit()
+        feed = await get_tweets_selection(
+            username=follower.username, session=session, limit=100
+        )
+        assert feed.next_cursor is None
+
+        first_page = await get_tweets_selection(
+            username=follower.username, session=session, limit=2
+        )
+        assert [tweet.id for tweet in first_page.tweets] == [
+            tweet.id for tweet in feed.tweets[:2]
+        ]
+        assert first_page.next_cursor == first_page.tweets[-1].id
+
+        second_page = await get_tweets_selection(
+            username=follower.username,
+            session=session,
+            limit=100,
+            before_id=first_page.next_cursor,
+        )
+        assert [tweet.id for tweet in second_page.tweets] == [
+            tweet.id for tweet in feed.tweets[2:]
+        ]
+        assert second_page.next_cursor is None
+
     async def test_get_tweets_selection_user_not_found(
         self, session: AsyncSession
     ) -> None:
@@ -125,3 +238,68 @@ class TestTweetModel:
             await get_tweets_selection(username="non_existent_user", session=session)
         assert exc_info.value.detail == "User not found"
         assert exc_info.value.status_code == 404
+
+    async def test_get_user_tweets_pagination(
+        self, session: AsyncSession, users_and_followers: list
+    ) -> None:
+        """Тестирует постраничное получение твитов автора по курсору."""
+        author = users_and_followers[2]
+        session.add_all(
+            [Tweet(author_id=author.id, tweet_data=f"Tweet {i}") for i in range(5)]
+        )
+        await session.commit()
+
+        first_page = await get_user_tweets(author.id, session, limit=3)
+        assert isinstance(first_page, TweetPageResponseSchema)
+        assert [tweet.content for tweet in first_page.tweets] == [
+            "Tweet 4",
+            "Tweet 3",
+            "Tweet 2",
+        ]
+        assert first_page.next_cursor == first_page.tweets[-1].id
+
+        second_page = await get_user_tweets(
+            author.id, session, limit=3, before_id=first_page.next_cursor
+        )
+        assert [tweet.content for tweet in second_page.tweets] == [
+            "Tweet 1",
+            "Tweet 0",
+        ]
+        assert second_page.next_cursor is None
+
+    async def test_get_user_tweets_user_not_found(self, session: AsyncSession) -> None:
+        """Тестирует получение твитов несуществующего автора."""
+        with pytest.raises(RowNotFoundException) as exc_info:
+            await get_user_tweets(999, session)
+        assert exc_info.value.status_code == 404
+
+    async def test_purge_deleted_tweets(
+        self, session: AsyncSession, users_and_followers: list, tmp_path
+    ) -> None:
+        """Тестирует фоновое удаление твита вместе с лайками и медиафайлами."""
+        author = users_and_followers[0]
+        media_file = tmp_path / "image.jpg"
+        media_file.write_bytes(b"image")
+
+        tweet = Tweet(author_id=author.id, tweet_data="To be purged")
+        session.add(tweet)
+        await session.flush()
+        session.add_all(
+            [Like(user_id=user.id, tweet_id=tweet.id) for user in users_and_followers]
+            + [Media(link=str(media_file), tweet_id=tweet.id)]
+        )
+        await session.commit()
+
+        await delete_tweet(username=author.username, tweet_id=tweet.id, session=session)
+        assert media_file.exists()
+
+        purged = 0
+        while batch := await purge_deleted_tweets(session, batch_size=2):
+            purged += batch
+
+        assert purged >= 1
+        assert not media_file.exists()
+        session.expunge_all()
+        assert await session.get(Tweet, tweet.id) is None
+        likes = await session.scalars(select(Like).where(Like.tweet_id == tweet.id))
+        assert not likes.all()
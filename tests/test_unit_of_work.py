@@ -0,0 +1,53 @@
+from typing import List
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from main import app
+from src.database.models import User
+from src.database.unit_of_work import get_transaction_counts, on_commit, unit_of_work
+from tests.conftest import session_test
+
+
+@pytest.mark.usefixtures("populate_database_fixture")
+class TestUnitOfWork:
+    async def test_one_commit_per_request(self) -> None:
+        """Тест одного коммита на изменяющий запрос и отсутствия коммитов у чтения."""
+        before = get_transaction_counts()
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as ac:
+            response = await ac.post(
+                "/api/tweets",
+                json={"tweet_data": "Hello", "tweet_media_ids": []},
+                headers={"api-key": "test"},
+            )
+            assert response.status_code == 201
+            response = await ac.get("/api/tweets", headers={"api-key": "test"})
+            assert response.status_code == 200
+
+        after = get_transaction_counts()
+        endpoint = "POST /api/tweets"
+        previous = before.get(endpoint)
+        assert after[endpoint].commits == (previous.commits if previous else 0) + 1
+        assert "GET /api/tweets" not in after
+
+    async def test_rollback_on_error(self) -> None:
+        """Тест отката изменений и отмены действий после коммита при ошибке."""
+        called: List[int] = []
+
+        with pytest.raises(RuntimeError):
+            async with unit_of_work(session_test, "test", commit=True) as session:
+                session.add(User(username="rolled_back", name="Rolled Back"))
+                await session.flush()
+                on_commit(session, called.append, 1)
+                raise RuntimeError()
+
+        assert get_transaction_counts()["test"] == (0, 1)
+        assert not called
+
+        async with unit_of_work(session_test, "test", commit=True) as session:
+            on_commit(session, called.append, 2)
+
+        assert get_transaction_counts()["test"] == (1, 1)
+        assert called == [2]
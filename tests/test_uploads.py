@@ -0,0 +1,117 @@
+import hashlib
+import os
+import time
+from typing import AsyncIterator
+
+import pytest
+
+from src import uploads
+from src.handlers.exceptions import (
+    FileException,
+    FileTooLargeException,
+    RowNotFoundException,
+)
+from src.uploads import (
+    complete_upload,
+    create_upload_session,
+    get_upload_progress,
+    get_upload_session,
+    remove_expired_upload_sessions,
+    write_chunk,
+)
+
+
+async def stream(*parts: bytes) -> AsyncIterator[bytes]:
+    for part in parts:
+        yield part
+
+
+class TestUploadSessions:
+    @pytest.fixture
+    def media_folder(self, local_storage, monkeypatch):
+        monkeypatch.setattr(
+            uploads, "uploads_folder_path", local_storage.root / ".uploads"
+        )
+        return local_storage.root
+
+    async def test_resumable_upload(self, media_folder) -> None:
+        """Тест загрузки файла по частям в произвольном порядке с повтором части."""
+        content = os.urandom(2500)
+        upload = await create_upload_session(
+            "test", "video.gif", len(content), chunk_size=1000
+        )
+        assert upload.chunk_count == 3
+
+        await write_chunk(upload, 2, 2000, stream(content[2000:]))
+        await write_chunk(upload, 0, 0, stream(b"x" * 1000))
+        await write_chunk(upload, 0, 0, stream(content[:500], content[500:1000]))
+
+        progress = get_upload_progress(
+            await get_upload_session(upload.upload_id, "test")
+        )
+        assert progress.received_chunks == [0, 2]
+        assert progress.received_bytes == 1500
+
+        with pytest.raises(FileException):
+            await complete_upload(upload)
+
+        await write_chunk(upload, 1, 1000, stream(content[1000:2000]))
+        received_file = await complete_upload(upload)
+
+        assert received_file.sha256 == hashlib.sha256(content).hexdigest()
+        assert received_file.size == len(content)
+        assert received_file.extension == ".gif"
+        assert received_file.path.parent == media_folder / ".uploads"
+        assert received_file.path.read_bytes() == content
+        assert not upload.folder.exists()
+
+    @pytest.mark.parametrize(
+        "index, offset, content",
+        [
+            (3, 3000, b"x"),
+            (1, 0, b"x" * 1000),
+            (0, 0, b"x" * 999),
+            (0, 0, b"x" * 1001),
+        ],
+    )
+    async def test_write_chunk_mismatch(
+        self, media_folder, index: int, offset: int, content: bytes
+    ) -> None:
+        """Тест отказа в сохранении части с неверным номером, смещением или длиной."""
+        upload = await create_upload_session("test", "video.gif", 2500, chunk_size=1000)
+
+        with pytest.raises(FileException):
+            await write_chunk(upload, index, offset, stream(content))
+
+        assert get_upload_progress(upload).received_chunks == []
+        assert not list(upload.folder.glob("*.part"))
+
+    async def test_create_upload_session_validation(self, media_folder) -> None:
+        """Тест проверки имени и размера файла при создании сессии загрузки."""
+        with pytest.raises(FileException):
+            await create_upload_session("test", "script.js", 100)
+        with pytest.raises(FileTooLargeException):
+            await create_upload_session("test", "video.gif", 101, max_size=100)
+
+    async def test_get_upload_session_of_other_user(self, media_folder) -> None:
+        """Тест недоступности чужой или несуществующей сессии загрузки."""
+        upload = await create_upload_session("test", "video.gif", 100)
+
+        for upload_id, owner in [
+            (upload.upload_id, "other"),
+            ("../../etc", "test"),
+            ("0" * 32, "test"),
+        ]:
+            with pytest.raises(RowNotFoundException):
+                await get_upload_session(upload_id, owner)
+
+    async def test_remove_expired_upload_sessions(self, media_folder) -> None:
+        """Тест удаления заброшенных сессий загрузки."""
+        abandoned = await create_upload_session("test", "video.gif", 100)
+        active = await create_upload_session("test", "video.gif", 100)
+        expired = time.time() - 3600
+        os.utime(abandoned.folder, (expired, expired))
+
+        assert await remove_expired_upload_sessions(max_age=60) == 1
+        assert not abandoned.folder.exists()
+        assert active.folder.exists()